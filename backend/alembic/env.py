@@ -1,7 +1,8 @@
 from logging.config import fileConfig
 
-from sqlalchemy import engine_from_config
+from sqlalchemy import create_engine, engine_from_config
 from sqlalchemy import pool
+from sqlalchemy.engine import make_url
 
 from alembic import context
 
@@ -19,6 +20,7 @@ if config.config_file_name is not None:
 # for 'autogenerate' support
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
+from app.core import tenancy
 from app.schemas.models import Base
 target_metadata = Base.metadata
 
@@ -28,6 +30,27 @@ target_metadata = Base.metadata
 # ... etc.
 
 
+# Which databases to migrate. With TENANTS_FILE set (see app.core.tenancy)
+# that is every tenant, or just one with `alembic -x tenant=<name> ...`;
+# otherwise it is sqlalchemy.url. Frozen tenants are being moved and are
+# skipped; migrate them once the move is done.
+def tenant_urls() -> list[tuple[str, str]]:
+    name = context.get_x_argument(as_dictionary=True).get("tenant")
+    if name is None and tenancy.TENANTS_FILE is None:
+        return []
+    tenants = [tenancy.registry.get(name)] if name else tenancy.registry.all()
+
+    urls = []
+    for tenant in tenants:
+        if tenant.frozen:
+            print(f"Skipping {tenant.name}: it is frozen for a move")
+            continue
+        # The app's URLs use async drivers; migrations run on the sync ones.
+        url = make_url(tenant.database_url)
+        urls.append((tenant.name, url.set(drivername=url.get_backend_name())))
+    return urls
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -40,16 +63,19 @@ def run_migrations_offline() -> None:
     script output.
 
     """
-    url = config.get_main_option("sqlalchemy.url")
-    context.configure(
-        url=url,
-        target_metadata=target_metadata,
-        literal_binds=True,
-        dialect_opts={"paramstyle": "named"},
-    )
+    urls = tenant_urls() or [(None, config.get_main_option("sqlalchemy.url"))]
+    for name, url in urls:
+        if name is not None:
+            context.config.print_stdout(f"-- tenant {name}")
+        context.configure(
+            url=url,
+            target_metadata=target_metadata,
+            literal_binds=True,
+            dialect_opts={"paramstyle": "named"},
+        )
 
-    with context.begin_transaction():
-        context.run_migrations()
+        with context.begin_transaction():
+            context.run_migrations()
 
 
 def run_migrations_online() -> None:
@@ -59,19 +85,28 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
-    connectable = engine_from_config(
-        config.get_section(config.config_ini_section, {}),
-        prefix="sqlalchemy.",
-        poolclass=pool.NullPool,
-    )
-
-    with connectable.connect() as connection:
-        context.configure(
-            connection=connection, target_metadata=target_metadata
-        )
-
-        with context.begin_transaction():
-            context.run_migrations()
+    urls = tenant_urls()
+    if urls:
+        connectables = [
+            (name, create_engine(url, poolclass=pool.NullPool)) for name, url in urls
+        ]
+    else:
+        connectables = [(None, engine_from_config(
+            config.get_section(config.config_ini_section, {}),
+            prefix="sqlalchemy.",
+            poolclass=pool.NullPool,
+        ))]
+
+    for name, connectable in connectables:
+        if name is not None:
+            print(f"Tenant {name}")
+        with connectable.connect() as connection:
+            context.configure(
+                connection=connection, target_metadata=target_metadata
+            )
+
+            with context.begin_transaction():
+                context.run_migrations()
 
 
 if context.is_offline_mode():
@@ -0,0 +1,65 @@
+"""normalize study group schedule
+
+Revision ID: 8f2d6a0b5e13
+Revises: 3b9e1c47a2d5
+Create Date: 2026-10-19 11:02:17.540921
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.schedule import meeting_slot
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f2d6a0b5e13'
+down_revision: Union[str, Sequence[str], None] = '3b9e1c47a2d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('studyGroups', sa.Column('duration_minutes', sa.Integer(), server_default='60', nullable=False))
+    op.add_column('studyGroups', sa.Column('schedule_start', sa.Integer(), nullable=True))
+    op.add_column('studyGroups', sa.Column('schedule_end', sa.Integer(), nullable=True))
+    op.add_column('studyGroups', sa.Column('is_recurring', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+    bind = op.get_bind()
+    groups = sa.table(
+        'studyGroups',
+        sa.column('id', sa.Integer()),
+        sa.column('meeting_time', sa.DateTime(timezone=True)),
+        sa.column('meeting_day', sa.String()),
+        sa.column('duration_minutes', sa.Integer()),
+        sa.column('schedule_start', sa.Integer()),
+        sa.column('schedule_end', sa.Integer()),
+        sa.column('is_recurring', sa.Boolean()),
+    )
+    rows = bind.execute(
+        sa.select(groups.c.id, groups.c.meeting_time, groups.c.meeting_day, groups.c.duration_minutes)
+    ).all()
+    for group_id, meeting_time, meeting_day, duration in rows:
+        start, end, recurring = meeting_slot(meeting_time, meeting_day, duration)
+        bind.execute(
+            groups.update()
+            .where(groups.c.id == group_id)
+            .values(schedule_start=start, schedule_end=end, is_recurring=recurring)
+        )
+
+    op.alter_column('studyGroups', 'schedule_start', nullable=False)
+    op.alter_column('studyGroups', 'schedule_end', nullable=False)
+    op.create_index('ix_studyGroups_semester_schedule', 'studyGroups', ['semester_id', 'schedule_start'], unique=False)
+    op.create_index('ix_studyGroups_meeting_time', 'studyGroups', ['meeting_time'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_studyGroups_meeting_time', table_name='studyGroups')
+    op.drop_index('ix_studyGroups_semester_schedule', table_name='studyGroups')
+    op.drop_column('studyGroups', 'is_recurring')
+    op.drop_column('studyGroups', 'schedule_end')
+    op.drop_column('studyGroups', 'schedule_start')
+    op.drop_column('studyGroups', 'duration_minutes')
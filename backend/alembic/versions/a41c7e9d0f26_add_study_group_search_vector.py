@@ -0,0 +1,41 @@
+"""add study group search vector
+
+Revision ID: a41c7e9d0f26
+Revises: 8f2d6a0b5e13
+Create Date: 2026-10-19 12:20:03.118452
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.core.search import SEARCH_DDL
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41c7e9d0f26'
+down_revision: Union[str, Sequence[str], None] = '8f2d6a0b5e13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('studyGroups', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+    for ddl in SEARCH_DDL:
+        op.execute(ddl)
+    op.execute('UPDATE "studyGroups" SET search_vector = study_group_search_vector(location, course_id)')
+    op.create_index('ix_studyGroups_search_vector', 'studyGroups', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_studyGroups_search_vector', table_name='studyGroups', postgresql_using='gin')
+    op.execute('DROP TRIGGER IF EXISTS courses_search_vector_update ON courses')
+    op.execute('DROP TRIGGER IF EXISTS study_groups_search_vector_update ON "studyGroups"')
+    op.execute('DROP FUNCTION IF EXISTS courses_search_vector_trigger()')
+    op.execute('DROP FUNCTION IF EXISTS study_groups_search_vector_trigger()')
+    op.execute('DROP FUNCTION IF EXISTS study_group_search_vector(text, integer)')
+    op.drop_column('studyGroups', 'search_vector')
@@ -0,0 +1,41 @@
+"""add hot path indexes
+
+Revision ID: b93f0d6e2a57
+Revises: e4b7a1d9c352
+Create Date: 2026-10-19 20:11:05.402917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b93f0d6e2a57'
+down_revision: Union[str, Sequence[str], None] = 'e4b7a1d9c352'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Built concurrently so the hot tables stay writable during the upgrade.
+# The single-column indexes dropped here are prefixes of the new ones.
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_study_group_members_student_group', 'study_group_members', ['student_id', 'study_group_id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_study_group_join_requests_student_created', 'study_group_join_requests', ['student_id', 'created_at'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_studyGroups_course_semester', 'studyGroups', ['course_id', 'semester_id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_student_courses_course_id', 'student_courses', ['course_id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_study_group_join_requests_student_id', table_name='study_group_join_requests', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_studyGroups_course_id', table_name='studyGroups', postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_studyGroups_course_id', 'studyGroups', ['course_id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_study_group_join_requests_student_id', 'study_group_join_requests', ['student_id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_student_courses_course_id', table_name='student_courses', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_studyGroups_course_semester', table_name='studyGroups', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_study_group_join_requests_student_created', table_name='study_group_join_requests', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_study_group_members_student_group', table_name='study_group_members', postgresql_concurrently=True, if_exists=True)
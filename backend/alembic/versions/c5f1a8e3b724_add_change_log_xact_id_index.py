@@ -0,0 +1,30 @@
+"""add change log xact id index
+
+Revision ID: c5f1a8e3b724
+Revises: a4e9c7b2d816
+Create Date: 2026-10-20 15:21:09.374512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5f1a8e3b724'
+down_revision: Union[str, Sequence[str], None] = 'a4e9c7b2d816'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Built concurrently so change_log stays writable during the upgrade.
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_change_log_xact_id', 'change_log', ['xact_id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_change_log_xact_id', table_name='change_log', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,251 @@
+from datetime import datetime, timedelta, timezone
+from typing import Iterable
+
+from sqlalchemy import select, update, func, case, union, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.single_flight import SingleFlight
+from app.deps.db import AsyncSessionLocal, dialect_insert
+from app.schemas.models import (
+    Course,
+    SemesterAnalytics,
+    StudentCourse,
+    StudyGroup,
+    StudyGroupJoinRequest,
+    StudyGroupMember,
+)
+
+# Semester-level stats for department staff, cached in semester_analytics.
+# An entry expires after CACHE_TTL, and is marked stale whenever a course
+# rollup in its semester is refreshed (so after any group, membership or
+# join request change). A stale entry is served until it is STALE_GRACE
+# old, which caps recomputation at one per semester per STALE_GRACE however
+# busy the semester is. Enrollment changes only show up through the TTL.
+CACHE_TTL = timedelta(minutes=15)
+STALE_GRACE = timedelta(seconds=60)
+
+semester_flight = SingleFlight("semester_analytics")
+
+
+def _latency_seconds(db: AsyncSession):
+    # Seconds between a join request and its acceptance.
+    if db.bind.dialect.name == "sqlite":
+        return (
+            func.julianday(StudyGroupMember.joined_at)
+            - func.julianday(StudyGroupMember.requested_at)
+        ) * 86400
+    return func.extract(
+        "epoch", StudyGroupMember.joined_at - StudyGroupMember.requested_at
+    )
+
+
+async def _courses(db: AsyncSession, semester_id: int) -> list[dict]:
+    # Counted for this semester's groups only, not every group on campus.
+    semester_groups = select(StudyGroup.id).where(StudyGroup.semester_id == semester_id)
+    members = (
+        select(StudyGroupMember.study_group_id, func.count().label("n"))
+        .where(StudyGroupMember.study_group_id.in_(semester_groups))
+        .group_by(StudyGroupMember.study_group_id)
+        .subquery()
+    )
+    pending = (
+        select(StudyGroupJoinRequest.study_group_id, func.count().label("n"))
+        .where(StudyGroupJoinRequest.study_group_id.in_(semester_groups))
+        .group_by(StudyGroupJoinRequest.study_group_id)
+        .subquery()
+    )
+    groups = (
+        select(
+            StudyGroup.course_id,
+            func.count(StudyGroup.id).label("groups"),
+            func.sum(StudyGroup.capacity).label("capacity"),
+            func.sum(func.coalesce(members.c.n, 0)).label("members"),
+            func.sum(
+                case((func.coalesce(members.c.n, 0) >= StudyGroup.capacity, 1), else_=0)
+            ).label("full_groups"),
+            func.sum(func.coalesce(pending.c.n, 0)).label("pending"),
+        )
+        .outerjoin(members, members.c.study_group_id == StudyGroup.id)
+        .outerjoin(pending, pending.c.study_group_id == StudyGroup.id)
+        .where(StudyGroup.semester_id == semester_id)
+        .group_by(StudyGroup.course_id)
+        .subquery()
+    )
+    enrolled = (
+        select(StudentCourse.course_id, func.count().label("n"))
+        .join(Course, Course.id == StudentCourse.course_id)
+        .where(Course.semester_id == semester_id)
+        .group_by(StudentCourse.course_id)
+        .subquery()
+    )
+
+    rows = await db.execute(
+        select(
+            Course.id,
+            Course.department,
+            Course.course_number,
+            func.coalesce(groups.c.groups, 0),
+            func.coalesce(groups.c.capacity, 0),
+            func.coalesce(groups.c.members, 0),
+            func.coalesce(groups.c.full_groups, 0),
+            func.coalesce(groups.c.pending, 0),
+            func.coalesce(enrolled.c.n, 0),
+        )
+        .outerjoin(groups, groups.c.course_id == Course.id)
+        .outerjoin(enrolled, enrolled.c.course_id == Course.id)
+        .where(Course.semester_id == semester_id)
+        .order_by(Course.department, Course.course_number)
+    )
+
+    # Postgres sums counts as numeric; the payload is stored as JSON.
+    courses = []
+    for course_id, department, course_number, *counts in rows:
+        group_count, capacity, member_count, full_groups, pending, enrolled_n = map(int, counts)
+        courses.append({
+            "course_id": course_id,
+            "department": department,
+            "course_number": course_number,
+            "group_count": group_count,
+            "capacity": capacity,
+            "member_count": member_count,
+            "full_groups": full_groups,
+            "pending_requests": pending,
+            "enrolled_students": enrolled_n,
+            "fill_rate": member_count / capacity if capacity else None,
+        })
+    return courses
+
+
+async def _active_students(db: AsyncSession, semester_id: int) -> int:
+    # Students who are in, or have asked to join, a group this semester.
+    students = union(
+        select(StudyGroupMember.student_id)
+        .join(StudyGroup, StudyGroup.id == StudyGroupMember.study_group_id)
+        .where(StudyGroup.semester_id == semester_id),
+        select(StudyGroupJoinRequest.student_id)
+        .join(StudyGroup, StudyGroup.id == StudyGroupJoinRequest.study_group_id)
+        .where(StudyGroup.semester_id == semester_id),
+    ).subquery()
+    return await db.scalar(select(func.count()).select_from(students))
+
+
+async def _enrolled_students(db: AsyncSession, semester_id: int) -> int:
+    return await db.scalar(
+        select(func.count(func.distinct(StudentCourse.student_id)))
+        .join(Course, Course.id == StudentCourse.course_id)
+        .where(Course.semester_id == semester_id)
+    )
+
+
+async def _acceptance_latency(db: AsyncSession, semester_id: int) -> dict:
+    latency = _latency_seconds(db)
+    columns = [func.count(), func.avg(latency)]
+    # SQLite has no ordered-set aggregates, so percentiles are Postgres only.
+    if db.bind.dialect.name != "sqlite":
+        columns += [
+            func.percentile_cont(0.5).within_group(latency),
+            func.percentile_cont(0.9).within_group(latency),
+        ]
+
+    row = (
+        await db.execute(
+            select(*columns)
+            .join(StudyGroup, StudyGroup.id == StudyGroupMember.study_group_id)
+            .where(
+                StudyGroup.semester_id == semester_id,
+                StudyGroupMember.requested_at.is_not(None),
+            )
+        )
+    ).one()
+    count, mean, median, p90 = (*row, None, None)[:4]
+
+    def seconds(value):
+        return None if value is None else round(float(value), 1)
+
+    return {
+        "accepted": count,
+        "mean_seconds": seconds(mean),
+        "median_seconds": seconds(median),
+        "p90_seconds": seconds(p90),
+    }
+
+
+async def compute(db: AsyncSession, semester_id: int) -> dict:
+    courses = await _courses(db, semester_id)
+    capacity = sum(c["capacity"] for c in courses)
+    members = sum(c["member_count"] for c in courses)
+
+    return {
+        "summary": {
+            "course_count": len(courses),
+            "group_count": sum(c["group_count"] for c in courses),
+            "capacity": capacity,
+            "member_count": members,
+            "fill_rate": members / capacity if capacity else None,
+            "full_groups": sum(c["full_groups"] for c in courses),
+            "pending_requests": sum(c["pending_requests"] for c in courses),
+            "enrolled_students": await _enrolled_students(db, semester_id),
+            "active_students": await _active_students(db, semester_id),
+            "acceptance_latency": await _acceptance_latency(db, semester_id),
+        },
+        "courses": courses,
+    }
+
+
+async def store(db: AsyncSession, semester_id: int) -> SemesterAnalytics:
+    # Computes and upserts the semester's entry in the caller's transaction.
+    values = {
+        "semester_id": semester_id,
+        "payload": await compute(db, semester_id),
+        "stale": False,
+        "computed_at": datetime.now(timezone.utc),
+    }
+    await db.execute(
+        dialect_insert(db)(SemesterAnalytics)
+        .values(**values)
+        .on_conflict_do_update(index_elements=["semester_id"], set_=values)
+    )
+    return SemesterAnalytics(**values)
+
+
+async def _recompute(semester_id: int) -> SemesterAnalytics:
+    async with AsyncSessionLocal() as db:
+        analytics = await store(db, semester_id)
+        await db.commit()
+        return analytics
+
+
+async def semester_analytics(semester_id: int, archived: bool = False) -> SemesterAnalytics:
+    # Archived semesters no longer have rows in the tables compute() reads,
+    # so their entry, taken when they were archived, never expires.
+    now = datetime.now(timezone.utc)
+    query = select(SemesterAnalytics).where(SemesterAnalytics.semester_id == semester_id)
+    if not archived:
+        query = query.where(
+            SemesterAnalytics.computed_at > now - CACHE_TTL,
+            or_(
+                SemesterAnalytics.stale.is_(False),
+                SemesterAnalytics.computed_at > now - STALE_GRACE,
+            ),
+        )
+
+    async with AsyncSessionLocal() as db:
+        cached = await db.scalar(query)
+    if cached is not None:
+        return cached
+
+    return await semester_flight.do(semester_id, lambda: _recompute(semester_id))
+
+
+async def mark_stale(db: AsyncSession, semester_ids: Iterable[int]) -> None:
+    # Part of the caller's transaction.
+    semester_ids = set(semester_ids)
+    if semester_ids:
+        await db.execute(
+            update(SemesterAnalytics)
+            .where(
+                SemesterAnalytics.semester_id.in_(semester_ids),
+                SemesterAnalytics.stale.is_(False),
+            )
+            .values(stale=True)
+        )
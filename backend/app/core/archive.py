@@ -0,0 +1,231 @@
+import argparse
+import asyncio
+from datetime import datetime, timezone
+
+from sqlalchemy import select, delete, insert, literal
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import analytics, rollups
+from app.deps.db import AsyncSessionLocal, dispose_engines
+from app.schemas.models import (
+    ArchivedCourse,
+    ArchivedStudentCourse,
+    ArchivedStudyGroup,
+    ArchivedStudyGroupJoinRequest,
+    ArchivedStudyGroupMember,
+    Course,
+    CourseActivity,
+    Semester,
+    StudentCourse,
+    StudyGroup,
+    StudyGroupJoinRequest,
+    StudyGroupMember,
+    StudyGroupRecommendation,
+)
+
+# A semester moves between the hot and archived_* tables as one unit, in a
+# single transaction. Children are moved before their parents, so foreign
+# keys hold throughout (the archive tables only point at semesters and
+# students).
+#
+# Archiving moves each table with one statement on Postgres:
+#
+#   WITH moved AS (DELETE FROM ... RETURNING ...) INSERT INTO archived_... SELECT ... FROM moved
+#
+# so a row committed by someone else mid-archive is either moved or left
+# alone, never deleted without a copy. On SQLite the copy's INSERT takes
+# the write lock (see app.deps.db), so nothing commits between the copy and
+# the DELETE.
+
+GROUP_COLUMNS = [
+    "id", "semester_id", "course_id", "owner_id", "capacity", "isPrivate",
+    "location", "meeting_time", "meeting_day", "duration_minutes",
+    "schedule_start", "schedule_end", "is_recurring",
+]
+
+
+def _columns(model, names):
+    return [getattr(model, name) for name in names]
+
+
+async def _semester(db: AsyncSession, semester_id: int) -> Semester:
+    semester = await db.get(Semester, semester_id, with_for_update=True)
+    if semester is None:
+        raise ValueError(f"Semester {semester_id} does not exist")
+    return semester
+
+
+async def _move(db: AsyncSession, model, archived, names: list[str], where, semester_id: int) -> int:
+    # Moves the rows of model matching where into archived, stamped with
+    # semester_id. Returns how many moved.
+    target = [*names, "semester_id"]
+    if db.bind.dialect.name == "postgresql":
+        moved = (
+            delete(model).where(where).returning(*_columns(model, names)).cte("moved")
+        )
+        statement = insert(archived).from_select(
+            target, select(*moved.c, literal(semester_id))
+        ).add_cte(moved)
+        return (await db.execute(statement)).rowcount
+
+    await db.execute(
+        insert(archived).from_select(
+            target, select(*_columns(model, names), literal(semester_id)).where(where)
+        )
+    )
+    return (await db.execute(delete(model).where(where))).rowcount
+
+
+async def archive_semester(db: AsyncSession, semester_id: int) -> dict[str, int]:
+    semester = await _semester(db, semester_id)
+    if semester.archived_at is not None:
+        raise ValueError(f"Semester {semester_id} is already archived")
+
+    course_ids = select(Course.id).where(Course.semester_id == semester_id)
+    group_ids = select(StudyGroup.id).where(StudyGroup.course_id.in_(course_ids))
+
+    # Final stats, served as-is once the hot rows are gone.
+    await analytics.store(db, semester_id)
+
+    counts = {}
+    counts["join_requests"] = await _move(
+        db, StudyGroupJoinRequest, ArchivedStudyGroupJoinRequest,
+        ["id", "study_group_id", "student_id", "created_at", "message"],
+        StudyGroupJoinRequest.study_group_id.in_(group_ids), semester_id,
+    )
+    counts["members"] = await _move(
+        db, StudyGroupMember, ArchivedStudyGroupMember,
+        ["study_group_id", "student_id", "joined_at", "requested_at"],
+        StudyGroupMember.study_group_id.in_(group_ids), semester_id,
+    )
+    counts["recommendations"] = (
+        await db.execute(
+            delete(StudyGroupRecommendation)
+            .where(StudyGroupRecommendation.study_group_id.in_(group_ids))
+        )
+    ).rowcount
+    counts["study_groups"] = await _move(
+        db, StudyGroup, ArchivedStudyGroup,
+        [name for name in GROUP_COLUMNS if name != "semester_id"],
+        StudyGroup.course_id.in_(course_ids), semester_id,
+    )
+    counts["enrollments"] = await _move(
+        db, StudentCourse, ArchivedStudentCourse,
+        ["student_id", "course_id", "created_at"],
+        StudentCourse.course_id.in_(course_ids), semester_id,
+    )
+    counts["course_activity"] = (
+        await db.execute(
+            delete(CourseActivity).where(CourseActivity.semester_id == semester_id)
+        )
+    ).rowcount
+    counts["courses"] = await _move(
+        db, Course, ArchivedCourse,
+        ["id", "department", "course_number", "professor"],
+        Course.semester_id == semester_id, semester_id,
+    )
+
+    semester.archived_at = datetime.now(timezone.utc)
+    await db.commit()
+    return counts
+
+
+async def restore_semester(db: AsyncSession, semester_id: int) -> dict[str, int]:
+    semester = await _semester(db, semester_id)
+    if semester.archived_at is None:
+        raise ValueError(f"Semester {semester_id} is not archived")
+
+    await db.execute(
+        insert(Course).from_select(
+            ["id", "semester_id", "department", "course_number", "professor"],
+            select(
+                ArchivedCourse.id, ArchivedCourse.semester_id, ArchivedCourse.department,
+                ArchivedCourse.course_number, ArchivedCourse.professor,
+            ).where(ArchivedCourse.semester_id == semester_id),
+        )
+    )
+    await db.execute(
+        insert(StudentCourse).from_select(
+            ["student_id", "course_id", "created_at"],
+            select(
+                ArchivedStudentCourse.student_id, ArchivedStudentCourse.course_id,
+                ArchivedStudentCourse.created_at,
+            ).where(ArchivedStudentCourse.semester_id == semester_id),
+        )
+    )
+    # Core inserts skip the ORM schedule listener, which is fine here: the
+    # normalized columns are copied back as they were archived.
+    await db.execute(
+        insert(StudyGroup).from_select(
+            GROUP_COLUMNS,
+            select(*_columns(ArchivedStudyGroup, GROUP_COLUMNS))
+            .where(ArchivedStudyGroup.semester_id == semester_id),
+        )
+    )
+    await db.execute(
+        insert(StudyGroupMember).from_select(
+            ["study_group_id", "student_id", "joined_at", "requested_at"],
+            select(
+                ArchivedStudyGroupMember.study_group_id,
+                ArchivedStudyGroupMember.student_id,
+                ArchivedStudyGroupMember.joined_at,
+                ArchivedStudyGroupMember.requested_at,
+            ).where(ArchivedStudyGroupMember.semester_id == semester_id),
+        )
+    )
+    await db.execute(
+        insert(StudyGroupJoinRequest).from_select(
+            ["id", "study_group_id", "student_id", "created_at", "message"],
+            select(
+                ArchivedStudyGroupJoinRequest.id,
+                ArchivedStudyGroupJoinRequest.study_group_id,
+                ArchivedStudyGroupJoinRequest.student_id,
+                ArchivedStudyGroupJoinRequest.created_at,
+                ArchivedStudyGroupJoinRequest.message,
+            ).where(ArchivedStudyGroupJoinRequest.semester_id == semester_id),
+        )
+    )
+
+    counts = {}
+    for name, model in [
+        ("join_requests", ArchivedStudyGroupJoinRequest),
+        ("members", ArchivedStudyGroupMember),
+        ("study_groups", ArchivedStudyGroup),
+        ("enrollments", ArchivedStudentCourse),
+        ("courses", ArchivedCourse),
+    ]:
+        counts[name] = (
+            await db.execute(delete(model).where(model.semester_id == semester_id))
+        ).rowcount
+
+    semester.archived_at = None
+    await db.commit()
+
+    course_ids = (
+        await db.scalars(select(Course.id).where(Course.semester_id == semester_id))
+    ).all()
+    await rollups.refresh_courses(db, course_ids)
+    return counts
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Move a semester between the hot and archive tables."
+    )
+    parser.add_argument("action", choices=["archive", "restore"])
+    parser.add_argument("semester_id", type=int)
+    args = parser.parse_args()
+
+    action = archive_semester if args.action == "archive" else restore_semester
+    try:
+        async with AsyncSessionLocal() as db:
+            counts = await action(db, args.semester_id)
+    finally:
+        await dispose_engines()
+
+    for name, count in counts.items():
+        print(f"{name}: {count}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta, timezone
+from typing import Iterable
+
+from sqlalchemy import delete, exists, func, insert, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute, aliased
+
+from app.core import jobs
+from app.deps.db import AsyncSessionLocal
+from app.schemas.models import ChangeLog
+
+# Per-student change feed. Handlers record a row for every student whose
+# view of an entity changed, in the same transaction as the change itself;
+# clients poll GET /changes?since=<cursor> and refetch only what moved.
+#
+# A cursor is a position in commit order. On SQLite writers take turns
+# (see app.deps.db), so that is the row id. On Postgres, ids are handed
+# out at INSERT but become visible at COMMIT, possibly out of order, so a
+# client that moved past id N could miss N-1 committing later. There the
+# position is the writing transaction's id instead, and only positions
+# below the snapshot's xmin are served. Every transaction below xmin has
+# finished, and anything that commits later has a position at or above it.
+
+STUDY_GROUP = "study_group"
+MEMBERSHIP = "membership"  # entity_id is the study group id
+JOIN_REQUEST = "join_request"
+ENROLLMENT = "enrollment"  # entity_id is the course id
+
+UPSERT = "upsert"
+DELETE = "delete"
+
+RETENTION = timedelta(days=14)
+# Entries younger than this are never collapsed, so a client mid-poll never
+# sees a cursor range rewritten under it.
+COMPACT_AFTER = timedelta(hours=1)
+COMPACT_INTERVAL_SECONDS = 60 * 60
+
+
+def position(db: AsyncSession) -> InstrumentedAttribute:
+    return ChangeLog.xact_id if db.bind.dialect.name == "postgresql" else ChangeLog.id
+
+
+async def horizon(db: AsyncSession) -> int | None:
+    # Positions below this have settled; None if they all have.
+    if db.bind.dialect.name != "postgresql":
+        return None
+    return await db.scalar(text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint"))
+
+
+async def head(db: AsyncSession) -> int:
+    # A cursor that has seen everything committed so far.
+    settled = await horizon(db)
+    if settled is not None:
+        return settled - 1
+    return await db.scalar(select(func.coalesce(func.max(ChangeLog.id), 0)))
+
+
+def record(
+    db: AsyncSession,
+    student_ids: Iterable[int],
+    entity: str,
+    entity_id: int,
+    op: str = UPSERT,
+) -> None:
+    db.add_all(
+        ChangeLog(student_id=student_id, entity=entity, entity_id=entity_id, op=op)
+        for student_id in set(student_ids)
+    )
+
+
+async def record_many(
+    db: AsyncSession,
+    entries: Iterable[tuple[int, str, int]],
+    op: str = UPSERT,
+) -> None:
+    # record() for large batches of (student_id, entity, entity_id): one
+    # bulk INSERT rather than an ORM object per row.
+    rows = [
+        {"student_id": student_id, "entity": entity, "entity_id": entity_id, "op": op}
+        for student_id, entity, entity_id in set(entries)
+    ]
+    if rows:
+        await db.execute(insert(ChangeLog), rows)
+
+
+@jobs.handler("changes.compact", every=COMPACT_INTERVAL_SECONDS)
+async def compact() -> None:
+    now = datetime.now(timezone.utc)
+    newer = aliased(ChangeLog)
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            delete(ChangeLog).where(ChangeLog.created_at < now - RETENTION)
+        )
+
+        # Only the latest entry per (student, entity, entity_id) matters to a
+        # client, whatever cursor it holds. Latest by position, not id.
+        key = position(db).key
+        await db.execute(
+            delete(ChangeLog)
+            .where(
+                ChangeLog.created_at < now - COMPACT_AFTER,
+                exists(
+                    select(newer.id).where(
+                        newer.student_id == ChangeLog.student_id,
+                        newer.entity == ChangeLog.entity,
+                        newer.entity_id == ChangeLog.entity_id,
+                        tuple_(getattr(newer, key), newer.id)
+                        > tuple_(getattr(ChangeLog, key), ChangeLog.id),
+                    )
+                ),
+            )
+        )
+        await db.commit()
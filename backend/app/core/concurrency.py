@@ -0,0 +1,205 @@
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+
+from app.core import tenancy, tracing
+
+# Adaptive limit on the number of requests a worker serves at once. When
+# the database slows down, requests queue behind get_db and every one of
+# them gets slow; past the limit, new requests are turned away straight
+# away with a 503 and Retry-After instead, so the ones admitted stay fast.
+#
+# The limit is AIMD over WINDOW_SECONDS windows: if more than
+# CONGESTED_FRACTION of the window's requests waited longer than
+# DB_WAIT_TARGET_MS for a pooled connection (or, on SQLite, the write
+# lock), or took longer than LATENCY_TARGET_MS to start responding, it is
+# cut by BACKOFF; if not, and the window used at least half of it, it grows
+# by INCREASE. Lower priorities may only fill part of the limit, so they
+# are shed first: browsing goes before reads, reads before writes, and
+# logins and signups last. Each tenant has its own limit, so one campus's
+# rush only sheds that campus's requests.
+
+ENABLED = os.getenv("CONCURRENCY_LIMIT", "1") == "1"
+INITIAL_LIMIT = int(os.getenv("CONCURRENCY_INITIAL_LIMIT", "64"))
+MIN_LIMIT = int(os.getenv("CONCURRENCY_MIN_LIMIT", "8"))
+MAX_LIMIT = int(os.getenv("CONCURRENCY_MAX_LIMIT", "512"))
+DB_WAIT_TARGET_MS = float(os.getenv("CONCURRENCY_DB_WAIT_TARGET_MS", "50"))
+LATENCY_TARGET_MS = float(os.getenv("CONCURRENCY_LATENCY_TARGET_MS", "1000"))
+WINDOW_SECONDS = 1.0
+CONGESTED_FRACTION = 0.1
+BACKOFF = 0.8
+INCREASE = 2
+
+
+@dataclass(frozen=True)
+class Priority:
+    name: str
+    # Share of the limit requests of this priority may fill.
+    share: float
+    retry_after: int
+
+
+AUTH = Priority("auth", 1.0, 1)
+WRITE = Priority("write", 0.9, 1)
+READ = Priority("read", 0.75, 2)
+BROWSE = Priority("browse", 0.5, 5)
+
+PRIORITIES = [AUTH, WRITE, READ, BROWSE]
+
+# Expensive reads nobody is waiting on to get their work done.
+BROWSE_PREFIXES = (
+    "/course/search",
+    "/course/browse",
+    "/study-group/search",
+    "/schedule",
+    "/recommendations",
+    "/archive",
+    "/export",
+    "/analytics",
+    "/calendar",
+)
+
+# Never limited, so the limiter itself can be watched under load. Only
+# callers with METRICS_TOKEN get past /metrics' auth (see deps.auth).
+EXEMPT_PREFIXES = ("/metrics",)
+
+# Time the current request has spent waiting for the database.
+_db_wait: ContextVar[list[float] | None] = ContextVar("concurrency_db_wait", default=None)
+
+
+def classify(method: str, path: str) -> Priority:
+    if path.startswith("/auth/"):
+        return AUTH
+    if method not in ("GET", "HEAD", "OPTIONS"):
+        return WRITE
+    if path.startswith(BROWSE_PREFIXES):
+        return BROWSE
+    return READ
+
+
+@contextmanager
+def db_wait():
+    # Wraps anywhere a request queues for the database.
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        waited = _db_wait.get()
+        if waited is not None:
+            waited[0] += time.perf_counter() - started
+
+
+class MeasuredPool(tracing.TracedPool):
+    def connect(self):
+        with db_wait():
+            return super().connect()
+
+
+class AdaptiveLimiter:
+    def __init__(self, limit: int = INITIAL_LIMIT):
+        self.limit = float(limit)
+        self.in_flight = 0
+        self.admitted = defaultdict(int)
+        self.shed = defaultdict(int)
+        self._window_started = time.monotonic()
+        self._samples = 0
+        self._congested = 0
+        self._peak = 0
+
+    def try_acquire(self, priority: Priority) -> bool:
+        if self.in_flight >= max(int(self.limit * priority.share), 1):
+            self.shed[priority.name] += 1
+            return False
+
+        self.in_flight += 1
+        self._peak = max(self._peak, self.in_flight)
+        self.admitted[priority.name] += 1
+        return True
+
+    def release(self, latency: float, db_wait: float) -> None:
+        self.in_flight -= 1
+        self._samples += 1
+        if db_wait * 1000 > DB_WAIT_TARGET_MS or latency * 1000 > LATENCY_TARGET_MS:
+            self._congested += 1
+
+        now = time.monotonic()
+        if now - self._window_started >= WINDOW_SECONDS:
+            self._adjust()
+            self._window_started = now
+            self._samples = self._congested = 0
+            self._peak = self.in_flight
+
+    def _adjust(self) -> None:
+        if self._congested > self._samples * CONGESTED_FRACTION:
+            self.limit = max(self.limit * BACKOFF, MIN_LIMIT)
+        elif self._peak >= self.limit / 2:
+            # Only a limit that's actually being used has earned more room.
+            self.limit = min(self.limit + INCREASE, MAX_LIMIT)
+
+    def stats(self) -> dict:
+        return {
+            "limit": round(self.limit, 1),
+            "in_flight": self.in_flight,
+            "priorities": {
+                p.name: {
+                    "max_in_flight": max(int(self.limit * p.share), 1),
+                    "admitted": self.admitted[p.name],
+                    "shed": self.shed[p.name],
+                }
+                for p in PRIORITIES
+            },
+        }
+
+
+limiters = tenancy.TenantLocal(AdaptiveLimiter)
+
+
+class ConcurrencyLimitMiddleware:
+    # Plain ASGI so the slot is held until the response has been sent and
+    # the wait counter is visible to the route's database calls.
+    def __init__(self, app, limiters: tenancy.TenantLocal[AdaptiveLimiter] = limiters):
+        self.app = app
+        self.limiters = limiters
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not ENABLED
+            or scope["path"].startswith(EXEMPT_PREFIXES)
+        ):
+            return await self.app(scope, receive, send)
+
+        limiter = self.limiters.get()
+        priority = classify(scope["method"], scope["path"])
+        if not limiter.try_acquire(priority):
+            response = JSONResponse(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                content={"detail": "Server busy, try again shortly"},
+                headers={"Retry-After": str(priority.retry_after)},
+            )
+            return await response(scope, receive, send)
+
+        started = time.perf_counter()
+        responded = None
+        waited = [0.0]
+
+        # Latency is time to the first byte; a streamed body (exports) can
+        # take as long as it likes without counting as congestion.
+        async def send_timed(message):
+            nonlocal responded
+            if message["type"] == "http.response.start" and responded is None:
+                responded = time.perf_counter()
+            await send(message)
+
+        token = _db_wait.set(waited)
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            _db_wait.reset(token)
+            limiter.release((responded or time.perf_counter()) - started, waited[0])
@@ -0,0 +1,300 @@
+import argparse
+import asyncio
+import csv
+import re
+import sys
+from collections import defaultdict
+from dataclasses import dataclass, field, replace
+from itertools import chain, islice
+from typing import Iterable, Iterator, TextIO
+
+from sqlalchemy import select, func, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import changes, jobs, recommendations
+from app.deps.db import AsyncSessionLocal, dialect_insert, dispose_engines
+from app.schemas.models import Course, Student, StudentCourse
+
+# Bulk enrollment from a schedule file. Students upload their own schedule
+# through POST /course/enrollments; the registrar loads a whole student
+# body with `python -m app.core.enrollment`, which streams the file in
+# batches of BATCH_SIZE rows.
+#
+# CSV files need department and course_number columns (or a single course
+# column such as "CS 61A"); the CLI also needs an email column, or
+# --student for a single student's file. iCalendar files are read from
+# each event's SUMMARY, e.g. "COMPSCI 61A LEC 001".
+
+BATCH_SIZE = 1000
+
+# Limits on a student's own upload; a real schedule is a handful of courses.
+MAX_UPLOAD_BYTES = 256 * 1024
+MAX_STUDENT_COURSES = 50
+
+COURSE_CODE = re.compile(r"^\s*([A-Za-z][A-Za-z &]*?)\s*(\d+[A-Za-z]*)\b")
+
+
+@dataclass(frozen=True)
+class Entry:
+    department: str
+    course_number: str
+    email: str | None = None
+
+    @property
+    def course(self) -> tuple[str, str]:
+        return self.department, self.course_number
+
+    def __str__(self) -> str:
+        return f"{self.department} {self.course_number}"
+
+
+@dataclass
+class ImportResult:
+    enrolled: int = 0
+    already_enrolled: int = 0
+    # Distinct codes and emails, so these stay small however long the file.
+    unmatched: set[str] = field(default_factory=set)
+    unknown_students: set[str] = field(default_factory=set)
+
+
+def _entry(department: str, course_number: str, email: str | None = None) -> Entry:
+    return Entry(
+        department=" ".join(department.split()).upper(),
+        course_number=course_number.strip().upper(),
+        email=email.strip().lower() if email else None,
+    )
+
+
+def parse_course_code(code: str) -> tuple[str, str] | None:
+    match = COURSE_CODE.match(code)
+    return (match.group(1), match.group(2)) if match else None
+
+
+def parse_csv(lines: Iterable[str]) -> Iterator[Entry]:
+    reader = csv.DictReader(lines)
+    fields = {name.strip().lower(): name for name in reader.fieldnames or []}
+
+    if "department" in fields and "course_number" in fields:
+        def code(row):
+            return row[fields["department"]] or "", row[fields["course_number"]] or ""
+    elif "course" in fields:
+        def code(row):
+            return parse_course_code(row[fields["course"]] or "") or ("", "")
+    else:
+        raise ValueError("CSV needs department and course_number columns, or a course column")
+
+    for row in reader:
+        department, course_number = code(row)
+        if department.strip() and course_number.strip():
+            email = row.get(fields["email"]) if "email" in fields else None
+            yield _entry(department, course_number, email)
+
+
+def _unfold(lines: Iterable[str]) -> Iterator[str]:
+    # RFC 5545 folds long lines; continuations start with a space or tab.
+    pending = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and pending is not None:
+            pending += line[1:]
+            continue
+        if pending is not None:
+            yield pending
+        pending = line
+    if pending is not None:
+        yield pending
+
+
+def parse_ics(lines: Iterable[str]) -> Iterator[Entry]:
+    seen = set()
+    in_event = False
+
+    for line in _unfold(lines):
+        name, _, value = line.partition(":")
+        name = name.split(";", 1)[0].upper()
+
+        if name == "BEGIN" and value.upper() == "VEVENT":
+            in_event = True
+        elif name == "END" and value.upper() == "VEVENT":
+            in_event = False
+        elif in_event and name == "SUMMARY":
+            code = parse_course_code(value.replace("\\,", ",").replace("\\;", ";"))
+            # Each meeting of a course is its own event in most exports.
+            if code and (entry := _entry(*code)) not in seen:
+                seen.add(entry)
+                yield entry
+
+
+def parse(lines: Iterable[str], fmt: str) -> Iterator[Entry]:
+    return parse_ics(lines) if fmt == "ics" else parse_csv(lines)
+
+
+def detect_format(filename: str | None, head: str) -> str:
+    if (filename or "").lower().endswith((".ics", ".ical", ".ifb")):
+        return "ics"
+    if head.lstrip().upper().startswith("BEGIN:VCALENDAR"):
+        return "ics"
+    return "csv"
+
+
+async def resolve_courses(
+    db: AsyncSession,
+    semester_id: int,
+    codes: Iterable[tuple[str, str]],
+) -> dict[tuple[str, str], int]:
+    # One lookup for every course code in the batch, case-insensitively.
+    codes = set(codes)
+    if not codes:
+        return {}
+
+    rows = await db.execute(
+        select(Course.id, func.upper(Course.department), func.upper(Course.course_number))
+        .where(
+            Course.semester_id == semester_id,
+            tuple_(func.upper(Course.department), func.upper(Course.course_number)).in_(codes),
+        )
+    )
+    return {(department, number): course_id for course_id, department, number in rows}
+
+
+async def enroll(
+    db: AsyncSession,
+    links: set[tuple[int, int]],
+    result: ImportResult,
+) -> list[tuple[int, int]]:
+    # Inserts (student_id, course_id) links in the caller's transaction and
+    # returns the ones that weren't there already.
+    if not links:
+        return []
+
+    inserted = (
+        await db.execute(
+            dialect_insert(db)(StudentCourse)
+            .values([{"student_id": s, "course_id": c} for s, c in links])
+            .on_conflict_do_nothing()
+            .returning(StudentCourse.student_id, StudentCourse.course_id)
+        )
+    ).all()
+    result.enrolled += len(inserted)
+    result.already_enrolled += len(links) - len(inserted)
+
+    by_course = defaultdict(set)
+    for student_id, course_id in inserted:
+        by_course[course_id].add(student_id)
+
+    for course_id, student_ids in by_course.items():
+        changes.record(db, student_ids, changes.ENROLLMENT, course_id)
+
+    if inserted:
+        jobs.enqueue(
+            db,
+            recommendations.refresh_after_enrollment_change,
+            student_ids=sorted({student_id for student_id, _ in inserted}),
+        )
+    return inserted
+
+
+async def import_for_student(
+    db: AsyncSession,
+    student_id: int,
+    semester_id: int,
+    entries: list[Entry],
+) -> tuple[ImportResult, list[int]]:
+    # Enrolls one student; returns the ids of the courses newly added.
+    result = ImportResult()
+    courses = await resolve_courses(db, semester_id, (e.course for e in entries))
+
+    links = set()
+    for entry in entries:
+        course_id = courses.get(entry.course)
+        if course_id is None:
+            result.unmatched.add(str(entry))
+        else:
+            links.add((student_id, course_id))
+
+    inserted = await enroll(db, links, result)
+    await db.commit()
+    return result, [course_id for _, course_id in inserted]
+
+
+async def import_stream(
+    semester_id: int,
+    entries: Iterator[Entry],
+    batch_size: int = BATCH_SIZE,
+) -> ImportResult:
+    # Registrar import: every entry names its student by email. Each batch
+    # is resolved and committed on its own, so memory stays flat and a bad
+    # row late in the file doesn't undo the batches before it.
+    result = ImportResult()
+    courses: dict[tuple[str, str], int | None] = {}
+
+    async with AsyncSessionLocal() as db:
+        while batch := list(islice(entries, batch_size)):
+            missing = {e.course for e in batch} - courses.keys()
+            found = await resolve_courses(db, semester_id, missing)
+            courses.update({code: found.get(code) for code in missing})
+
+            emails = {e.email for e in batch if e.email}
+            students = dict(
+                (await db.execute(
+                    select(func.lower(Student.email), Student.id)
+                    .where(func.lower(Student.email).in_(emails))
+                )).all()
+            ) if emails else {}
+
+            links = set()
+            for entry in batch:
+                student_id = students.get(entry.email)
+                course_id = courses[entry.course]
+                if student_id is None:
+                    result.unknown_students.add(entry.email or "")
+                elif course_id is None:
+                    result.unmatched.add(str(entry))
+                else:
+                    links.add((student_id, course_id))
+
+            await enroll(db, links, result)
+            await db.commit()
+            print(
+                f"{result.enrolled} enrolled, {result.already_enrolled} already enrolled",
+                file=sys.stderr,
+            )
+
+    return result
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Bulk-enroll students from a schedule file.")
+    parser.add_argument("semester_id", type=int)
+    parser.add_argument("file", help="CSV or iCalendar file, or - for stdin")
+    parser.add_argument("--format", choices=["csv", "ics"])
+    parser.add_argument("--student", metavar="EMAIL", help="student for rows without an email (e.g. an .ics file)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    stream: TextIO = sys.stdin if args.file == "-" else open(args.file, newline="", encoding="utf-8-sig")
+    try:
+        with stream:
+            head = stream.readline()
+            fmt = args.format or detect_format(args.file, head)
+            entries = parse(chain([head], stream), fmt)
+            if args.student:
+                default = args.student.strip().lower()
+                entries = (replace(e, email=e.email or default) for e in entries)
+            result = await import_stream(args.semester_id, entries, args.batch_size)
+    finally:
+        await dispose_engines()
+
+    for code in sorted(result.unmatched):
+        print(f"unknown course: {code}", file=sys.stderr)
+    for email in sorted(result.unknown_students):
+        print(f"unknown student: {email or '(no email)'}", file=sys.stderr)
+    print(
+        f"done: {result.enrolled} enrolled, {result.already_enrolled} already enrolled, "
+        f"{len(result.unmatched)} unknown courses, {len(result.unknown_students)} unknown students",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,149 @@
+import argparse
+import asyncio
+import csv
+import io
+import json
+import sys
+from datetime import datetime
+from typing import AsyncIterator
+
+from sqlalchemy import select
+
+from app.deps.db import AsyncSessionLocal, dispose_engines
+from app.schemas.models import (
+    Course,
+    Student,
+    StudyGroup,
+    StudyGroupJoinRequest,
+    StudyGroupMember,
+)
+
+# Semester exports for admins. Rows come off a server-side cursor in
+# batches of BATCH_SIZE and each batch is encoded and handed on before the
+# next is fetched, so memory stays flat however large the semester is.
+
+BATCH_SIZE = 1000
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _study_groups(semester_id: int):
+    return (
+        select(
+            StudyGroup.id,
+            StudyGroup.course_id,
+            Course.department,
+            Course.course_number,
+            StudyGroup.owner_id,
+            StudyGroup.location,
+            StudyGroup.meeting_time,
+            StudyGroup.meeting_day,
+            StudyGroup.duration_minutes,
+            StudyGroup.capacity,
+            StudyGroup.isPrivate,
+        )
+        .join(Course, Course.id == StudyGroup.course_id)
+        .where(StudyGroup.semester_id == semester_id)
+        .order_by(StudyGroup.id)
+    )
+
+
+def _members(semester_id: int):
+    return (
+        select(
+            StudyGroupMember.study_group_id,
+            Student.id.label("student_id"),
+            Student.email,
+            Student.major,
+            Student.class_year,
+        )
+        .join(StudyGroup, StudyGroup.id == StudyGroupMember.study_group_id)
+        .join(Student, Student.id == StudyGroupMember.student_id)
+        .where(StudyGroup.semester_id == semester_id)
+        .order_by(StudyGroupMember.study_group_id, Student.id)
+    )
+
+
+def _requests(semester_id: int):
+    return (
+        select(
+            StudyGroupJoinRequest.id,
+            StudyGroupJoinRequest.study_group_id,
+            StudyGroupJoinRequest.student_id,
+            Student.email,
+            StudyGroupJoinRequest.created_at,
+            StudyGroupJoinRequest.message,
+        )
+        .join(StudyGroup, StudyGroup.id == StudyGroupJoinRequest.study_group_id)
+        .join(Student, Student.id == StudyGroupJoinRequest.student_id)
+        .where(StudyGroup.semester_id == semester_id)
+        .order_by(StudyGroupJoinRequest.id)
+    )
+
+
+DATASETS = {
+    "study_groups": _study_groups,
+    "members": _members,
+    "requests": _requests,
+}
+
+
+def _value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _encode_ndjson(columns: list[str], rows) -> bytes:
+    return "".join(
+        json.dumps({c: _value(v) for c, v in zip(columns, row)}) + "\n"
+        for row in rows
+    ).encode()
+
+
+def _encode_csv(columns: list[str], rows) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_value(v) for v in row] for row in rows)
+    return buffer.getvalue().encode()
+
+
+async def stream_export(
+    dataset: str,
+    semester_id: int,
+    fmt: str = "ndjson",
+) -> AsyncIterator[bytes]:
+    statement = DATASETS[dataset](semester_id)
+    columns = [column.name for column in statement.selected_columns]
+    encode = _encode_csv if fmt == "csv" else _encode_ndjson
+
+    if fmt == "csv":
+        yield _encode_csv(columns, [columns])
+
+    # Its own session: a StreamingResponse body is still being produced
+    # after the request's dependencies have been torn down.
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(
+            statement.execution_options(yield_per=BATCH_SIZE)
+        )
+        async for rows in result.partitions():
+            yield encode(columns, rows)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Export a semester's data.")
+    parser.add_argument("semester_id", type=int)
+    parser.add_argument("dataset", choices=sorted(DATASETS))
+    parser.add_argument("--format", choices=sorted(FORMATS), default="ndjson")
+    args = parser.parse_args()
+
+    try:
+        async for chunk in stream_export(args.dataset, args.semester_id, args.format):
+            sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+    finally:
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
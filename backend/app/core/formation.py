@@ -0,0 +1,316 @@
+import argparse
+import asyncio
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta, timezone
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import changes, jobs, recommendations, rollups
+from app.core.schedule import (
+    CAMPUS_TIMEZONE,
+    DEFAULT_DURATION_MINUTES,
+    meeting_slot,
+    minute_of_week,
+    week_shifts,
+)
+from app.deps.db import AsyncSessionLocal, dispose_engines
+from app.schemas.models import Course, Student, StudentCourse, StudyGroup, StudyGroupMember
+
+# Forms study groups for every enrolled student of a course who isn't in
+# one yet. Each group meets weekly in one of a set of candidate slots.
+#
+# Nobody enters their availability, so a student is taken to be free in a
+# slot unless it overlaps a weekly group they're already in (for any
+# course). The heuristic is linear in the number of students:
+#
+#  1. Students with the fewest free slots pick first. Each takes the free
+#     slot whose last group is closest to full, which packs groups
+#     tightly, or else the quietest one, which spreads groups over the
+#     week. Students with no free slot are left out.
+#  2. Slots left with fewer than MIN_GROUP_SIZE students hand them to
+#     another free slot that already has students.
+#  3. Each slot's students are split into as few groups as capacity
+#     allows, with sizes balanced. Dealing them out in (major, class
+#     year) order mixes majors and years within each group.
+#
+# Groups are written with bulk INSERTs in one transaction.
+
+MIN_GROUP_SIZE = 2
+DEFAULT_CAPACITY = 5
+DEFAULT_LOCATION = "To be decided"
+
+WEEKDAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+@dataclass(frozen=True)
+class Slot:
+    weekday: int  # Monday is 0
+    at: time
+
+    @property
+    def start(self) -> int:
+        return minute_of_week(self.weekday, self.at)
+
+    def __str__(self) -> str:
+        return f"{WEEKDAY_NAMES[self.weekday]} {self.at:%H:%M}"
+
+
+# Weekday late afternoons and evenings, and Sunday afternoon.
+DEFAULT_SLOTS = [
+    Slot(weekday, time(hour))
+    for weekday in range(4)
+    for hour in (16, 18, 20)
+] + [Slot(6, time(hour)) for hour in (14, 16, 18)]
+
+
+@dataclass
+class Candidate:
+    id: int
+    major: str | None
+    class_year: str | None
+    # Bit i is set if the student is free in slot i.
+    free: int
+
+
+@dataclass
+class Plan:
+    groups: list[tuple[Slot, list[int]]] = field(default_factory=list)
+    unplaced: list[int] = field(default_factory=list)
+
+
+def _overlaps(start: int, end: int, busy: list[tuple[int, int]]) -> bool:
+    return any(
+        start < busy_end and busy_start < end
+        for interval in busy
+        for busy_start, busy_end in week_shifts(*interval)
+    )
+
+
+def free_slots(slots: list[Slot], duration: int, busy: list[tuple[int, int]]) -> int:
+    mask = 0
+    for i, slot in enumerate(slots):
+        if not _overlaps(slot.start, slot.start + duration, busy):
+            mask |= 1 << i
+    return mask
+
+
+def plan_groups(
+    candidates: list[Candidate],
+    slots: list[Slot],
+    capacity: int = DEFAULT_CAPACITY,
+    min_size: int = MIN_GROUP_SIZE,
+) -> Plan:
+    plan = Plan()
+    buckets: list[list[Candidate]] = [[] for _ in slots]
+
+    def options(candidate: Candidate) -> list[int]:
+        return [i for i in range(len(slots)) if candidate.free >> i & 1]
+
+    # 1. Most constrained first, into the fullest open group.
+    for candidate in sorted(candidates, key=lambda c: (c.free.bit_count(), c.id)):
+        choices = options(candidate)
+        if not choices:
+            plan.unplaced.append(candidate.id)
+            continue
+        best = max(choices, key=lambda i: (len(buckets[i]) % capacity, -len(buckets[i])))
+        buckets[best].append(candidate)
+
+    # 2. Too few for a group: move to a free slot that has company.
+    for i, bucket in enumerate(buckets):
+        if 0 < len(bucket) < min_size:
+            for candidate in list(bucket):
+                others = [j for j in options(candidate) if j != i and buckets[j]]
+                if others:
+                    bucket.remove(candidate)
+                    buckets[max(others, key=lambda j: len(buckets[j]))].append(candidate)
+
+    # 3. Balanced groups per slot, dealt in (major, class year) order.
+    for slot, bucket in zip(slots, buckets):
+        if len(bucket) < min_size:
+            plan.unplaced += [candidate.id for candidate in bucket]
+            continue
+
+        count = -(-len(bucket) // capacity)
+        bucket.sort(key=lambda c: (c.major or "", c.class_year or "", c.id))
+        for g in range(count):
+            plan.groups.append((slot, [c.id for c in bucket[g::count]]))
+
+    return plan
+
+
+def first_meeting(slot: Slot, after: datetime) -> datetime:
+    # The next occurrence of the slot in campus time, in UTC.
+    local = after.astimezone(CAMPUS_TIMEZONE)
+    day = local.date() + timedelta(days=(slot.weekday - local.weekday()) % 7)
+    meeting = datetime.combine(day, slot.at, tzinfo=CAMPUS_TIMEZONE)
+    if meeting <= local:
+        meeting += timedelta(days=7)
+    return meeting.astimezone(timezone.utc)
+
+
+async def load_candidates(
+    db: AsyncSession,
+    course_id: int,
+    slots: list[Slot],
+    duration: int,
+) -> list[Candidate]:
+    grouped = (
+        select(StudyGroupMember.student_id)
+        .join(StudyGroup, StudyGroup.id == StudyGroupMember.study_group_id)
+        .where(StudyGroup.course_id == course_id)
+    )
+    students = (
+        await db.execute(
+            select(Student.id, Student.major, Student.class_year)
+            .join(StudentCourse, StudentCourse.student_id == Student.id)
+            .where(StudentCourse.course_id == course_id, Student.id.not_in(grouped))
+        )
+    ).all()
+    enrolled = select(StudentCourse.student_id).where(StudentCourse.course_id == course_id)
+
+    busy: dict[int, list[tuple[int, int]]] = {}
+    for student_id, start, end in await db.execute(
+        select(StudyGroupMember.student_id, StudyGroup.schedule_start, StudyGroup.schedule_end)
+        .join(StudyGroup, StudyGroup.id == StudyGroupMember.study_group_id)
+        .where(StudyGroupMember.student_id.in_(enrolled), StudyGroup.is_recurring.is_(True))
+    ):
+        busy.setdefault(student_id, []).append((start, end))
+
+    everything = (1 << len(slots)) - 1
+    return [
+        Candidate(
+            id=student_id,
+            major=major,
+            class_year=class_year,
+            free=free_slots(slots, duration, busy[student_id]) if student_id in busy else everything,
+        )
+        for student_id, major, class_year in students
+    ]
+
+
+async def write_groups(
+    db: AsyncSession,
+    course: Course,
+    plan: Plan,
+    location: str = DEFAULT_LOCATION,
+    duration: int = DEFAULT_DURATION_MINUTES,
+    capacity: int = DEFAULT_CAPACITY,
+    private: bool = True,
+) -> list[int]:
+    # Bulk INSERTs skip the ORM's schedule normalization, so the
+    # schedule_* columns are filled in here.
+    if not plan.groups:
+        return []
+
+    now = datetime.now(timezone.utc)
+    rows = []
+    for slot, members in plan.groups:
+        meeting_time = first_meeting(slot, now)
+        meeting_day = WEEKDAY_NAMES[slot.weekday]
+        start, end, recurring = meeting_slot(meeting_time, meeting_day, duration)
+        rows.append({
+            "owner_id": min(members),
+            "semester_id": course.semester_id,
+            "course_id": course.id,
+            "location": location,
+            "meeting_time": meeting_time,
+            "meeting_day": meeting_day,
+            "duration_minutes": duration,
+            "capacity": capacity,
+            "isPrivate": private,
+            "schedule_start": start,
+            "schedule_end": end,
+            "is_recurring": recurring,
+        })
+
+    group_ids = (
+        await db.scalars(
+            insert(StudyGroup).returning(StudyGroup.id, sort_by_parameter_order=True),
+            rows,
+        )
+    ).all()
+
+    memberships = [
+        (group_id, student_id)
+        for group_id, (_, members) in zip(group_ids, plan.groups)
+        for student_id in members
+    ]
+    await db.execute(
+        insert(StudyGroupMember),
+        [{"study_group_id": g, "student_id": s} for g, s in memberships],
+    )
+
+    await changes.record_many(db, (
+        (student_id, entity, group_id)
+        for group_id, student_id in memberships
+        for entity in (changes.STUDY_GROUP, changes.MEMBERSHIP)
+    ))
+    # The new groups are full, so only the members' own recommendations
+    # change.
+    jobs.enqueue(
+        db,
+        recommendations.refresh_after_enrollment_change,
+        student_ids=sorted(student_id for _, student_id in memberships),
+    )
+    jobs.enqueue(db, rollups.refresh_after_group_change, course_id=course.id)
+    return group_ids
+
+
+async def form_groups(
+    db: AsyncSession,
+    course: Course,
+    *,
+    capacity: int = DEFAULT_CAPACITY,
+    slots: list[Slot] = DEFAULT_SLOTS,
+    duration: int = DEFAULT_DURATION_MINUTES,
+    location: str = DEFAULT_LOCATION,
+    private: bool = True,
+    dry_run: bool = False,
+) -> tuple[Plan, list[int]]:
+    # Holds the course row (on Postgres) so two runs can't both place the
+    # same students.
+    await db.execute(select(Course.id).where(Course.id == course.id).with_for_update())
+
+    candidates = await load_candidates(db, course.id, slots, duration)
+    plan = plan_groups(candidates, slots, capacity)
+    if dry_run:
+        await db.rollback()
+        return plan, []
+
+    group_ids = await write_groups(db, course, plan, location, duration, capacity, private)
+    await db.commit()
+    return plan, group_ids
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Form study groups for a course's enrolled students.")
+    parser.add_argument("course_id", type=int)
+    parser.add_argument("--capacity", type=int, default=DEFAULT_CAPACITY)
+    parser.add_argument("--location", default=DEFAULT_LOCATION)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    try:
+        async with AsyncSessionLocal() as db:
+            course = await db.get(Course, args.course_id)
+            if course is None:
+                sys.exit(f"course {args.course_id} not found")
+
+            plan, _ = await form_groups(
+                db, course, capacity=args.capacity, location=args.location, dry_run=args.dry_run
+            )
+    finally:
+        await dispose_engines()
+
+    placed = sum(len(members) for _, members in plan.groups)
+    print(
+        f"{'would form' if args.dry_run else 'formed'} {len(plan.groups)} groups, "
+        f"{placed} students placed, {len(plan.unplaced)} left out",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,278 @@
+import hashlib
+import json
+import secrets
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+from sqlalchemy import delete, exists, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager
+
+from app.core import changes
+from app.core.schedule import CAMPUS_TIMEZONE, parse_day, to_campus_time
+from app.core.single_flight import SingleFlight
+from app.deps.db import AsyncSessionLocal, dialect_insert
+from app.schemas.models import CalendarFeed, ChangeLog, Course, StudyGroup, StudyGroupMember
+
+# Per-student iCalendar feeds of the groups a student is in, for calendar
+# apps to subscribe to. Apps can't send the session cookie, so a feed is
+# addressed by its own random token instead.
+#
+# Calendar apps poll every few minutes, so the rendered feed is stored in
+# calendar_feeds along with the student's change_log cursor at the time.
+# A poll costs one indexed lookup: the stored body is served (or a 304)
+# unless a study group or membership change has been logged for the
+# student past the stored change feed cursor, or the feed is older than
+# MAX_AGE.
+
+PRODID = "-//BearNet//Study Groups//EN"
+CALENDAR_NAME = "BearNet study groups"
+# Suggested polling interval, for the apps that honour it.
+REFRESH_INTERVAL = "PT1H"
+MAX_AGE = timedelta(days=1)
+# How far past this year the VTIMEZONE's transitions go. Feeds are
+# re-rendered at least every MAX_AGE, so this only needs to cover what
+# calendar apps show ahead.
+TIMEZONE_YEARS_AHEAD = 5
+FEED_ENTITIES = (changes.STUDY_GROUP, changes.MEMBERSHIP)
+WEEKDAYS = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+
+feed_flight = SingleFlight("calendar_feed")
+
+
+@dataclass(frozen=True)
+class Feed:
+    body: str
+    etag: str
+    modified_at: datetime
+
+
+def _aware(value: datetime) -> datetime:
+    # SQLite hands timestamps back naive.
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _escape(text: str) -> str:
+    return (
+        text.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\n", "\\n")
+    )
+
+
+def _fold(line: str) -> str:
+    # RFC 5545: lines are at most 75 octets, continued after CRLF + space.
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line
+
+    parts, start = [], 0
+    while start < len(encoded):
+        end = min(start + (75 if not parts else 74), len(encoded))
+        # Don't split a UTF-8 sequence.
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode())
+        start = end
+    return "\r\n ".join(parts)
+
+
+def _local(value: datetime) -> str:
+    return value.strftime("%Y%m%dT%H%M%S")
+
+
+def _utc(value: datetime) -> str:
+    return _aware(value).astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _event(group: StudyGroup) -> dict:
+    start = to_campus_time(group.meeting_time)
+    weekday = parse_day(group.meeting_day)
+    if weekday is not None:
+        # The first meeting on the recurring weekday, at the given time.
+        start += timedelta(days=(weekday - start.weekday()) % 7)
+
+    return {
+        "uid": f"study-group-{group.id}@bearnet",
+        "start": _local(start),
+        "end": _local(start + timedelta(minutes=group.duration_minutes)),
+        "weekday": WEEKDAYS[weekday] if weekday is not None else None,
+        "summary": f"{group.course.department} {group.course.course_number} study group",
+        "location": group.location,
+    }
+
+
+def _offset(value: timedelta) -> str:
+    sign = "-" if value < timedelta(0) else "+"
+    minutes, seconds = divmod(int(abs(value).total_seconds()), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{sign}{hours:02}{minutes:02}" + (f"{seconds:02}" if seconds else "")
+
+
+@lru_cache(maxsize=16)
+def _vtimezone(first_year: int, last_year: int) -> tuple[str, ...]:
+    # RFC 5545 wants a VTIMEZONE for every TZID, and some clients (Outlook)
+    # won't look an IANA name up themselves. zoneinfo doesn't expose its
+    # rules, so the campus zone's transitions between the two years are
+    # found by stepping a day at a time and narrowing down to the minute,
+    # and each is written out as its own observance.
+    zone = CAMPUS_TIMEZONE
+    at = datetime(first_year, 1, 1, tzinfo=timezone.utc)
+    end = datetime(last_year + 1, 1, 1, tzinfo=timezone.utc)
+
+    def observance(start: datetime, before: timedelta) -> list[str]:
+        local = start.astimezone(zone)
+        kind = "DAYLIGHT" if local.dst() else "STANDARD"
+        return [
+            f"BEGIN:{kind}",
+            # Wall-clock time just before the change.
+            f"DTSTART:{_local((start + before).replace(tzinfo=None))}",
+            f"TZOFFSETFROM:{_offset(before)}",
+            f"TZOFFSETTO:{_offset(local.utcoffset())}",
+            f"TZNAME:{local.tzname()}",
+            f"END:{kind}",
+        ]
+
+    offset = at.astimezone(zone).utcoffset()
+    lines = ["BEGIN:VTIMEZONE", f"TZID:{zone.key}"] + observance(at, offset)
+    while at < end:
+        step = at + timedelta(days=1)
+        if step.astimezone(zone).utcoffset() != offset:
+            low, high = at, step
+            while high - low > timedelta(minutes=1):
+                middle = low + timedelta(minutes=(high - low) // timedelta(minutes=2))
+                if middle.astimezone(zone).utcoffset() == offset:
+                    low = middle
+                else:
+                    high = middle
+            lines += observance(high, offset)
+            offset = high.astimezone(zone).utcoffset()
+        at = step
+    lines.append("END:VTIMEZONE")
+    return tuple(lines)
+
+
+def render(events: list[dict], stamp: datetime) -> str:
+    # Times are campus local time. Outside UTC they carry the zone's IANA
+    # name as TZID, defined by a VTIMEZONE covering the events' years and
+    # the next few.
+    utc = CAMPUS_TIMEZONE.key == "UTC"
+
+    def at(name: str, value: str) -> str:
+        return f"{name}:{value}Z" if utc else f"{name};TZID={CAMPUS_TIMEZONE.key}:{value}"
+
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{CALENDAR_NAME}",
+        f"X-WR-TIMEZONE:{CAMPUS_TIMEZONE.key}",
+        f"REFRESH-INTERVAL;VALUE=DURATION:{REFRESH_INTERVAL}",
+        f"X-PUBLISHED-TTL:{REFRESH_INTERVAL}",
+    ]
+    if not utc:
+        years = [int(event["start"][:4]) for event in events] + [stamp.year]
+        lines += _vtimezone(min(years), stamp.year + TIMEZONE_YEARS_AHEAD)
+    for event in events:
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:{event['uid']}",
+            f"DTSTAMP:{_utc(stamp)}",
+            at("DTSTART", event["start"]),
+            at("DTEND", event["end"]),
+            f"SUMMARY:{_escape(event['summary'])}",
+            f"LOCATION:{_escape(event['location'])}",
+        ]
+        if event["weekday"]:
+            lines.append(f"RRULE:FREQ=WEEKLY;BYDAY={event['weekday']}")
+        lines.append("END:VEVENT")
+    lines.append("END:VCALENDAR")
+
+    return "".join(_fold(line) + "\r\n" for line in lines)
+
+
+async def _regenerate(student_id: int) -> Feed | None:
+    async with AsyncSessionLocal() as db:
+        # Read the cursor first: a change that commits after this point is
+        # past it, so the next poll renders again rather than missing it.
+        cursor = await changes.head(db)
+        groups = (
+            await db.scalars(
+                select(StudyGroup)
+                .join(StudyGroupMember)
+                .join(Course, Course.id == StudyGroup.course_id)
+                .where(StudyGroupMember.student_id == student_id)
+                .options(contains_eager(StudyGroup.course))
+                .order_by(StudyGroup.id)
+            )
+        ).all()
+        events = [_event(group) for group in groups]
+
+        # Tagged by content, so a rebuild that changes nothing leaves the
+        # ETag and Last-Modified (and every client's cached copy) alone.
+        etag = hashlib.sha256(json.dumps(events).encode()).hexdigest()[:32]
+        feed = await db.get(CalendarFeed, student_id)
+        if feed is None:
+            # Revoked in the meantime.
+            return None
+
+        now = datetime.now(timezone.utc)
+
+        if feed.etag != etag or feed.body is None:
+            feed.body = render(events, now)
+            feed.etag = etag
+            feed.modified_at = now
+        feed.cursor = cursor
+        feed.generated_at = now
+        await db.commit()
+
+        return Feed(feed.body, feed.etag, _aware(feed.modified_at))
+
+
+async def feed_for_token(db: AsyncSession, token: str) -> Feed | None:
+    changed = exists().where(
+        ChangeLog.student_id == CalendarFeed.student_id,
+        changes.position(db) > CalendarFeed.cursor,
+        ChangeLog.entity.in_(FEED_ENTITIES),
+    )
+    row = (
+        await db.execute(
+            select(CalendarFeed, changed).where(CalendarFeed.token == token)
+        )
+    ).one_or_none()
+    if row is None:
+        return None
+
+    feed, stale = row
+    if (
+        stale
+        or feed.body is None
+        or _aware(feed.generated_at) < datetime.now(timezone.utc) - MAX_AGE
+    ):
+        return await feed_flight.do(feed.student_id, lambda: _regenerate(feed.student_id))
+
+    return Feed(feed.body, feed.etag, _aware(feed.modified_at))
+
+
+async def token_for_student(db: AsyncSession, student_id: int) -> str:
+    # Creates the student's feed on first use; the body is rendered on
+    # the first poll.
+    await db.execute(
+        dialect_insert(db)(CalendarFeed)
+        .values(student_id=student_id, token=secrets.token_urlsafe(32))
+        .on_conflict_do_nothing(index_elements=[CalendarFeed.student_id])
+    )
+    token = await db.scalar(
+        select(CalendarFeed.token).where(CalendarFeed.student_id == student_id)
+    )
+    await db.commit()
+    return token
+
+
+async def revoke(db: AsyncSession, student_id: int) -> None:
+    await db.execute(delete(CalendarFeed).where(CalendarFeed.student_id == student_id))
+    await db.commit()
@@ -0,0 +1,223 @@
+import hashlib
+import os
+import re
+from datetime import datetime, timedelta, timezone
+
+from fastapi import Request, status
+from fastapi.responses import JSONResponse, Response
+from starlette.middleware.base import BaseHTTPMiddleware
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import jobs
+from app.deps.db import AsyncSessionLocal, dialect_insert
+from app.schemas.models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+TTL = timedelta(hours=24)
+SWEEP_INTERVAL_SECONDS = 15 * 60
+# Longer than any of ROUTES takes to run. A key still unanswered after this
+# long was claimed by a worker that died, and the next retry takes it over.
+CLAIM_TIMEOUT = timedelta(seconds=int(os.getenv("IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS", "60")))
+
+ROUTES = [
+    ("POST", re.compile(r"^/study-group/$")),
+    ("POST", re.compile(r"^/study-group/\d+$")),
+    ("POST", re.compile(r"^/study-group/\d+/request$")),
+    ("POST", re.compile(r"^/study-group/\d+/request/\d+/accept$")),
+]
+
+# Server errors and throttling are transient, so the key is released and a
+# retry runs the handler again instead of replaying the failure.
+NOT_STORED = {status.HTTP_429_TOO_MANY_REQUESTS}
+
+
+def _sha256(*parts: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+async def _claim(
+    db: AsyncSession,
+    scope: str,
+    key: str,
+    request: Request,
+    request_hash: str,
+    claimed_at: datetime,
+) -> IdempotencyKey | None:
+    await db.execute(
+        delete(IdempotencyKey).where(
+            IdempotencyKey.scope == scope,
+            IdempotencyKey.key == key,
+            IdempotencyKey.expires_at < claimed_at,
+        )
+    )
+
+    while True:
+        claimed = await db.scalar(
+            dialect_insert(db)(IdempotencyKey)
+            .values(
+                scope=scope,
+                key=key,
+                method=request.method,
+                path=request.url.path,
+                request_hash=request_hash,
+                claimed_at=claimed_at,
+                expires_at=claimed_at + TTL,
+            )
+            .on_conflict_do_nothing()
+            .returning(IdempotencyKey.key)
+        )
+        await db.commit()
+
+        if claimed:
+            return None
+
+        record = await db.get(IdempotencyKey, (scope, key), populate_existing=True)
+        if record is None:
+            # Released between our insert and the read; claim it again.
+            continue
+        # Only read from here on. Detached, it isn't synced by the UPDATEs
+        # on its key, which can't compare SQLite's naive timestamps.
+        db.expunge(record)
+
+        if record.status_code is None and record.request_hash == request_hash:
+            taken = await db.scalar(
+                update(IdempotencyKey)
+                .where(
+                    IdempotencyKey.scope == scope,
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.status_code.is_(None),
+                    IdempotencyKey.claimed_at < claimed_at - CLAIM_TIMEOUT,
+                )
+                .values(claimed_at=claimed_at)
+                .returning(IdempotencyKey.key)
+            )
+            await db.commit()
+            if taken:
+                return None
+
+        return record
+
+
+def _response(body: bytes, status_code: int, headers: list[list[str]]) -> Response:
+    response = Response(content=body, status_code=status_code)
+    for name, value in headers:
+        if name.lower() != "content-length":
+            response.headers.append(name, value)
+    return response
+
+
+def _replay(record: IdempotencyKey, request_hash: str) -> Response:
+    if record.request_hash != request_hash:
+        return JSONResponse(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            content={"detail": f"{HEADER} was already used for a different request"},
+        )
+
+    if record.status_code is None:
+        return JSONResponse(
+            status_code=status.HTTP_409_CONFLICT,
+            content={"detail": f"A request with this {HEADER} is still in progress"},
+            headers={"Retry-After": "1"},
+        )
+
+    response = _response(record.response_body, record.status_code, record.headers or [])
+    response.headers[REPLAYED_HEADER] = "true"
+    return response
+
+
+class IdempotencyMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        key = request.headers.get(HEADER)
+        token = request.cookies.get("sessionId")
+
+        if (
+            key is None
+            or token is None
+            or not any(
+                request.method == method and pattern.match(request.url.path)
+                for method, pattern in ROUTES
+            )
+        ):
+            return await call_next(request)
+
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content={"detail": f"{HEADER} must be 1-{MAX_KEY_LENGTH} characters"},
+            )
+
+        scope = _sha256(token.encode())
+        request_hash = _sha256(
+            request.method.encode(),
+            request.url.path.encode(),
+            await request.body(),
+        )
+        claimed_at = datetime.now(timezone.utc)
+
+        async with AsyncSessionLocal() as db:
+            existing = await _claim(db, scope, key, request, request_hash, claimed_at)
+            if existing is not None:
+                return _replay(existing, request_hash)
+
+            try:
+                response = await call_next(request)
+                body = b"".join([chunk async for chunk in response.body_iterator])
+            except Exception:
+                await _release(db, scope, key, claimed_at)
+                raise
+
+            headers = [
+                [name.decode("latin-1"), value.decode("latin-1")]
+                for name, value in response.raw_headers
+            ]
+
+            if response.status_code >= 500 or response.status_code in NOT_STORED:
+                await _release(db, scope, key, claimed_at)
+            else:
+                # Matching claimed_at leaves the key alone if our claim
+                # timed out and another request took it over.
+                await db.execute(
+                    update(IdempotencyKey)
+                    .where(
+                        IdempotencyKey.scope == scope,
+                        IdempotencyKey.key == key,
+                        IdempotencyKey.claimed_at == claimed_at,
+                    )
+                    .values(
+                        status_code=response.status_code,
+                        response_body=body,
+                        headers=headers,
+                    )
+                )
+                await db.commit()
+
+        return _response(body, response.status_code, headers)
+
+
+async def _release(db: AsyncSession, scope: str, key: str, claimed_at: datetime) -> None:
+    await db.execute(
+        delete(IdempotencyKey)
+        .where(
+            IdempotencyKey.scope == scope,
+            IdempotencyKey.key == key,
+            IdempotencyKey.claimed_at == claimed_at,
+        )
+    )
+    await db.commit()
+
+
+@jobs.handler("idempotency.evict_expired", every=SWEEP_INTERVAL_SECONDS)
+async def evict_expired() -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            delete(IdempotencyKey)
+            .where(IdempotencyKey.expires_at < datetime.now(timezone.utc))
+        )
+        await db.commit()
@@ -0,0 +1,324 @@
+import asyncio
+import importlib
+import logging
+import os
+import random
+import socket
+import time
+import traceback
+from collections import defaultdict, deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import select, update, delete, exists, func, case
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import slow_query, tenancy
+from app.deps.db import AsyncSessionLocal
+from app.schemas.models import Job
+
+logger = logging.getLogger(__name__)
+
+# Durable queue for side effects that shouldn't run on the request path.
+# Handlers enqueue in the same transaction as the change that caused the
+# work, so a job exists exactly when its change was committed. Workers
+# claim due jobs with FOR UPDATE SKIP LOCKED, so any number of them (in the
+# app's lifespan or via `python -m app.core.jobs`) can share the table.
+#
+# Each tenant's jobs live in its own database, with their own workers.
+#
+# Handlers must be idempotent: a job that outlives its lease, or whose
+# worker dies after doing the work but before deleting the row, runs again.
+
+QUEUED = "queued"
+RUNNING = "running"
+FAILED = "failed"
+
+# Set JOB_WORKER_IN_APP=0 to run workers only as separate processes.
+RUN_IN_APP = os.getenv("JOB_WORKER_IN_APP", "1") == "1"
+CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "4"))
+POLL_INTERVAL_SECONDS = 1.0
+LEASE = timedelta(minutes=15)
+BACKOFF_BASE_SECONDS = 5
+BACKOFF_MAX_SECONDS = 15 * 60
+FAILED_RETENTION = timedelta(days=7)
+THROUGHPUT_WINDOW_SECONDS = 60
+
+# Modules whose handlers must be registered before a worker starts.
+HANDLER_MODULES = [
+    "app.core.recommendations",
+    "app.core.rollups",
+    "app.core.changes",
+    "app.core.idempotency",
+    "app.core.sessions",
+]
+
+Handler = Callable[..., Awaitable[Any]]
+
+_handlers: dict[str, Handler] = {}
+_periodic: list[tuple[str, float]] = []
+_workers: dict[str, "Worker"] = {}
+
+
+def handler(kind: str, every: float | None = None):
+    # Registers fn as the handler for `kind`. With `every`, the scheduler
+    # also queues it (without arguments) every `every` seconds.
+    def register(fn: Handler) -> Handler:
+        _handlers[kind] = fn
+        fn.job_kind = kind
+        if every is not None:
+            _periodic.append((kind, every))
+        return fn
+
+    return register
+
+
+def enqueue(
+    db: AsyncSession,
+    fn: Handler,
+    *,
+    delay: timedelta | None = None,
+    max_attempts: int = 5,
+    **payload,
+) -> None:
+    # Adds the job to the caller's transaction; it is only visible to
+    # workers once the caller commits.
+    db.add(
+        Job(
+            kind=fn.job_kind,
+            payload=payload,
+            run_at=datetime.now(timezone.utc) + (delay or timedelta()),
+            max_attempts=max_attempts,
+        )
+    )
+
+
+def _backoff(attempts: int) -> timedelta:
+    seconds = min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS)
+    return timedelta(seconds=seconds * random.uniform(0.8, 1.2))
+
+
+class Worker:
+    def __init__(self, name: str | None = None, concurrency: int = CONCURRENCY):
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}:{id(self):x}"
+        self.tenant = tenancy.current().name
+        self.concurrency = concurrency
+        self._running: dict[asyncio.Task, Job] = {}
+        self._finished: deque[float] = deque()
+        self.succeeded: dict[str, int] = defaultdict(int)
+        self.retried: dict[str, int] = defaultdict(int)
+        self.failed: dict[str, int] = defaultdict(int)
+        self.seconds: dict[str, float] = defaultdict(float)
+        _workers[self.name] = self
+
+    async def run(self) -> None:
+        try:
+            while True:
+                free = self.concurrency - len(self._running)
+                claimed = []
+                if free:
+                    try:
+                        claimed = await self._claim(free)
+                    except Exception:
+                        logger.exception("Job claim failed")
+
+                for job in claimed:
+                    task = asyncio.create_task(self._execute(job))
+                    self._running[task] = job
+                    task.add_done_callback(self._running.pop)
+
+                if self._running and len(claimed) == free:
+                    await asyncio.wait(
+                        self._running, return_when=asyncio.FIRST_COMPLETED
+                    )
+                elif not claimed:
+                    await asyncio.sleep(POLL_INTERVAL_SECONDS)
+        finally:
+            await self._shutdown()
+
+    async def _claim(self, limit: int) -> list[Job]:
+        now = datetime.now(timezone.utc)
+
+        async with AsyncSessionLocal() as db:
+            # Jobs whose worker died mid-run become claimable again once
+            # their lease runs out.
+            await db.execute(
+                update(Job)
+                .where(Job.status == RUNNING, Job.locked_at < now - LEASE)
+                .values(
+                    status=case((Job.attempts >= Job.max_attempts, FAILED), else_=QUEUED),
+                    locked_by=None,
+                    last_error="Lease expired",
+                )
+            )
+
+            due = (
+                select(Job.id)
+                .where(Job.status == QUEUED, Job.run_at <= now)
+                .order_by(Job.run_at, Job.id)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+            jobs = (
+                await db.scalars(
+                    update(Job)
+                    .where(Job.id.in_(due))
+                    .values(
+                        status=RUNNING,
+                        locked_at=now,
+                        locked_by=self.name,
+                        attempts=Job.attempts + 1,
+                    )
+                    .returning(Job)
+                )
+            ).all()
+            await db.commit()
+            return list(jobs)
+
+    async def _execute(self, job: Job) -> None:
+        started = time.monotonic()
+        slow_query.origin.set(f"job:{job.kind}")
+        try:
+            await _handlers[job.kind](**job.payload)
+        except asyncio.CancelledError:
+            await self._finish(
+                job,
+                status=QUEUED,
+                attempts=Job.attempts - 1,
+                run_at=datetime.now(timezone.utc),
+            )
+            raise
+        except Exception:
+            error = traceback.format_exc()
+            if job.attempts >= job.max_attempts:
+                logger.error("Job %s (%s) failed permanently\n%s", job.id, job.kind, error)
+                self.failed[job.kind] += 1
+                await self._finish(job, status=FAILED, last_error=error)
+            else:
+                self.retried[job.kind] += 1
+                await self._finish(
+                    job,
+                    status=QUEUED,
+                    last_error=error,
+                    run_at=datetime.now(timezone.utc) + _backoff(job.attempts),
+                )
+        else:
+            self.succeeded[job.kind] += 1
+            self._finished.append(time.monotonic())
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    delete(Job).where(Job.id == job.id, Job.locked_by == self.name)
+                )
+                await db.commit()
+        finally:
+            self.seconds[job.kind] += time.monotonic() - started
+
+    async def _finish(self, job: Job, **values) -> None:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Job)
+                .where(Job.id == job.id, Job.locked_by == self.name)
+                .values(locked_at=None, locked_by=None, **values)
+            )
+            await db.commit()
+
+    async def _shutdown(self) -> None:
+        # Cancelled jobs put themselves back in the queue.
+        for task in list(self._running):
+            task.cancel()
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+        _workers.pop(self.name, None)
+
+    def stats(self) -> dict:
+        cutoff = time.monotonic() - THROUGHPUT_WINDOW_SECONDS
+        while self._finished and self._finished[0] < cutoff:
+            self._finished.popleft()
+
+        kinds = set(self.succeeded) | set(self.retried) | set(self.failed)
+        return {
+            "concurrency": self.concurrency,
+            "running": len(self._running),
+            "per_minute": len(self._finished) * 60 / THROUGHPUT_WINDOW_SECONDS,
+            "kinds": {
+                kind: {
+                    "succeeded": self.succeeded[kind],
+                    "retried": self.retried[kind],
+                    "failed": self.failed[kind],
+                    "seconds": round(self.seconds[kind], 3),
+                }
+                for kind in sorted(kinds)
+            },
+        }
+
+
+async def schedule_periodic() -> None:
+    # Queues each periodic job when it falls due, unless one is already
+    # waiting, so several app processes don't pile up duplicates.
+    due = {kind: 0.0 for kind, _ in _periodic}
+
+    while True:
+        now = time.monotonic()
+        for kind, every in _periodic:
+            if due[kind] > now:
+                continue
+            due[kind] = now + every
+            try:
+                async with AsyncSessionLocal() as db:
+                    pending = await db.scalar(
+                        select(
+                            exists().where(
+                                Job.kind == kind,
+                                Job.status.in_([QUEUED, RUNNING]),
+                            )
+                        )
+                    )
+                    if not pending:
+                        db.add(Job(kind=kind, payload={}, run_at=datetime.now(timezone.utc)))
+                        await db.commit()
+            except Exception:
+                logger.exception("Scheduling %s failed", kind)
+
+        await asyncio.sleep(min(due.values(), default=now + 60) - now)
+
+
+@handler("jobs.purge_failed", every=24 * 3600)
+async def purge_failed() -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            delete(Job).where(
+                Job.status == FAILED,
+                Job.created_at < datetime.now(timezone.utc) - FAILED_RETENTION,
+            )
+        )
+        await db.commit()
+
+
+def load_handlers() -> None:
+    for module in HANDLER_MODULES:
+        importlib.import_module(module)
+
+
+async def queue_depth() -> dict[str, int]:
+    async with AsyncSessionLocal() as db:
+        rows = await db.execute(select(Job.status, func.count()).group_by(Job.status))
+        return {status: count for status, count in rows}
+
+
+def all_stats() -> dict[str, dict]:
+    tenant = tenancy.current().name
+    return {
+        name: worker.stats()
+        for name, worker in _workers.items()
+        if worker.tenant == tenant
+    }
+
+
+async def main() -> None:
+    load_handlers()
+    await tenancy.run_per_tenant(lambda: [Worker().run(), schedule_periodic()])
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,322 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import DateTime, func, insert, inspect, select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine
+
+from app.core import tenancy
+from app.schemas.models import Base
+
+# Places tenants on database nodes and moves them between nodes, by
+# editing TENANTS_FILE (see app.core.tenancy).
+#
+#   python -m app.core.placement list
+#   python -m app.core.placement add-node pg-2 'postgresql+asyncpg://postgres@db2/{tenant}'
+#   python -m app.core.placement place stanford --node pg-2 --host stanford.example.edu
+#   python -m app.core.placement move stanford --to pg-1
+#
+# A move freezes the tenant, waits DRAIN_SECONDS for every app process to
+# notice and for requests and jobs in flight to finish, copies each table
+# into a fresh database on the new node, checks the row counts and points
+# the tenant at its new database. The tenant is down (503) for the length
+# of the copy. The old database is left in place for the operator to drop.
+
+DRAIN_SECONDS = 3 * tenancy.RELOAD_INTERVAL_SECONDS + 15
+BATCH_SIZE = 5000
+
+# Maintained by triggers on Postgres; see app.core.search.
+SKIPPED_COLUMNS = {"search_vector"}
+
+ALEMBIC_INI = os.path.join(os.path.dirname(__file__), "..", "..", "alembic.ini")
+
+
+class PlacementError(Exception):
+    pass
+
+
+def read_config(path: str) -> dict:
+    if not os.path.exists(path):
+        return {"nodes": {}, "tenants": {}}
+    with open(path) as f:
+        config = json.load(f)
+    config.setdefault("nodes", {})
+    config.setdefault("tenants", {})
+    return config
+
+
+def write_config(path: str, config: dict) -> None:
+    # Atomic, so app processes never read half a file.
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile("w", dir=directory, delete=False, suffix=".tmp") as f:
+        json.dump(config, f, indent=2)
+        f.write("\n")
+    os.replace(f.name, path)
+
+
+def _database_url(config: dict, tenant: str, node: str) -> str:
+    return config["nodes"][node].format(tenant=tenant)
+
+
+async def create_database(url: str) -> None:
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        if parsed.database:
+            os.makedirs(os.path.dirname(os.path.abspath(parsed.database)), exist_ok=True)
+        return
+
+    server = create_async_engine(parsed.set(database="postgres"), isolation_level="AUTOCOMMIT")
+    try:
+        async with server.connect() as conn:
+            exists = await conn.scalar(
+                text("SELECT 1 FROM pg_database WHERE datname = :name"),
+                {"name": parsed.database},
+            )
+            if not exists:
+                quoted = conn.dialect.identifier_preparer.quote(parsed.database)
+                await conn.execute(text(f"CREATE DATABASE {quoted}"))
+    finally:
+        await server.dispose()
+
+
+async def _count(conn: AsyncConnection, table) -> int:
+    return await conn.scalar(select(func.count()).select_from(table))
+
+
+async def _copy_table(source: AsyncConnection, target: AsyncConnection, table) -> int:
+    columns = [c for c in table.columns if c.name not in SKIPPED_COLUMNS]
+    # SQLite hands timestamps back naive; they're UTC.
+    aware = [
+        c.name for c in columns
+        if isinstance(c.type, DateTime) and c.type.timezone
+    ]
+
+    copied = 0
+    result = await source.stream(select(*columns))
+    async for rows in result.partitions(BATCH_SIZE):
+        batch = [dict(row._mapping) for row in rows]
+        for row in batch:
+            for name in aware:
+                if row[name] is not None and row[name].tzinfo is None:
+                    row[name] = row[name].replace(tzinfo=timezone.utc)
+        await target.execute(insert(table), batch)
+        copied += len(batch)
+    return copied
+
+
+async def _reset_sequences(target: AsyncConnection) -> None:
+    # Rows were copied with their ids, which Postgres sequences don't see.
+    quote = target.dialect.identifier_preparer.quote
+    for table in Base.metadata.sorted_tables:
+        column = table.autoincrement_column
+        if column is None:
+            continue
+        await target.execute(
+            text(
+                f"SELECT setval(pg_get_serial_sequence(:table, :column), "
+                f"COALESCE(MAX({quote(column.name)}), 0) + 1, false) FROM {quote(table.name)}"
+            ),
+            {"table": quote(table.name), "column": column.name},
+        )
+
+
+async def _alembic_version(source: AsyncConnection) -> str | None:
+    if not await source.run_sync(lambda conn: inspect(conn).has_table("alembic_version")):
+        return None
+    return await source.scalar(text("SELECT version_num FROM alembic_version"))
+
+
+def _script() -> ScriptDirectory:
+    return ScriptDirectory.from_config(Config(ALEMBIC_INI))
+
+
+async def _create_schema(conn: AsyncConnection) -> None:
+    # create_all builds the schema as of the latest migration, so the new
+    # database is stamped there and `alembic upgrade` picks up from it.
+    await conn.run_sync(Base.metadata.create_all)
+    await conn.run_sync(
+        lambda sync: MigrationContext.configure(sync).stamp(_script(), "head")
+    )
+
+
+async def copy_tenant(source_url: str, target_url: str) -> dict[str, int]:
+    source: AsyncEngine = create_async_engine(source_url)
+    target: AsyncEngine = create_async_engine(target_url)
+    counts = {}
+    try:
+        async with source.connect() as src:
+            version = await _alembic_version(src)
+        head = _script().get_current_head()
+        if version is not None and version != head:
+            raise PlacementError(
+                f"{source.url.database} is at migration {version}, not {head}; upgrade it first"
+            )
+
+        async with target.begin() as conn:
+            await _create_schema(conn)
+
+        async with source.connect() as src, target.begin() as dst:
+            for table in Base.metadata.sorted_tables:
+                if await _count(dst, table):
+                    raise PlacementError(f"{target.url.database} already has rows in {table.name}")
+
+            for table in Base.metadata.sorted_tables:
+                counts[table.name] = await _copy_table(src, dst, table)
+                print(f"{table.name}: {counts[table.name]}", file=sys.stderr)
+
+            # Checked before committing, so a tenant that wasn't really
+            # frozen leaves nothing behind on the new node.
+            for table in Base.metadata.sorted_tables:
+                if await _count(src, table) != await _count(dst, table):
+                    raise PlacementError(f"{table.name} changed during the copy")
+
+            if dst.dialect.name == "postgresql":
+                await _reset_sequences(dst)
+    finally:
+        await source.dispose()
+        await target.dispose()
+    return counts
+
+
+def add_node(path: str, name: str, url: str) -> None:
+    if "{tenant}" not in url:
+        raise PlacementError("node URL needs a {tenant} placeholder for the database name")
+    config = read_config(path)
+    config["nodes"][name] = url
+    write_config(path, config)
+
+
+async def place(path: str, name: str, node: str, hosts: list[str]) -> None:
+    config = read_config(path)
+    if not tenancy.NAME.match(name):
+        raise PlacementError(f"invalid tenant name {name!r}")
+    if name in config["tenants"]:
+        raise PlacementError(f"{name} is already on {config['tenants'][name]['node']}")
+    if node not in config["nodes"]:
+        raise PlacementError(f"unknown node {node!r}")
+
+    taken = {host for entry in config["tenants"].values() for host in entry.get("hosts", [])}
+    hosts = [host.lower() for host in hosts]
+    if taken & set(hosts):
+        raise PlacementError(f"hosts already in use: {', '.join(sorted(taken & set(hosts)))}")
+
+    url = _database_url(config, name, node)
+    await create_database(url)
+    engine = create_async_engine(url)
+    try:
+        async with engine.begin() as conn:
+            await _create_schema(conn)
+    finally:
+        await engine.dispose()
+
+    config["tenants"][name] = {"node": node, "hosts": hosts}
+    write_config(path, config)
+
+
+def _set_frozen(path: str, name: str, frozen: bool, node: str | None = None) -> None:
+    # Re-read each time so edits made meanwhile (another tenant placed)
+    # aren't lost.
+    config = read_config(path)
+    entry = config["tenants"][name]
+    if node is not None:
+        entry["node"] = node
+    if frozen:
+        entry["frozen"] = True
+    else:
+        entry.pop("frozen", None)
+    write_config(path, config)
+
+
+async def move(path: str, name: str, node: str, drain_seconds: float) -> dict[str, int]:
+    config = read_config(path)
+    if name not in config["tenants"]:
+        raise PlacementError(f"unknown tenant {name!r}")
+    if node not in config["nodes"]:
+        raise PlacementError(f"unknown node {node!r}")
+    current = config["tenants"][name]["node"]
+    if current == node:
+        raise PlacementError(f"{name} is already on {node}")
+
+    source_url = _database_url(config, name, current)
+    target_url = _database_url(config, name, node)
+    if make_url(source_url) == make_url(target_url):
+        raise PlacementError(f"{current} and {node} are the same database")
+
+    _set_frozen(path, name, True)
+    print(f"{name} frozen, draining for {drain_seconds:.0f}s", file=sys.stderr)
+    started = datetime.now(timezone.utc)
+    try:
+        await asyncio.sleep(drain_seconds)
+        await create_database(target_url)
+        counts = await copy_tenant(source_url, target_url)
+    except BaseException:
+        _set_frozen(path, name, False)
+        raise
+
+    _set_frozen(path, name, False, node=node)
+    downtime = (datetime.now(timezone.utc) - started).total_seconds()
+    print(
+        f"{name} moved from {current} to {node} after {downtime:.1f}s frozen; "
+        f"its old database on {current} can be dropped",
+        file=sys.stderr,
+    )
+    return counts
+
+
+def show(path: str) -> None:
+    config = read_config(path)
+    for name, url in sorted(config["nodes"].items()):
+        print(f"node   {name:<16} {make_url(url).render_as_string()}")
+    for name, entry in sorted(config["tenants"].items()):
+        state = " (frozen)" if entry.get("frozen") else ""
+        print(f"tenant {name:<16} on {entry['node']}{state}  {' '.join(entry.get('hosts', []))}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Place tenants on database nodes.")
+    parser.add_argument("--file", default=tenancy.TENANTS_FILE, help="tenants file (default $TENANTS_FILE)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("list")
+
+    add = commands.add_parser("add-node")
+    add.add_argument("name")
+    add.add_argument("url", help="database URL with a {tenant} placeholder")
+
+    new = commands.add_parser("place")
+    new.add_argument("tenant")
+    new.add_argument("--node", required=True)
+    new.add_argument("--host", action="append", default=[], dest="hosts")
+
+    moved = commands.add_parser("move")
+    moved.add_argument("tenant")
+    moved.add_argument("--to", required=True, dest="node")
+    moved.add_argument("--drain-seconds", type=float, default=DRAIN_SECONDS)
+
+    args = parser.parse_args()
+    if not args.file:
+        sys.exit("no tenants file: pass --file or set TENANTS_FILE")
+
+    try:
+        if args.command == "list":
+            show(args.file)
+        elif args.command == "add-node":
+            add_node(args.file, args.name, args.url)
+        elif args.command == "place":
+            await place(args.file, args.tenant, args.node, args.hosts)
+        elif args.command == "move":
+            await move(args.file, args.tenant, args.node, args.drain_seconds)
+    except PlacementError as e:
+        sys.exit(str(e))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
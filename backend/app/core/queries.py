@@ -0,0 +1,52 @@
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from app.schemas.models import (
+    Course,
+    StudentCourse,
+    StudyGroup,
+    StudyGroupJoinRequest,
+    StudyGroupMember,
+)
+
+# Statements behind the "my ..." views, shared by the individual endpoints
+# and the dashboard so both return the same shape.
+
+
+def my_study_group_previews(student_id: int):
+    # Enough for StudyGroupPreviewDTO; no members.
+    return (
+        select(StudyGroup)
+        .join(StudyGroupMember)
+        .where(StudyGroupMember.student_id == student_id)
+        .options(selectinload(StudyGroup.course).selectinload(Course.semester))
+        .order_by(StudyGroup.meeting_time)
+    )
+
+
+def my_study_groups(student_id: int):
+    return my_study_group_previews(student_id).options(
+        selectinload(StudyGroup.members)
+    )
+
+
+def my_courses(student_id: int):
+    return (
+        select(Course)
+        .join(StudentCourse)
+        .where(StudentCourse.student_id == student_id)
+        .options(selectinload(Course.semester))
+        .order_by(Course.department, Course.course_number)
+    )
+
+
+def my_requests(student_id: int):
+    return (
+        select(StudyGroupJoinRequest)
+        .where(StudyGroupJoinRequest.student_id == student_id)
+        .options(
+            selectinload(StudyGroupJoinRequest.study_group)
+            .selectinload(StudyGroup.course)
+        )
+        .order_by(StudyGroupJoinRequest.created_at.desc())
+    )
@@ -0,0 +1,249 @@
+import hashlib
+import ipaddress
+import json
+import math
+import os
+import time
+from dataclasses import dataclass
+from typing import Protocol
+
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+from sqlalchemy import text
+
+from app.core import tenancy
+from app.deps.db import AsyncSessionLocal
+
+
+@dataclass(frozen=True)
+class Limit:
+    name: str
+    key: str  # "session", "ip", "email" or "email_ip"
+    capacity: int
+    per_seconds: float
+
+    @property
+    def refill_rate(self) -> float:
+        return self.capacity / self.per_seconds
+
+
+# Login and signup are budgeted tightly because every attempt costs a bcrypt
+# hash; the email buckets stop credential stuffing spread across many IPs.
+# Login's tightest bucket is per account and IP, so guessing from one
+# address can't lock the account's owner out from theirs; the looser
+# per-account bucket still caps guesses spread over many addresses. Order
+# matters: see RateLimitMiddleware.dispatch.
+ROUTE_LIMITS: dict[tuple[str, str], list[Limit]] = {
+    ("POST", "/auth/login"): [
+        Limit("login", "ip", 10, 60),
+        Limit("login", "email_ip", 5, 300),
+        Limit("login", "email", 20, 300),
+    ],
+    ("POST", "/auth/signup"): [
+        Limit("signup", "ip", 5, 3600),
+        Limit("signup", "email", 3, 3600),
+    ],
+}
+
+DEFAULT_LIMITS = [
+    Limit("default", "session", 120, 60),
+    Limit("default", "ip", 300, 60),
+]
+
+# Addresses (or CIDR ranges) of the load balancers and proxies in front of
+# the app. Their X-Forwarded-For is believed; anyone else's is ignored, so
+# a client can't pick its own IP bucket.
+TRUSTED_PROXIES = [
+    ipaddress.ip_network(proxy.strip(), strict=False)
+    for proxy in os.getenv("TRUSTED_PROXIES", "").split(",")
+    if proxy.strip()
+]
+
+
+class RateLimitStore(Protocol):
+    # Takes one token from the bucket. Returns 0 if the request is allowed,
+    # otherwise the number of seconds until a token is available.
+    async def take(self, key: str, limit: Limit) -> float: ...
+
+
+class MemoryStore:
+    MAX_BUCKETS = 100_000
+
+    def __init__(self):
+        # key -> (tokens, updated_at, refilled_at)
+        self._buckets: dict[str, tuple[float, float, float]] = {}
+
+    async def take(self, key: str, limit: Limit) -> float:
+        now = time.monotonic()
+        tokens, updated, _ = self._buckets.get(key, (limit.capacity, now, now))
+        tokens = min(limit.capacity, tokens + (now - updated) * limit.refill_rate)
+
+        if tokens >= 1:
+            tokens -= 1
+            wait = 0.0
+        else:
+            wait = (1 - tokens) / limit.refill_rate
+
+        if key not in self._buckets and len(self._buckets) >= self.MAX_BUCKETS:
+            self._prune(now)
+
+        refilled_at = now + (limit.capacity - tokens) / limit.refill_rate
+        self._buckets[key] = (tokens, now, refilled_at)
+        return wait
+
+    def _prune(self, now: float) -> None:
+        # A bucket that has refilled completely is equivalent to no bucket.
+        self._buckets = {
+            key: bucket
+            for key, bucket in self._buckets.items()
+            if bucket[2] > now
+        }
+
+
+class DatabaseStore:
+    # Shares buckets between workers through the rate_limit_buckets table.
+    # The refill and the take happen in one conditional upsert, so
+    # concurrent workers can't both spend the last token.
+    TAKE = """
+        INSERT INTO rate_limit_buckets (key, tokens, updated_at)
+        VALUES (:key, :capacity - 1, :now)
+        ON CONFLICT (key) DO UPDATE
+        SET tokens = {least}(:capacity, rate_limit_buckets.tokens
+                + (:now - rate_limit_buckets.updated_at) * :rate) - 1,
+            updated_at = :now
+        WHERE {least}(:capacity, rate_limit_buckets.tokens
+                + (:now - rate_limit_buckets.updated_at) * :rate) >= 1
+        RETURNING tokens
+    """
+
+    PEEK = """
+        SELECT {least}(:capacity, tokens + (:now - updated_at) * :rate)
+        FROM rate_limit_buckets
+        WHERE key = :key
+    """
+
+    # SQLite spells the two-argument LEAST as MIN.
+    @staticmethod
+    def _sql(db, statement: str):
+        least = "MIN" if db.bind.dialect.name == "sqlite" else "LEAST"
+        return text(statement.format(least=least))
+
+    async def take(self, key: str, limit: Limit) -> float:
+        params = {
+            "key": key,
+            "capacity": float(limit.capacity),
+            "rate": limit.refill_rate,
+            "now": time.time(),
+        }
+
+        async with AsyncSessionLocal() as db:
+            taken = await db.scalar(self._sql(db, self.TAKE), params)
+            await db.commit()
+
+            if taken is not None:
+                return 0
+
+            tokens = await db.scalar(self._sql(db, self.PEEK), params) or 0
+            return max(1 - tokens, 0) / limit.refill_rate
+
+
+STORES = {
+    "memory": MemoryStore,
+    "database": DatabaseStore,
+}
+
+
+def _digest(value: str) -> str:
+    return hashlib.sha256(value.encode()).hexdigest()[:32]
+
+
+def _trusted(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in TRUSTED_PROXIES)
+
+
+def _client_ip(request: Request) -> str | None:
+    if request.client is None:
+        return None
+    address = request.client.host
+    if not _trusted(address):
+        return address
+
+    # Each proxy appends the address it got the request from, so walk back
+    # from the nearest hop to the first one we don't run.
+    forwarded = [
+        hop.strip()
+        for header in request.headers.getlist("x-forwarded-for")
+        for hop in header.split(",")
+        if hop.strip()
+    ]
+    for hop in reversed(forwarded):
+        address = hop
+        if not _trusted(hop):
+            break
+    return address
+
+
+async def _email(request: Request) -> str | None:
+    try:
+        email = json.loads(await request.body()).get("email")
+    except (ValueError, AttributeError):
+        return None
+    return email.strip().lower() if isinstance(email, str) else None
+
+
+async def _identity(request: Request, key: str) -> str | None:
+    if key == "ip":
+        return _client_ip(request)
+
+    if key == "session":
+        token = request.cookies.get("sessionId")
+        return _digest(token) if token else None
+
+    if key == "email":
+        email = await _email(request)
+        return _digest(email) if email else None
+
+    if key == "email_ip":
+        email, ip = await _email(request), _client_ip(request)
+        return _digest(f"{email}|{ip}") if email and ip else None
+
+    raise ValueError(f"Unknown rate limit key: {key}")
+
+
+class RateLimitMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app, store: RateLimitStore | None = None):
+        super().__init__(app)
+        self.store = store or STORES[os.getenv("RATE_LIMIT_STORE", "memory")]()
+
+    async def dispatch(self, request: Request, call_next):
+        limits = ROUTE_LIMITS.get((request.method, request.url.path), DEFAULT_LIMITS)
+
+        # Buckets are tried in order and the first to refuse ends it, so a
+        # request that is turned away spends nothing from the buckets after
+        # it. That is why the per-account bucket comes last: guesses that
+        # the per-IP buckets refuse don't drain it for the account's owner.
+        retry_after = 0.0
+        for limit in limits:
+            identity = await _identity(request, limit.key)
+            if identity is None:
+                continue
+
+            retry_after = await self.store.take(
+                f"{tenancy.current().name}:{limit.name}:{limit.key}:{identity}", limit
+            )
+            if retry_after > 0:
+                break
+
+        if retry_after > 0:
+            return JSONResponse(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                content={"detail": "Too many requests"},
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+
+        return await call_next(request)
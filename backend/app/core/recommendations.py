@@ -0,0 +1,218 @@
+import asyncio
+from collections import defaultdict
+from typing import Iterable, Sequence
+
+from sqlalchemy import select, delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import jobs
+from app.deps.db import AsyncSessionLocal, dispose_engines
+from app.schemas.models import (
+    Student,
+    StudentCourse,
+    StudyGroup,
+    StudyGroupMember,
+    StudyGroupRecommendation,
+)
+
+# Score weights. A group in one of the student's courses starts at 0 and
+# gains points for peers with the same major / class year, for already
+# having momentum, and for being open; a clash with a group the student
+# already attends is penalised.
+MAJOR_WEIGHT = 0.35
+CLASS_YEAR_WEIGHT = 0.2
+OCCUPANCY_WEIGHT = 0.15
+OPEN_WEIGHT = 0.1
+CONFLICT_PENALTY = 0.4
+
+BATCH_SIZE = 500
+
+
+def _clashes(group: StudyGroup, busy: list[tuple[int, int]]) -> bool:
+    return any(
+        group.schedule_start < end and start < group.schedule_end
+        for start, end in busy
+    )
+
+
+def _share(values: Sequence[str | None], target: str | None) -> float:
+    if target is None or not values:
+        return 0.0
+    return sum(1 for v in values if v == target) / len(values)
+
+
+async def _score_batch(
+    db: AsyncSession,
+    student_ids: Sequence[int],
+    group_ids: Sequence[int] | None = None,
+) -> list[dict]:
+    students = (
+        await db.execute(
+            select(Student.id, Student.major, Student.class_year)
+            .where(Student.id.in_(student_ids))
+        )
+    ).all()
+
+    enrolled: dict[int, set[int]] = defaultdict(set)
+    for student_id, course_id in await db.execute(
+        select(StudentCourse.student_id, StudentCourse.course_id)
+        .where(StudentCourse.student_id.in_(student_ids))
+    ):
+        enrolled[student_id].add(course_id)
+
+    course_ids = set().union(*enrolled.values()) if enrolled else set()
+    if not course_ids:
+        return []
+
+    group_query = select(StudyGroup).where(StudyGroup.course_id.in_(course_ids))
+    if group_ids is not None:
+        group_query = group_query.where(StudyGroup.id.in_(group_ids))
+    groups = (await db.scalars(group_query)).all()
+    if not groups:
+        return []
+
+    member_ids: dict[int, set[int]] = defaultdict(set)
+    member_majors: dict[int, list[str | None]] = defaultdict(list)
+    member_years: dict[int, list[str | None]] = defaultdict(list)
+    for group_id, student_id, major, class_year in await db.execute(
+        select(
+            StudyGroupMember.study_group_id,
+            Student.id,
+            Student.major,
+            Student.class_year,
+        )
+        .join(Student, Student.id == StudyGroupMember.student_id)
+        .where(StudyGroupMember.study_group_id.in_([g.id for g in groups]))
+    ):
+        member_ids[group_id].add(student_id)
+        member_majors[group_id].append(major)
+        member_years[group_id].append(class_year)
+
+    busy: dict[int, list[tuple[int, int]]] = defaultdict(list)
+    for student_id, start, end in await db.execute(
+        select(
+            StudyGroupMember.student_id,
+            StudyGroup.schedule_start,
+            StudyGroup.schedule_end,
+        )
+        .join(StudyGroup, StudyGroup.id == StudyGroupMember.study_group_id)
+        .where(StudyGroupMember.student_id.in_(student_ids))
+    ):
+        busy[student_id].append((start, end))
+
+    groups_by_course: dict[int, list[StudyGroup]] = defaultdict(list)
+    for group in groups:
+        groups_by_course[group.course_id].append(group)
+
+    rows = []
+    for student_id, major, class_year in students:
+        for course_id in enrolled[student_id]:
+            for group in groups_by_course[course_id]:
+                members = member_ids[group.id]
+                if student_id in members or len(members) >= group.capacity:
+                    continue
+
+                score = (
+                    MAJOR_WEIGHT * _share(member_majors[group.id], major)
+                    + CLASS_YEAR_WEIGHT * _share(member_years[group.id], class_year)
+                    + OCCUPANCY_WEIGHT * len(members) / group.capacity
+                    + OPEN_WEIGHT * (not group.isPrivate)
+                )
+                if _clashes(group, busy[student_id]):
+                    score -= CONFLICT_PENALTY
+
+                rows.append({
+                    "student_id": student_id,
+                    "study_group_id": group.id,
+                    "score": round(score, 4),
+                })
+
+    return rows
+
+
+async def refresh_students(db: AsyncSession, student_ids: Iterable[int]) -> None:
+    student_ids = sorted(set(student_ids))
+
+    for i in range(0, len(student_ids), BATCH_SIZE):
+        batch = student_ids[i:i + BATCH_SIZE]
+        rows = await _score_batch(db, batch)
+
+        await db.execute(
+            delete(StudyGroupRecommendation)
+            .where(StudyGroupRecommendation.student_id.in_(batch))
+        )
+        if rows:
+            await db.execute(insert(StudyGroupRecommendation), rows)
+
+    await db.commit()
+
+
+async def refresh_group(db: AsyncSession, study_group_id: int) -> None:
+    course_id = await db.scalar(
+        select(StudyGroup.course_id).where(StudyGroup.id == study_group_id)
+    )
+
+    if course_id is None:
+        await db.execute(
+            delete(StudyGroupRecommendation)
+            .where(StudyGroupRecommendation.study_group_id == study_group_id)
+        )
+        await db.commit()
+        return
+
+    student_ids = (
+        await db.scalars(
+            select(StudentCourse.student_id)
+            .where(StudentCourse.course_id == course_id)
+        )
+    ).all()
+
+    await db.execute(
+        delete(StudyGroupRecommendation)
+        .where(StudyGroupRecommendation.study_group_id == study_group_id)
+    )
+
+    for i in range(0, len(student_ids), BATCH_SIZE):
+        rows = await _score_batch(
+            db, student_ids[i:i + BATCH_SIZE], group_ids=[study_group_id]
+        )
+        if rows:
+            await db.execute(insert(StudyGroupRecommendation), rows)
+
+    await db.commit()
+
+
+@jobs.handler("recommendations.refresh_membership")
+async def refresh_after_membership_change(
+    study_group_id: int,
+    student_ids: Iterable[int],
+) -> None:
+    async with AsyncSessionLocal() as db:
+        await refresh_group(db, study_group_id)
+        await refresh_students(db, student_ids)
+
+
+@jobs.handler("recommendations.refresh_enrollment")
+async def refresh_after_enrollment_change(student_ids: Iterable[int]) -> None:
+    async with AsyncSessionLocal() as db:
+        await refresh_students(db, student_ids)
+
+
+async def rebuild_all() -> None:
+    async with AsyncSessionLocal() as db:
+        student_ids = (
+            await db.scalars(select(StudentCourse.student_id).distinct())
+        ).all()
+        await db.execute(delete(StudyGroupRecommendation))
+        await refresh_students(db, student_ids)
+
+
+async def main() -> None:
+    try:
+        await rebuild_all()
+    finally:
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
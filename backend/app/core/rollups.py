@@ -0,0 +1,139 @@
+import asyncio
+from typing import Iterable
+
+from sqlalchemy import select, delete, insert, func, case
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import analytics, jobs
+from app.deps.db import AsyncSessionLocal, dispose_engines
+from app.schemas.models import (
+    Course,
+    CourseActivity,
+    StudyGroup,
+    StudyGroupJoinRequest,
+    StudyGroupMember,
+)
+
+# Handlers queue a refresh of the one course they touched; the periodic full
+# rebuild catches anything that changed outside the API (admin edits,
+# cascades from deleted students).
+REFRESH_INTERVAL_SECONDS = 10 * 60
+BATCH_SIZE = 500
+
+
+async def _aggregate(db: AsyncSession, course_ids: list[int] | None) -> list[dict]:
+    members = select(
+        StudyGroupMember.study_group_id,
+        func.count().label("n"),
+    ).group_by(StudyGroupMember.study_group_id)
+    pending = select(
+        StudyGroupJoinRequest.study_group_id,
+        func.count().label("n"),
+    ).group_by(StudyGroupJoinRequest.study_group_id)
+
+    if course_ids is not None:
+        # Count only the batch's groups, not every group on campus.
+        groups = select(StudyGroup.id).where(StudyGroup.course_id.in_(course_ids))
+        members = members.where(StudyGroupMember.study_group_id.in_(groups))
+        pending = pending.where(StudyGroupJoinRequest.study_group_id.in_(groups))
+    members = members.subquery()
+    pending = pending.subquery()
+
+    member_count = func.coalesce(members.c.n, 0)
+    query = (
+        select(
+            StudyGroup.course_id,
+            StudyGroup.semester_id,
+            func.count(StudyGroup.id),
+            func.sum(member_count),
+            func.sum(
+                case(
+                    (StudyGroup.capacity > member_count, StudyGroup.capacity - member_count),
+                    else_=0,
+                )
+            ),
+            func.sum(func.coalesce(pending.c.n, 0)),
+        )
+        .outerjoin(members, members.c.study_group_id == StudyGroup.id)
+        .outerjoin(pending, pending.c.study_group_id == StudyGroup.id)
+        .group_by(StudyGroup.course_id, StudyGroup.semester_id)
+    )
+    courses = select(Course.id, Course.semester_id)
+
+    if course_ids is not None:
+        query = query.where(StudyGroup.course_id.in_(course_ids))
+        courses = courses.where(Course.id.in_(course_ids))
+
+    # Courses without groups still get a row so they show up when browsing.
+    rows = {
+        (course_id, semester_id): {
+            "course_id": course_id,
+            "semester_id": semester_id,
+            "group_count": 0,
+            "member_count": 0,
+            "open_seats": 0,
+            "pending_requests": 0,
+        }
+        for course_id, semester_id in await db.execute(courses)
+    }
+
+    for course_id, semester_id, groups, members_total, seats, requests in (
+        await db.execute(query)
+    ):
+        rows[(course_id, semester_id)] = {
+            "course_id": course_id,
+            "semester_id": semester_id,
+            "group_count": groups,
+            "member_count": members_total,
+            "open_seats": seats,
+            "pending_requests": requests,
+        }
+
+    return list(rows.values())
+
+
+async def refresh_courses(db: AsyncSession, course_ids: Iterable[int]) -> None:
+    course_ids = sorted(set(course_ids))
+    semester_ids = set()
+
+    for i in range(0, len(course_ids), BATCH_SIZE):
+        batch = course_ids[i:i + BATCH_SIZE]
+        rows = await _aggregate(db, batch)
+        semester_ids.update(row["semester_id"] for row in rows)
+
+        await db.execute(
+            delete(CourseActivity).where(CourseActivity.course_id.in_(batch))
+        )
+        if rows:
+            await db.execute(insert(CourseActivity), rows)
+
+    # Whatever changed these courses also changed their semester's stats.
+    await analytics.mark_stale(db, semester_ids)
+    await db.commit()
+
+
+@jobs.handler("rollups.refresh_course")
+async def refresh_after_group_change(course_id: int) -> None:
+    async with AsyncSessionLocal() as db:
+        await refresh_courses(db, [course_id])
+
+
+@jobs.handler("rollups.rebuild_all", every=REFRESH_INTERVAL_SECONDS)
+async def rebuild_all() -> None:
+    async with AsyncSessionLocal() as db:
+        rows = await _aggregate(db, None)
+        await db.execute(delete(CourseActivity))
+        for i in range(0, len(rows), BATCH_SIZE):
+            await db.execute(insert(CourseActivity), rows[i:i + BATCH_SIZE])
+        await db.commit()
+
+
+async def main() -> None:
+    try:
+        await rebuild_all()
+    finally:
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+import os
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+# Recurring meetings are stored as minute-of-week intervals in campus local
+# time, so "Tuesday 18:00" means the same thing all semester regardless of
+# DST. Monday 00:00 is minute 0.
+CAMPUS_TIMEZONE = ZoneInfo(os.getenv("CAMPUS_TIMEZONE", "UTC"))
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+DEFAULT_DURATION_MINUTES = 60
+MAX_DURATION_MINUTES = 240
+
+DAYS = {
+    "monday": 0, "mon": 0, "m": 0,
+    "tuesday": 1, "tue": 1, "tues": 1, "tu": 1,
+    "wednesday": 2, "wed": 2, "w": 2,
+    "thursday": 3, "thu": 3, "thur": 3, "thurs": 3, "th": 3,
+    "friday": 4, "fri": 4, "f": 4,
+    "saturday": 5, "sat": 5, "sa": 5,
+    "sunday": 6, "sun": 6, "su": 6,
+}
+
+
+def parse_day(day: str | None) -> int | None:
+    if not day:
+        return None
+    key = day.strip().lower().rstrip(".")
+    return DAYS.get(key, DAYS.get(key.rstrip("s")))
+
+
+def to_campus_time(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(CAMPUS_TIMEZONE)
+
+
+def minute_of_week(weekday: int, at: time) -> int:
+    return weekday * MINUTES_PER_DAY + at.hour * 60 + at.minute
+
+
+def meeting_slot(
+    meeting_time: datetime,
+    meeting_day: str | None,
+    duration_minutes: int | None,
+) -> tuple[int, int, bool]:
+    local = to_campus_time(meeting_time)
+    weekday = parse_day(meeting_day)
+    recurring = weekday is not None
+
+    if not recurring:
+        weekday = local.weekday()
+
+    start = minute_of_week(weekday, local.time())
+    return start, start + (duration_minutes or DEFAULT_DURATION_MINUTES), recurring
+
+
+# Intervals may run past Sunday midnight (end > MINUTES_PER_WEEK), so two
+# of them overlap if they do in the same week or one week apart. Returns
+# [start, end) as seen from the previous, current and next week.
+def week_shifts(start: int, end: int) -> list[tuple[int, int]]:
+    return [
+        (start + shift, end + shift)
+        for shift in (-MINUTES_PER_WEEK, 0, MINUTES_PER_WEEK)
+    ]
+
+
+# Splits an absolute [start, end) window into minute-of-week ranges that
+# don't wrap past Sunday midnight.
+def week_windows(start: datetime, end: datetime) -> list[tuple[int, int]]:
+    if end - start >= timedelta(days=7):
+        return [(0, MINUTES_PER_WEEK)]
+
+    local = to_campus_time(start)
+    lo = minute_of_week(local.weekday(), local.time())
+    hi = lo + int((end - start).total_seconds() // 60)
+
+    if hi <= MINUTES_PER_WEEK:
+        return [(lo, hi)]
+    return [(lo, MINUTES_PER_WEEK), (0, hi - MINUTES_PER_WEEK)]
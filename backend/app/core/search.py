@@ -0,0 +1,93 @@
+import re
+
+from sqlalchemy import DDL, and_, func, or_
+
+# Groups are searched through a tsvector kept on "studyGroups" by triggers,
+# so a course edit (e.g. a new professor) is reflected in every group of
+# that course without the app having to remember to reindex. Course code
+# ranks above professor, which ranks above location.
+#
+# The triggers and the queries both use SEARCH_CONFIG. Changing it needs a
+# migration that re-runs SEARCH_FUNCTION and rebuilds search_vector.
+SEARCH_CONFIG = "simple"
+
+SEARCH_FUNCTION = DDL(f"""
+CREATE OR REPLACE FUNCTION study_group_search_vector(loc text, cid integer)
+RETURNS tsvector AS $$
+    SELECT
+        setweight(to_tsvector('{SEARCH_CONFIG}', c.department || ' ' || c.course_number || ' ' || c.department || c.course_number), 'A')
+        || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(c.professor, '')), 'B')
+        || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(loc, '')), 'C')
+    FROM courses c
+    WHERE c.id = cid
+$$ LANGUAGE sql STABLE;
+""")
+
+STUDY_GROUP_TRIGGER_FUNCTION = DDL("""
+CREATE OR REPLACE FUNCTION study_groups_search_vector_trigger()
+RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := study_group_search_vector(NEW.location, NEW.course_id);
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+""")
+
+STUDY_GROUP_TRIGGER = DDL("""
+CREATE TRIGGER study_groups_search_vector_update
+    BEFORE INSERT OR UPDATE OF location, course_id ON "studyGroups"
+    FOR EACH ROW EXECUTE FUNCTION study_groups_search_vector_trigger();
+""")
+
+COURSE_TRIGGER_FUNCTION = DDL("""
+CREATE OR REPLACE FUNCTION courses_search_vector_trigger()
+RETURNS trigger AS $$
+BEGIN
+    UPDATE "studyGroups"
+    SET search_vector = study_group_search_vector(location, course_id)
+    WHERE course_id = NEW.id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+""")
+
+COURSE_TRIGGER = DDL("""
+CREATE TRIGGER courses_search_vector_update
+    AFTER UPDATE OF department, course_number, professor ON courses
+    FOR EACH ROW EXECUTE FUNCTION courses_search_vector_trigger();
+""")
+
+# One statement each: asyncpg runs DDL as prepared statements.
+SEARCH_DDL = [
+    SEARCH_FUNCTION,
+    STUDY_GROUP_TRIGGER_FUNCTION,
+    STUDY_GROUP_TRIGGER,
+    COURSE_TRIGGER_FUNCTION,
+    COURSE_TRIGGER,
+]
+
+
+def search_terms(q: str) -> list[str]:
+    return re.findall(r"\w+", q.lower())
+
+
+# Every term is prefix-matched and all terms must match, so "cs 61" finds
+# "CS 61A". Only word characters reach to_tsquery, which keeps user input
+# from producing tsquery syntax errors.
+def build_tsquery(q: str):
+    terms = search_terms(q)
+    if not terms:
+        return None
+    return func.to_tsquery(SEARCH_CONFIG, " & ".join(f"{t}:*" for t in terms))
+
+
+# Fallback for backends without full-text search (embedded SQLite): every
+# term must appear in one of the columns. Unranked, and a scan, but fine at
+# single-campus scale.
+def build_like_filter(q: str, columns: list):
+    terms = search_terms(q)
+    if not terms:
+        return None
+    return and_(
+        *(or_(*(column.ilike(f"%{term}%") for column in columns)) for term in terms)
+    )
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from fastapi import Response
+from sqlalchemy import bindparam, delete, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core import jobs, tenancy
+from app.deps.db import AsyncSessionLocal
+from app.schemas.models import Session
+
+logger = logging.getLogger(__name__)
+
+# Sessions slide: each authenticated request pushes expires_at out to
+# SESSION_TTL from now, up to MAX_SESSION_AGE after login. Renewals aren't
+# written on the request path. They're buffered per worker and flushed as
+# one bulk UPDATE every FLUSH_INTERVAL_SECONDS, and a renewal is only
+# buffered once it would move the expiry by RENEW_STEP, so an active
+# session costs at most one row update per RENEW_STEP.
+SESSION_TTL = timedelta(days=7)
+MAX_SESSION_AGE = timedelta(days=30)
+RENEW_STEP = timedelta(minutes=5)
+FLUSH_INTERVAL_SECONDS = 30.0
+
+SWEEP_INTERVAL_SECONDS = 60 * 60
+
+
+def set_cookie(response: Response, token: str, expires_at: datetime) -> None:
+    response.set_cookie(
+        key="sessionId",
+        value=token,
+        httponly=True,
+        secure=True,
+        samesite="lax",
+        max_age=max(int((expires_at - datetime.now(timezone.utc)).total_seconds()), 0),
+    )
+
+
+class RenewalBuffer:
+    def __init__(self):
+        # token -> (last_seen_at, expires_at)
+        self.pending: dict[str, tuple[datetime, datetime]] = {}
+
+    def touch(self, session: Session) -> datetime | None:
+        # Returns the new expiry if the session was renewed.
+        now = datetime.now(timezone.utc)
+        expires_at = min(now + SESSION_TTL, _aware(session.created_at) + MAX_SESSION_AGE)
+
+        current = _aware(session.expires_at)
+        if session.session_token in self.pending:
+            current = max(current, self.pending[session.session_token][1])
+        if expires_at - current < RENEW_STEP:
+            return None
+
+        self.pending[session.session_token] = (now, expires_at)
+        return expires_at
+
+    async def flush(self) -> None:
+        pending, self.pending = self.pending, {}
+        if not pending:
+            return
+
+        # Another worker may have renewed the same session further already.
+        statement = (
+            update(Session.__table__)
+            .where(
+                Session.session_token == bindparam("token"),
+                Session.expires_at < bindparam("new_expires_at"),
+            )
+            .values(last_seen_at=bindparam("seen"), expires_at=bindparam("new_expires_at"))
+        )
+        rows = [
+            {"token": token, "seen": seen, "new_expires_at": expires_at}
+            for token, (seen, expires_at) in pending.items()
+        ]
+
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(statement, rows)
+                await db.commit()
+        except SQLAlchemyError:
+            # Renewals are best effort; the next request renews again.
+            logger.exception("Dropped %d session renewals", len(rows))
+
+    async def run(self) -> None:
+        try:
+            while True:
+                await asyncio.sleep(FLUSH_INTERVAL_SECONDS)
+                await self.flush()
+        finally:
+            await self.flush()
+
+
+def _aware(value: datetime) -> datetime:
+    # SQLite hands timestamps back naive.
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+# Per tenant, since each flushes to its own database.
+renewals = tenancy.TenantLocal(RenewalBuffer)
+
+
+@jobs.handler("sessions.evict_expired", every=SWEEP_INTERVAL_SECONDS)
+async def evict_expired() -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            delete(Session).where(Session.expires_at < datetime.now(timezone.utc))
+        )
+        await db.commit()
@@ -0,0 +1,60 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+from app.core import tenancy
+
+# Coalesces concurrent identical reads inside one worker: the first caller
+# for a key starts the work, everyone arriving before it finishes awaits the
+# same task and gets the same result (or exception). Nothing is cached once
+# the task completes.
+#
+# The work runs as its own task, so a leader whose client disconnects does
+# not cancel it for the followers. For the same reason it must not borrow
+# the leader's request-scoped DB session. Keys are per tenant.
+
+_registry: dict[str, "SingleFlight"] = {}
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.errors = 0
+        _registry[name] = self
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        key = (tenancy.current().name, key)
+        task = self._inflight.get(key)
+
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "inflight": len(self._inflight),
+        }
+
+
+def all_stats() -> dict[str, dict]:
+    return {name: flight.stats() for name, flight in _registry.items()}
@@ -0,0 +1,194 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# Logs statements slower than SLOW_QUERY_MS as JSON lines to a rotating
+# file. Each entry has the statement with literals and placeholders
+# normalized away (so the same query always logs the same text), the types
+# of its parameters rather than their values, the route or job it ran for,
+# and how long it took. With SLOW_QUERY_EXPLAIN=1 the plan of a slow
+# SELECT is captured too, on a separate connection and at most once per
+# statement per EXPLAIN_INTERVAL_SECONDS. Statements run with the
+# execution option slow_query_log=False are never logged.
+
+THRESHOLD_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SAMPLE_RATE = float(os.getenv("SLOW_QUERY_SAMPLE_RATE", "1.0"))
+EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "0") == "1"
+EXPLAIN_INTERVAL_SECONDS = 10 * 60
+LOG_PATH = os.getenv("SLOW_QUERY_LOG", "slow_queries.log")
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUPS = 5
+
+logger = logging.getLogger("app.slow_query")
+
+# What the current task is doing: the ASGI scope of the request being
+# served, or a label such as "job:rollups.refresh_course".
+origin: ContextVar[dict | str | None] = ContextVar("slow_query_origin", default=None)
+
+_explained: dict[str, float] = {}
+_explain_tasks: set[asyncio.Task] = set()
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.$])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(
+    r"(?:\$\d+|%\(\w+\)s|%s|(?<!:):\w+|\?)"
+    # asyncpg placeholders carry a cast, e.g. $1::TIMESTAMP WITH TIME ZONE
+    r"(?:::(?:TIMESTAMP WITH(?:OUT)? TIME ZONE|[A-Z]+(?:\([\d, ]+\))?)(?:\[\])?)?"
+)
+_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize(statement: str) -> str:
+    statement = _STRING.sub("?", statement)
+    statement = _NUMBER.sub("?", statement)
+    statement = _PLACEHOLDER.sub("?", statement)
+    statement = _LIST.sub("?, ...", statement)
+    return _SPACE.sub(" ", statement).strip()
+
+
+def _shape(parameters):
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def parameter_shape(parameters, executemany: bool):
+    if executemany:
+        rows = list(parameters)
+        return {"rows": len(rows), "row": _shape(rows[0]) if rows else None}
+    return _shape(parameters)
+
+
+def current_origin() -> str | None:
+    value = origin.get()
+    if not isinstance(value, dict):
+        return value
+
+    # The router adds the matched route to the scope once it has run.
+    route = value.get("route")
+    return f"{value['method']} {getattr(route, 'path', value['path'])}"
+
+
+class OriginMiddleware:
+    # Plain ASGI so the context var is set in the task that runs the route.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        token = origin.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            origin.reset(token)
+
+
+def _configure_logger() -> None:
+    if logger.handlers:
+        return
+    directory = os.path.dirname(LOG_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    handler = RotatingFileHandler(LOG_PATH, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def _should_explain(statement: str, fingerprint: str) -> bool:
+    if not EXPLAIN or not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        return False
+
+    now = time.monotonic()
+    if now - _explained.get(fingerprint, -EXPLAIN_INTERVAL_SECONDS) < EXPLAIN_INTERVAL_SECONDS:
+        return False
+    _explained[fingerprint] = now
+    return True
+
+
+async def _explain(engine: AsyncEngine, entry: dict, statement: str, parameters) -> None:
+    # A failed EXPLAIN on the query's own connection would abort its
+    # transaction, so plans come from a connection of their own.
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    try:
+        async with engine.connect() as conn:
+            rows = await conn.exec_driver_sql(
+                prefix + statement,
+                parameters,
+                execution_options={"slow_query_log": False},
+            )
+            entry["plan"] = [" ".join(str(column) for column in row) for row in rows]
+    except Exception as exc:
+        entry["plan_error"] = repr(exc)
+    logger.info(json.dumps(entry, default=str))
+
+
+def _record(engine: AsyncEngine, statement, parameters, executemany, elapsed_ms) -> None:
+    fingerprint = normalize(statement)
+    entry = {
+        "at": datetime.now(timezone.utc).isoformat(),
+        "duration_ms": round(elapsed_ms, 2),
+        "origin": current_origin(),
+        "statement": fingerprint,
+        "parameters": parameter_shape(parameters, executemany),
+    }
+
+    if not executemany and _should_explain(statement, fingerprint):
+        try:
+            task = asyncio.get_running_loop().create_task(
+                _explain(engine, entry, statement, parameters)
+            )
+        except RuntimeError:
+            pass
+        else:
+            _explain_tasks.add(task)
+            task.add_done_callback(_explain_tasks.discard)
+            return
+
+    logger.info(json.dumps(entry, default=str))
+
+
+def install(engine: AsyncEngine) -> None:
+    if THRESHOLD_MS < 0:
+        return
+    _configure_logger()
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _finish(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info["query_started"].pop()) * 1000
+        if (
+            elapsed_ms >= THRESHOLD_MS
+            and random.random() < SAMPLE_RATE
+            and context.execution_options.get("slow_query_log", True)
+        ):
+            _record(engine, statement, parameters, executemany, elapsed_ms)
+
+    # A statement that raised never reaches after_cursor_execute. An
+    # invalidated connection (e.g. a cancelled task) can't be asked for its
+    # info, and its record starts afresh anyway.
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def _failed(context):
+        if context.connection is not None and not context.connection.invalidated:
+            started = context.connection.info.get("query_started")
+            if started:
+                started.pop()
@@ -0,0 +1,245 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Generic, TypeVar
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+# Several campuses share one deployment, each with a database of its own.
+# A request's campus (its tenant) comes from the X-Tenant header or the
+# Host, and get_db and AsyncSessionLocal hand out sessions on that
+# tenant's engine, so pools and anything keyed by tenant (rate limits,
+# the concurrency limiter, single-flight keys, session renewals) are
+# separate per campus. Background loops run once per tenant.
+#
+# Tenants live in the JSON file at TENANTS_FILE, which app.core.placement
+# edits:
+#
+#   {
+#     "nodes": {"pg-1": "postgresql+asyncpg://postgres@db1/{tenant}"},
+#     "tenants": {"berkeley": {"node": "pg-1", "hosts": ["berkeley.example.edu"]}}
+#   }
+#
+# A node's URL has a {tenant} placeholder for the database name (or file
+# name, for SQLite). Processes re-read the file when it changes, checking
+# at most every RELOAD_INTERVAL_SECONDS. A tenant marked "frozen" is being
+# moved: its requests get a 503 and its background loops are stopped.
+#
+# Without TENANTS_FILE there is a single tenant on DATABASE_URL, which
+# serves every host. Scripts and CLIs work on the tenant named by $TENANT.
+
+TENANTS_FILE = os.getenv("TENANTS_FILE")
+DEFAULT_TENANT = os.getenv("TENANT")
+SINGLE_TENANT = "default"
+HEADER = "x-tenant"
+RELOAD_INTERVAL_SECONDS = 5.0
+FROZEN_RETRY_AFTER = 30
+
+NAME = re.compile(r"^[a-z][a-z0-9_]{0,62}$")
+
+T = TypeVar("T")
+
+
+class UnknownTenant(LookupError):
+    pass
+
+
+@dataclass(frozen=True)
+class Tenant:
+    name: str
+    database_url: str
+    node: str | None = None
+    hosts: tuple[str, ...] = ()
+    frozen: bool = False
+
+
+class Registry:
+    def __init__(self, path: str | None = TENANTS_FILE):
+        self.path = path
+        self.nodes: dict[str, str] = {}
+        self.tenants: dict[str, Tenant] = {}
+        self._by_host: dict[str, Tenant] = {}
+        self._mtime: float | None = None
+        self._checked: float | None = None
+
+    def load(self) -> None:
+        if self.path is None:
+            # Imported here: app.deps.db builds on this module.
+            from app.deps.db import DATABASE_URL
+
+            self.tenants = {SINGLE_TENANT: Tenant(SINGLE_TENANT, DATABASE_URL)}
+            self._by_host = {}
+            return
+
+        self._mtime = os.stat(self.path).st_mtime
+        with open(self.path) as f:
+            config = json.load(f)
+
+        nodes = config.get("nodes", {})
+        tenants = {}
+        for name, entry in config.get("tenants", {}).items():
+            if not NAME.match(name):
+                raise ValueError(f"Invalid tenant name: {name!r}")
+            if entry["node"] not in nodes:
+                raise ValueError(f"Tenant {name} is on unknown node {entry['node']!r}")
+            tenants[name] = Tenant(
+                name=name,
+                database_url=nodes[entry["node"]].format(tenant=name),
+                node=entry["node"],
+                hosts=tuple(host.lower() for host in entry.get("hosts", [])),
+                frozen=entry.get("frozen", False),
+            )
+
+        self.nodes = nodes
+        self.tenants = tenants
+        self._by_host = {host: t for t in tenants.values() for host in t.hosts}
+
+    def refresh(self) -> None:
+        # Loads on first use, then re-reads the file if it has changed.
+        # Cheap enough to call on every lookup.
+        now = time.monotonic()
+        if self._checked is None:
+            self._checked = now
+            self.load()
+            return
+        if self.path is None or now - self._checked < RELOAD_INTERVAL_SECONDS:
+            return
+        self._checked = now
+
+        try:
+            if os.stat(self.path).st_mtime != self._mtime:
+                self.load()
+        except (OSError, ValueError, KeyError):
+            # Half-written or broken: keep serving the last good copy.
+            logger.exception("Could not reload %s", self.path)
+
+    def all(self) -> list[Tenant]:
+        self.refresh()
+        return list(self.tenants.values())
+
+    def get(self, name: str) -> Tenant:
+        self.refresh()
+        try:
+            return self.tenants[name]
+        except KeyError:
+            raise UnknownTenant(name) from None
+
+    def resolve(self, header: str | None, host: str | None) -> Tenant:
+        self.refresh()
+        if header:
+            return self.get(header.strip().lower())
+        if host:
+            tenant = self._by_host.get(host.split(":", 1)[0].lower())
+            if tenant is not None:
+                return tenant
+        if len(self.tenants) == 1 and not self._by_host:
+            return next(iter(self.tenants.values()))
+        raise UnknownTenant(host)
+
+    def default(self) -> Tenant:
+        self.refresh()
+        if DEFAULT_TENANT:
+            return self.get(DEFAULT_TENANT)
+        if len(self.tenants) == 1:
+            return next(iter(self.tenants.values()))
+        raise UnknownTenant("no tenant selected; set TENANT")
+
+
+registry = Registry()
+
+# Only the name is kept, so a long-running task picks up a tenant's new
+# database after a move.
+_current: ContextVar[str | None] = ContextVar("tenant", default=None)
+
+
+def current() -> Tenant:
+    name = _current.get()
+    return registry.default() if name is None else registry.get(name)
+
+
+def use(name: str) -> None:
+    # For tasks that serve one tenant; each task has its own context.
+    _current.set(registry.get(name).name)
+
+
+class TenantLocal(Generic[T]):
+    # One instance of something per tenant, created on first use.
+    def __init__(self, factory: Callable[[], T]):
+        self.factory = factory
+        self._instances: dict[str, T] = {}
+
+    def get(self) -> T:
+        name = current().name
+        if name not in self._instances:
+            self._instances[name] = self.factory()
+        return self._instances[name]
+
+
+async def run_per_tenant(loops: Callable[[], list[Awaitable]]) -> None:
+    # Runs loops() in every tenant that isn't frozen, starting and stopping
+    # them as tenants are placed, frozen, moved or removed.
+    running: dict[tuple[str, str], asyncio.Task] = {}
+
+    async def serve(name: str) -> None:
+        use(name)
+        await asyncio.gather(*loops())
+
+    try:
+        while True:
+            wanted = {(t.name, t.database_url) for t in registry.all() if not t.frozen}
+
+            for key in running.keys() - wanted:
+                running.pop(key).cancel()
+            for key in wanted - running.keys():
+                running[key] = asyncio.create_task(serve(key[0]))
+
+            await asyncio.sleep(RELOAD_INTERVAL_SECONDS)
+    finally:
+        for task in running.values():
+            task.cancel()
+        await asyncio.gather(*running.values(), return_exceptions=True)
+
+
+class TenantMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        header, host = headers.get(HEADER.encode()), headers.get(b"host")
+        try:
+            tenant = registry.resolve(
+                header.decode("latin-1") if header else None,
+                host.decode("latin-1") if host else None,
+            )
+        except UnknownTenant:
+            response = JSONResponse(
+                status_code=status.HTTP_404_NOT_FOUND,
+                content={"detail": "Unknown campus"},
+            )
+            return await response(scope, receive, send)
+
+        if tenant.frozen:
+            response = JSONResponse(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                content={"detail": "Down for maintenance, try again shortly"},
+                headers={"Retry-After": str(FROZEN_RETRY_AFTER)},
+            )
+            return await response(scope, receive, send)
+
+        token = _current.set(tenant.name)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current.reset(token)
@@ -0,0 +1,402 @@
+import asyncio
+import functools
+import json
+import logging
+import os
+import random
+import secrets
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+
+import httpx
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.concurrency import run_in_threadpool
+
+from app.core import slow_query
+
+# Minimal request tracing. Each sampled request gets a root span with
+# children for the traced dependencies, the endpoint, response encoding,
+# pool checkouts and every SQL statement. Trace context comes in and goes
+# out in W3C `traceparent` headers; an incoming sampled parent is always
+# honoured, otherwise TRACE_SAMPLE_RATE of requests are traced.
+#
+# Finished traces go to TRACE_EXPORTER: "file" appends one JSON line per
+# span to TRACE_FILE, "otlp" posts OTLP/HTTP JSON batches to
+# TRACE_OTLP_ENDPOINT (any collector, or a stand-in that accepts the same
+# payload), "none" drops them.
+
+SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+EXPORTER = os.getenv("TRACE_EXPORTER", "file")
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+SERVICE_NAME = "bearnet-api"
+FLUSH_INTERVAL_SECONDS = 2.0
+MAX_BUFFERED_SPANS = 10_000
+MAX_STATEMENT_LENGTH = 2000
+HEADER = "traceparent"
+
+# OTLP span kinds
+INTERNAL = 1
+SERVER = 2
+CLIENT = 3
+
+_current: ContextVar["Span | None"] = ContextVar("trace_span", default=None)
+_phases: ContextVar[dict | None] = ContextVar("trace_phases", default=None)
+
+
+class Span:
+    __slots__ = (
+        "trace", "trace_id", "span_id", "parent_id", "name", "kind",
+        "start_ns", "end_ns", "attributes", "error",
+    )
+
+    def __init__(self, trace: list, trace_id: str, parent_id: str | None, name: str, kind: int, attributes: dict):
+        self.trace = trace
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.error = None
+
+    def child(self, name: str, kind: int = INTERNAL, **attributes) -> "Span":
+        return Span(self.trace, self.trace_id, self.span_id, name, kind, attributes)
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self.trace.append(self)
+
+
+@contextmanager
+def span(name: str, kind: int = INTERNAL, **attributes):
+    # No-op outside a sampled trace.
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+
+    child = parent.child(name, kind, **attributes)
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as exc:
+        child.error = repr(exc)
+        raise
+    finally:
+        _current.reset(token)
+        child.end()
+
+
+def traced(name: str | None = None):
+    # For async dependencies and helpers; functools.wraps keeps the
+    # signature FastAPI reads dependencies from.
+    def decorate(fn):
+        span_name = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with span(span_name):
+                return await fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+# ---------- Exporters ----------
+
+def _value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(span: Span) -> dict:
+    return {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "parentSpanId": span.parent_id or "",
+        "name": span.name,
+        "kind": span.kind,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": [
+            {"key": key, "value": _value(value)}
+            for key, value in span.attributes.items()
+            if value is not None
+        ],
+        "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+    }
+
+
+class FileExporter:
+    def __init__(self, path: str = TRACE_FILE):
+        self.path = path
+        self.logger = logging.getLogger("app.tracing")
+
+    def _configure(self) -> None:
+        # Deferred so the file only appears once something is traced.
+        handler = RotatingFileHandler(self.path, maxBytes=50 * 1024 * 1024, backupCount=3)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        self.logger.addHandler(handler)
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+
+    def export(self, spans: list[Span]) -> None:
+        if not self.logger.handlers:
+            self._configure()
+        for span in spans:
+            self.logger.info(json.dumps({
+                "trace_id": span.trace_id,
+                "span_id": span.span_id,
+                "parent_id": span.parent_id,
+                "name": span.name,
+                "start_ns": span.start_ns,
+                "duration_ms": round((span.end_ns - span.start_ns) / 1e6, 3),
+                "attributes": span.attributes,
+                "error": span.error,
+            }, default=str))
+
+    async def run(self) -> None:
+        return
+
+
+class OTLPExporter:
+    # Buffers spans and posts them from run(), which the app's lifespan
+    # starts; the oldest spans are dropped if the collector can't keep up.
+    def __init__(self, endpoint: str = OTLP_ENDPOINT):
+        self.endpoint = endpoint
+        self.buffer: deque[Span] = deque(maxlen=MAX_BUFFERED_SPANS)
+
+    def export(self, spans: list[Span]) -> None:
+        self.buffer.extend(spans)
+
+    async def flush(self, client: httpx.AsyncClient) -> None:
+        spans = [self.buffer.popleft() for _ in range(len(self.buffer))]
+        if not spans:
+            return
+        try:
+            await client.post(self.endpoint, json={
+                "resourceSpans": [{
+                    "resource": {"attributes": [
+                        {"key": "service.name", "value": {"stringValue": SERVICE_NAME}},
+                    ]},
+                    "scopeSpans": [{
+                        "scope": {"name": __name__},
+                        "spans": [_otlp_span(span) for span in spans],
+                    }],
+                }],
+            })
+        except httpx.HTTPError:
+            logging.getLogger(__name__).warning("Dropped %d spans", len(spans))
+
+    async def run(self) -> None:
+        async with httpx.AsyncClient(timeout=5) as client:
+            try:
+                while True:
+                    await asyncio.sleep(FLUSH_INTERVAL_SECONDS)
+                    await self.flush(client)
+            finally:
+                await self.flush(client)
+
+
+class NoExporter:
+    def export(self, spans: list[Span]) -> None:
+        return
+
+    async def run(self) -> None:
+        return
+
+
+EXPORTERS = {
+    "file": FileExporter,
+    "otlp": OTLPExporter,
+    "none": NoExporter,
+}
+
+exporter = EXPORTERS[EXPORTER]()
+
+
+# ---------- HTTP ----------
+
+def _parse_traceparent(value: str | None) -> tuple[str, str, bool] | None:
+    # version-trace_id-parent_id-flags
+    parts = (value or "").strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16), int(parts[3], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return parts[1], parts[2], bool(int(parts[3], 16) & 1)
+
+
+class TracingMiddleware:
+    # Plain ASGI, outermost, so the root span covers every other
+    # middleware and the context var is visible to the route.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        incoming = _parse_traceparent(headers.get(HEADER.encode(), b"").decode("latin-1"))
+        if incoming:
+            trace_id, parent_id, sampled = incoming
+        else:
+            trace_id, parent_id = secrets.token_hex(16), None
+            sampled = random.random() < SAMPLE_RATE
+
+        root = Span([], trace_id, parent_id, scope["method"], SERVER, {
+            "http.method": scope["method"],
+            "http.target": scope["path"],
+        })
+        outgoing = f"00-{trace_id}-{root.span_id}-{'01' if sampled else '00'}".encode()
+
+        async def send_with_header(message):
+            if message["type"] == "http.response.start":
+                root.attributes["http.status_code"] = message["status"]
+                message = {
+                    **message,
+                    "headers": [*message.get("headers", []), (HEADER.encode(), outgoing)],
+                }
+            await send(message)
+
+        token = _current.set(root if sampled else None)
+        try:
+            await self.app(scope, receive, send_with_header)
+        except BaseException as exc:
+            root.error = repr(exc)
+            raise
+        finally:
+            _current.reset(token)
+            if sampled:
+                route = scope.get("route")
+                if route is not None:
+                    root.name = f"{scope['method']} {route.path}"
+                    root.attributes["http.route"] = route.path
+                root.end()
+                exporter.export(root.trace)
+
+
+class TracedRoute(APIRoute):
+    # Splits the time spent inside a route into resolving dependencies,
+    # running the endpoint and encoding the response.
+    def __init__(self, path, endpoint, **kwargs):
+        # include_router() builds a new route from the included one's
+        # (already wrapped) endpoint.
+        if getattr(endpoint, "traced", False):
+            return super().__init__(path, endpoint, **kwargs)
+
+        @functools.wraps(endpoint)
+        async def traced_endpoint(*args, **kwargs):
+            phases = _phases.get()
+            if phases is None:
+                return await _call(endpoint, *args, **kwargs)
+
+            _next_phase(phases, "endpoint")
+            result = await _call(endpoint, *args, **kwargs)
+            _next_phase(phases, "encode")
+            return result
+
+        traced_endpoint.traced = True
+        super().__init__(path, traced_endpoint, **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def traced_handler(request):
+            route_span = _current.get()
+            if route_span is None:
+                return await handler(request)
+
+            phases = {"route": route_span}
+            token = _phases.set(phases)
+            try:
+                _next_phase(phases, "dependencies")
+                return await handler(request)
+            finally:
+                phases["active"].end()
+                _phases.reset(token)
+                _current.set(route_span)
+
+        return traced_handler
+
+
+def _next_phase(phases: dict, name: str) -> None:
+    # The endpoint runs in the handler's context, so making the new phase
+    # current here parents everything after it (queries included) to it.
+    if "active" in phases:
+        phases["active"].end()
+    phases["active"] = phases["route"].child(name)
+    _current.set(phases["active"])
+
+
+async def _call(fn, *args, **kwargs):
+    if asyncio.iscoroutinefunction(fn):
+        return await fn(*args, **kwargs)
+    # FastAPI runs sync endpoints in a worker thread; keep doing that.
+    return await run_in_threadpool(fn, *args, **kwargs)
+
+
+# ---------- Database ----------
+
+class TracedPool(AsyncAdaptedQueuePool):
+    # Pool.connect() is where a request waits for a free connection.
+    def connect(self):
+        with span("db.pool.checkout", CLIENT):
+            return super().connect()
+
+
+def install(engine: AsyncEngine) -> None:
+    system = engine.dialect.name
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _start_statement(conn, cursor, statement, parameters, context, executemany):
+        parent = _current.get()
+        if parent is not None:
+            conn.info.setdefault("trace_spans", []).append(
+                parent.child(
+                    "db.query",
+                    CLIENT,
+                    **{
+                        "db.system": system,
+                        "db.statement": slow_query.normalize(statement)[:MAX_STATEMENT_LENGTH],
+                        "db.executemany": executemany,
+                    },
+                )
+            )
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _end_statement(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None and conn.info.get("trace_spans"):
+            conn.info["trace_spans"].pop().end()
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def _failed_statement(context):
+        connection = context.connection
+        if connection is None or connection.invalidated:
+            return
+        spans = connection.info.get("trace_spans")
+        if spans:
+            failed = spans.pop()
+            failed.error = repr(context.original_exception)
+            failed.end()
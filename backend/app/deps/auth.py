@@ -1,16 +1,34 @@
-from fastapi import Depends, HTTPException, Request
+import hmac
+import os
+
+from fastapi import Depends, HTTPException, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from datetime import  datetime
+from sqlalchemy.orm import joinedload
+from datetime import  datetime, timezone
 from typing import List
 
+from app.core import sessions, tracing
 from app.deps.db import get_db
 from app.schemas.models import Student, Session, StudyGroup
 from app.core.security import *
 
+# Comma-separated emails of students allowed to use admin-only endpoints.
+ADMIN_EMAILS = {
+    email.strip().lower()
+    for email in os.getenv("ADMIN_EMAILS", "").split(",")
+    if email.strip()
+}
+
+# Bearer token that monitoring sends to read /metrics. Unset, /metrics is
+# closed to everyone.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
 
+@tracing.traced()
 async def get_current_student(
     request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
 ) -> Student:
     token = request.cookies.get("sessionId")
@@ -20,11 +38,47 @@ async def get_current_student(
 
     session = await db.scalar(
         select(Session)
-        .where(Session.session_token == token)
+        .where(
+            Session.session_token == token,
+            Session.expires_at > datetime.now(timezone.utc),
+        )
+        .options(joinedload(Session.student))
     )
 
-    if not session or session.expires_at < datetime.utcnow():
+    if not session:
         raise HTTPException(status_code=401, detail="Session expired")
 
+    # Sliding expiry; the database catches up on the next flush.
+    expires_at = sessions.renewals.get().touch(session)
+    if expires_at is not None:
+        sessions.set_cookie(response, token, expires_at)
+
     return session.student
 
+
+
+@tracing.traced()
+async def get_current_admin(
+    student: Student = Depends(get_current_student),
+) -> Student:
+    if student.email.lower() not in ADMIN_EMAILS:
+        raise HTTPException(status_code=403, detail="Admins only")
+
+    return student
+
+
+async def require_metrics_token(request: Request) -> None:
+    # No database lookup: /metrics is exempt from the concurrency limiter so
+    # it can be read under load, and checking a session would add to it.
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+
+    if not (
+        METRICS_TOKEN
+        and scheme.lower() == "bearer"
+        and hmac.compare_digest(token.encode(), METRICS_TOKEN.encode())
+    ):
+        raise HTTPException(
+            status_code=401,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
@@ -1,27 +1,159 @@
+import asyncio
 import os
 from typing import AsyncGenerator
 
 from dotenv import load_dotenv
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.util import await_only
+
+from app.core import concurrency, slow_query, tenancy, tracing
 
 load_dotenv()
 
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise RuntimeError("DATABASE_URL is not set")
+# Without DATABASE_URL the app runs embedded on a local SQLite file, which
+# is enough for a small single-node deployment and for running the app,
+# benchmarks and scripts without the Postgres container.
+SQLITE_PATH = os.getenv("SQLITE_PATH", "bearnet.db")
+DATABASE_URL = os.getenv("DATABASE_URL") or f"sqlite+aiosqlite:///{SQLITE_PATH}"
+
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "foreign_keys": "ON",
+    "busy_timeout": "5000",
+    "temp_store": "MEMORY",
+    "cache_size": "-65536",  # KiB
+    "mmap_size": str(256 * 1024 * 1024),
+}
+
+WRITE_KEYWORDS = ("INSERT", "UPDATE", "DELETE", "REPLACE", "CREATE", "DROP", "ALTER")
+
+# Sessions, engines and pools are per tenant (see app.core.tenancy); each
+# engine is created on first use and replaced if its tenant moves.
+_engines: dict[str, tuple[str, AsyncEngine]] = {}
+_sessionmakers: dict[str, sessionmaker] = {}
+_retired: set[asyncio.Task] = set()
+
+
+def _create_engine(url: str) -> AsyncEngine:
+    engine = create_async_engine(
+        url,
+        echo=os.getenv("SQL_ECHO") == "1",
+        poolclass=concurrency.MeasuredPool,
+    )
+    if engine.dialect.name == "sqlite":
+        _configure_sqlite(engine)
+
+    # Registered after the SQLite hooks so waiting for the write lock doesn't
+    # count towards a statement's time.
+    slow_query.install(engine)
+    tracing.install(engine)
+    return engine
+
+
+# SQLite allows one writer at a time, and a transaction that read before
+# writing can't be upgraded once another writer has committed. So in
+# embedded mode the driver runs in autocommit: reads see the latest
+# committed data (like Postgres' READ COMMITTED), and the first write of a
+# transaction waits for the process-wide write lock and then opens
+# BEGIN IMMEDIATE. The lock is released on commit or rollback. Other
+# processes (job workers, CLIs) are kept in line by busy_timeout.
+def _configure_sqlite(engine: AsyncEngine) -> None:
+    write_lock = asyncio.Lock()
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _configure_connection(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _begin_write(conn, cursor, statement, parameters, context, executemany):
+        if conn.info.get("writing"):
+            return
+        if not statement.lstrip().upper().startswith(WRITE_KEYWORDS):
+            return
+
+        with tracing.span("db.write_lock"), concurrency.db_wait():
+            await_only(write_lock.acquire())
+        conn.info["writing"] = True
+        cursor.execute("BEGIN IMMEDIATE")
+
+    # These fire just before the DBAPI commit/rollback; a writer let in
+    # early waits out the gap in BEGIN IMMEDIATE via busy_timeout.
+    @event.listens_for(engine.sync_engine, "commit")
+    @event.listens_for(engine.sync_engine, "rollback")
+    def _end_write(conn):
+        # An invalidated connection can't be touched (its info raises); the
+        # pool's invalidate hook below releases the lock for it.
+        if conn.invalidated:
+            return
+        if conn.info.pop("writing", False):
+            write_lock.release()
+
+    # Backstop for connections returned or invalidated mid-transaction
+    # (e.g. a cancelled request), so the lock can't leak. Ownership is kept
+    # on the connection record, which outlives an invalidated connection.
+    @event.listens_for(engine.sync_engine.pool, "checkin")
+    @event.listens_for(engine.sync_engine.pool, "invalidate")
+    def _release_write(dbapi_connection, connection_record, *args):
+        if connection_record is not None and connection_record.info.pop("writing", False):
+            write_lock.release()
+
+
+def get_engine(tenant: tenancy.Tenant | None = None) -> AsyncEngine:
+    tenant = tenant or tenancy.current()
+    url, engine = _engines.get(tenant.name, (None, None))
+    if url == tenant.database_url:
+        return engine
+
+    if engine is not None:
+        # Moved. Sessions still open finish on the old database, and their
+        # connections are closed as they're returned.
+        task = asyncio.get_running_loop().create_task(engine.dispose())
+        _retired.add(task)
+        task.add_done_callback(_retired.discard)
+
+    engine = _create_engine(tenant.database_url)
+    _engines[tenant.name] = (tenant.database_url, engine)
+    _sessionmakers[tenant.name] = sessionmaker(
+        bind=engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+    )
+    return engine
+
+
+async def dispose_engines() -> None:
+    # CLIs call this on the way out; aiosqlite's thread keeps the process
+    # alive otherwise.
+    for _, engine in _engines.values():
+        await engine.dispose()
+    _engines.clear()
+    _sessionmakers.clear()
+
+
+class _TenantSessionFactory:
+    def __call__(self, **kwargs) -> AsyncSession:
+        tenant = tenancy.current()
+        get_engine(tenant)
+        return _sessionmakers[tenant.name](**kwargs)
+
+
+# A session on the current tenant's database.
+AsyncSessionLocal = _TenantSessionFactory()
 
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=True,  # set False in prod
-)
 
-AsyncSessionLocal = sessionmaker(
-    bind=engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-)
+def dialect_insert(db: AsyncSession):
+    # insert() with on_conflict_* support for whichever backend is in use.
+    return sqlite_insert if db.bind.dialect.name == "sqlite" else pg_insert
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+        yield session
@@ -1,28 +1,75 @@
-from fastapi import FastAPI, Depends, status
+import asyncio
+import logging
+from fastapi import FastAPI, Depends, HTTPException, status
 from contextlib import asynccontextmanager
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from .deps.db import engine, get_db
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from .deps.db import get_db, get_engine
 from .deps.auth import get_current_student
-from .schemas.models import Base, Student, Course, StudentCourse, StudyGroupMember, StudyGroup, StudyGroupJoinRequest
-from .schemas.objects import CourseDTO, StudyGroupJoinRequestDTO, StudyGroupPreviewDTO
-from .routers import auth, study_group, course
+from .schemas.models import Base, Student
+from .schemas.objects import CourseDTO, StudyGroupJoinRequestDTO
+from .core import concurrency, recommendations, idempotency, rate_limit, queries, jobs, sessions, slow_query, tenancy, tracing
+from .routers import auth, calendar, study_group, course, recommendation, schedule, metrics, changes as changes_router, dashboard, archive, export, analytics
 from .schemas.objects import StudentDTO, StudyGroupDTO
-from .schemas.models import Student
 from .schemas.requests import StudentUpdateRequestDTO
 
+logger = logging.getLogger(__name__)
+
+
+def tenant_loops() -> list:
+    # Run once per tenant, in that tenant's context.
+    loops = [sessions.renewals.get().run()]
+    if jobs.RUN_IN_APP:
+        loops += [jobs.Worker().run(), jobs.schedule_periodic()]
+    return loops
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-        
-    yield  
+    for tenant in tenancy.registry.all():
+        # One campus's database being down shouldn't keep the others out.
+        try:
+            async with get_engine(tenant).begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+        except Exception:
+            logger.exception("Could not prepare the database of tenant %s", tenant.name)
+
+    if jobs.RUN_IN_APP:
+        jobs.load_handlers()
+    background = [
+        asyncio.create_task(tracing.exporter.run()),
+        asyncio.create_task(tenancy.run_per_tenant(tenant_loops)),
+    ]
+
+    yield
+
+    for task in background:
+        task.cancel()
+    await asyncio.gather(*background, return_exceptions=True)
 
 app = FastAPI(lifespan=lifespan)
+app.router.route_class = tracing.TracedRoute
+
+app.add_middleware(idempotency.IdempotencyMiddleware)
+app.add_middleware(rate_limit.RateLimitMiddleware)
+app.add_middleware(concurrency.ConcurrencyLimitMiddleware)
+app.add_middleware(slow_query.OriginMiddleware)
+app.add_middleware(tracing.TracingMiddleware)
+app.add_middleware(tenancy.TenantMiddleware)
 
 app.include_router(auth.router)
 app.include_router(study_group.router)
 app.include_router(course.router)
+app.include_router(recommendation.router)
+app.include_router(schedule.router)
+app.include_router(metrics.router)
+app.include_router(changes_router.router)
+app.include_router(dashboard.router)
+app.include_router(archive.router)
+app.include_router(export.router)
+app.include_router(analytics.router)
+app.include_router(calendar.router)
 
 
 @app.get(
@@ -40,11 +87,7 @@ async def list_study_groups(
     student: Student = Depends(get_current_student),
     db: AsyncSession = Depends(get_db),
 ):
-    result = await db.execute(
-        select(StudyGroup)
-        .join(StudyGroupMember)
-        .where(StudyGroupMember.student_id == student.id)
-    )
+    result = await db.execute(queries.my_study_groups(student.id))
     return result.scalars().all()
 
 @app.patch(
@@ -59,11 +102,30 @@ async def modify_profile(
 ):
     updates = data.model_dump(exclude_unset=True)
 
-    for field, value in updates.items():
-        setattr(student, field, value)
+    if not updates:
+        return StudentDTO.model_validate(student)
+
+    try:
+        student = await db.scalar(
+            update(Student)
+            .where(Student.id == student.id)
+            .values(**updates)
+            .returning(Student)
+        )
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Email already registered"
+        )
+
+    if "major" in updates or "class_year" in updates:
+        jobs.enqueue(
+            db,
+            recommendations.refresh_after_enrollment_change,
+            student_ids=[student.id],
+        )
 
     await db.commit()
-    await db.refresh(student)
 
     return StudentDTO.model_validate(student)
 
@@ -76,12 +138,7 @@ async def list_my_courses(
     student: Student = Depends(get_current_student),
     db: AsyncSession = Depends(get_db),
 ):
-    result = await db.execute(
-        select(Course)
-        .join(StudentCourse)
-        .where(StudentCourse.student_id == student.id)
-        .order_by(Course.title)
-    )
+    result = await db.execute(queries.my_courses(student.id))
 
     courses = result.scalars().all()
     return courses
@@ -89,22 +146,14 @@ async def list_my_courses(
 
 @app.get(
     "/requests",
-    response_model=list[StudyGroupPreviewDTO],
+    response_model=list[StudyGroupJoinRequestDTO],
     status_code=status.HTTP_200_OK,
 )
 async def list_my_requests(
     student: Student = Depends(get_current_student),
     db: AsyncSession = Depends(get_db),
 ):
-    result = await db.execute(
-        select(StudyGroupJoinRequest)
-        .where(StudyGroupJoinRequest.student_id == student.id)
-        .options(
-            selectinload(StudyGroupJoinRequest.study_group)
-            .selectinload(StudyGroup.course)
-        )
-        .order_by(StudyGroupJoinRequest.created_at.desc())
-    )
+    result = await db.execute(queries.my_requests(student.id))
 
 
     return result.scalars().all()
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core import analytics, tracing
+from ..deps.db import get_db
+from ..deps.auth import get_current_admin
+from ..schemas.models import Semester, Student
+from ..schemas.objects import SemesterAnalyticsDTO
+
+router = APIRouter(prefix="/analytics", tags=["analytics"], route_class=tracing.TracedRoute)
+
+
+@router.get(
+    "/semesters/{semester_id}",
+    status_code=status.HTTP_200_OK,
+    response_model=SemesterAnalyticsDTO
+)
+async def get_semester_analytics(
+    semester_id: int,
+    admin: Student = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db),
+):
+    semester = await db.get(Semester, semester_id)
+    if semester is None:
+        raise HTTPException(status_code=404, detail="Semester not found")
+
+    cached = await analytics.semester_analytics(
+        semester_id, archived=semester.archived_at is not None
+    )
+    return SemesterAnalyticsDTO(
+        semester_id=cached.semester_id,
+        computed_at=cached.computed_at,
+        stale=cached.stale,
+        **cached.payload,
+    )
@@ -0,0 +1,85 @@
+from fastapi import APIRouter, Depends, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from ..core import tracing
+from ..deps.db import get_db
+from ..deps.auth import get_current_student
+from ..schemas.models import (
+    ArchivedStudyGroup,
+    ArchivedStudyGroupMember,
+    Semester,
+    Student,
+)
+from ..schemas.objects import ArchivedStudyGroupDTO, SemesterDTO
+
+# Read-only access to semesters moved out of the hot tables by
+# app.core.archive. Nothing here writes.
+router = APIRouter(prefix="/archive", tags=["archive"], route_class=tracing.TracedRoute)
+
+
+@router.get(
+    "/semesters",
+    status_code=status.HTTP_200_OK,
+    response_model=list[SemesterDTO]
+)
+async def list_archived_semesters(
+    db: AsyncSession = Depends(get_db),
+):
+    result = await db.execute(
+        select(Semester)
+        .where(Semester.archived_at.is_not(None))
+        .order_by(Semester.year.desc(), Semester.term)
+    )
+    return result.scalars().all()
+
+
+@router.get(
+    "/study_groups",
+    status_code=status.HTTP_200_OK,
+    response_model=list[ArchivedStudyGroupDTO]
+)
+async def list_archived_study_groups(
+    semester_id: int,
+    course_id: int | None = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_db),
+):
+    query = (
+        select(ArchivedStudyGroup)
+        .where(ArchivedStudyGroup.semester_id == semester_id)
+        .options(selectinload(ArchivedStudyGroup.course))
+        .order_by(ArchivedStudyGroup.meeting_time, ArchivedStudyGroup.id)
+        .offset((page - 1) * page_size)
+        .limit(page_size)
+    )
+
+    if course_id is not None:
+        query = query.where(ArchivedStudyGroup.course_id == course_id)
+
+    result = await db.execute(query)
+    return result.scalars().all()
+
+
+@router.get(
+    "/study_groups/mine",
+    status_code=status.HTTP_200_OK,
+    response_model=list[ArchivedStudyGroupDTO]
+)
+async def list_my_archived_study_groups(
+    student: Student = Depends(get_current_student),
+    db: AsyncSession = Depends(get_db),
+):
+    result = await db.execute(
+        select(ArchivedStudyGroup)
+        .join(
+            ArchivedStudyGroupMember,
+            ArchivedStudyGroupMember.study_group_id == ArchivedStudyGroup.id,
+        )
+        .where(ArchivedStudyGroupMember.student_id == student.id)
+        .options(selectinload(ArchivedStudyGroup.course))
+        .order_by(ArchivedStudyGroup.meeting_time.desc())
+    )
+    return result.scalars().all()
@@ -1,14 +1,15 @@
 from fastapi import APIRouter, Depends, status, Response, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from datetime import timezone, datetime, timedelta
+from datetime import timezone, datetime
 
-from app.deps.db import get_db
+from app.core import sessions, tracing
+from app.deps.db import get_db, dialect_insert
 from app.schemas.auth import SignupRequest, LoginRequest
 from app.schemas.models import Student, Session
 from app.core.security import *
 
-router = APIRouter(prefix="/auth", tags=["auth"])
+router = APIRouter(prefix="/auth", tags=["auth"], route_class=tracing.TracedRoute)
 
 @router.post("/signup", status_code=status.HTTP_201_CREATED)
 async def signup(
@@ -16,49 +17,40 @@ async def signup(
     response: Response, 
     db: AsyncSession = Depends(get_db),
 ):
-
-    existing = await db.scalar(
-        select(Student).where(Student.email == data.email)
+    # The unique email index decides, so concurrent signups can't both win.
+    student_id = await db.scalar(
+        dialect_insert(db)(Student)
+        .values(
+            email=data.email,
+            password_hash=hash_password(data.password)
+        )
+        .on_conflict_do_nothing(index_elements=[Student.email])
+        .returning(Student.id)
     )
     
-    if existing:
+    if student_id is None:
         raise HTTPException(
             status_code=409,
             detail="Email already registered"
         )
     
-    student = Student(
-        email=data.email,
-        password_hash=hash_password(data.password)
-    )
-    
-    db.add(student)
-    await db.flush()  
-    
     session_id = generate_session_token()
-    expires_at = datetime.now(timezone.utc) + timedelta(days=7)
+    expires_at = datetime.now(timezone.utc) + sessions.SESSION_TTL
 
     session = Session(
         session_token=session_id,
-        student_id=student.id,
+        student_id=student_id,
         expires_at=expires_at
     )
     
     db.add(session)
     await db.commit()
 
-    response.set_cookie(
-        key="sessionId",
-        value=session_id,
-        httponly=True,
-        secure=True,  
-        samesite="lax",
-        max_age=60 * 60 * 24 * 7
-    )
+    sessions.set_cookie(response, session_id, expires_at)
 
     return {
-        "id": student.id,
-        "email": student.email
+        "id": student_id,
+        "email": data.email
     }
 
 
@@ -76,7 +68,7 @@ async def login(
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     session_id = generate_session_token()
-    expires_at = datetime.now(timezone.utc) + timedelta(days=7)
+    expires_at = datetime.now(timezone.utc) + sessions.SESSION_TTL
 
     session = Session(
         session_token=session_id,
@@ -87,14 +79,7 @@ async def login(
     db.add(session)
     await db.commit()
 
-    response.set_cookie(
-        key="sessionId",
-        value=session_id,
-        httponly=True,
-        secure=True,
-        samesite="lax",
-        max_age=60 * 60 * 24 * 7,
-    )
+    sessions.set_cookie(response, session_id, expires_at)
 
     return {"id": student.id, "email": student.email}
 
@@ -0,0 +1,91 @@
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core import ical, tracing
+from ..deps.auth import get_current_student
+from ..deps.db import get_db
+from ..schemas.models import Student
+from ..schemas.objects import CalendarSubscriptionDTO
+
+router = APIRouter(prefix="/calendar", tags=["calendar"], route_class=tracing.TracedRoute)
+
+
+def _subscription(request: Request, token: str) -> CalendarSubscriptionDTO:
+    url = str(request.url_for("calendar_feed", token=token))
+    return CalendarSubscriptionDTO(url=url, webcal_url="webcal://" + url.split("://", 1)[1])
+
+
+def _not_modified(request: Request, feed: ical.Feed) -> bool:
+    # If-None-Match wins over If-Modified-Since when both are sent.
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or f'"{feed.etag}"' in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return feed.modified_at.replace(microsecond=0) <= since
+
+    return False
+
+
+@router.get(
+    "/subscription",
+    status_code=status.HTTP_200_OK,
+    response_model=CalendarSubscriptionDTO
+)
+async def get_subscription(
+    request: Request,
+    student: Student = Depends(get_current_student),
+    db: AsyncSession = Depends(get_db),
+):
+    token = await ical.token_for_student(db, student.id)
+    return _subscription(request, token)
+
+
+@router.delete(
+    "/subscription",
+    status_code=status.HTTP_204_NO_CONTENT
+)
+async def revoke_subscription(
+    student: Student = Depends(get_current_student),
+    db: AsyncSession = Depends(get_db),
+):
+    # The old URL stops working; the next GET hands out a new one.
+    await ical.revoke(db, student.id)
+
+
+@router.get(
+    "/{token}.ics",
+    name="calendar_feed",
+    status_code=status.HTTP_200_OK,
+    response_class=Response,
+)
+async def calendar_feed(
+    token: str,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+):
+    feed = await ical.feed_for_token(db, token)
+    if feed is None:
+        raise HTTPException(status_code=404, detail="Calendar not found")
+
+    headers = {
+        "ETag": f'"{feed.etag}"',
+        "Last-Modified": format_datetime(feed.modified_at, usegmt=True),
+        "Cache-Control": "private, no-cache",
+    }
+    if _not_modified(request, feed):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(
+        content=feed.body,
+        media_type="text/calendar; charset=utf-8",
+        headers=headers,
+    )
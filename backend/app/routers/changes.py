@@ -0,0 +1,85 @@
+from fastapi import APIRouter, Depends, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+
+from ..core import changes, tracing
+from ..deps.db import get_db
+from ..deps.auth import get_current_student
+from ..schemas.models import Student, ChangeLog
+from ..schemas.objects import ChangeDTO, ChangeFeedDTO
+
+router = APIRouter(prefix="/changes", tags=["changes"], route_class=tracing.TracedRoute)
+
+
+@router.get(
+    "/",
+    status_code=status.HTTP_200_OK,
+    response_model=ChangeFeedDTO
+)
+async def list_changes(
+    since: int | None = Query(None, ge=0),
+    limit: int = Query(500, ge=1, le=1000),
+    student: Student = Depends(get_current_student),
+    db: AsyncSession = Depends(get_db),
+):
+    pos = changes.position(db)
+    # Read before the rows, so nothing can settle in between unseen.
+    settled = await changes.horizon(db)
+    # Indexed on both backends, so this is one index probe.
+    oldest = await db.scalar(select(func.min(pos)))
+
+    # Without a cursor, or with one older than what compaction kept (or
+    # one never handed out), the client can't be brought up to date
+    # incrementally: it has to reload everything and continue from the
+    # current head.
+    head = settled - 1 if settled is not None else await changes.head(db)
+    if (
+        since is None
+        or since > head
+        or (oldest is not None and since < oldest - 1)
+    ):
+        return ChangeFeedDTO(
+            changes=[], cursor=head, has_more=False, reset=True
+        )
+
+    query = select(ChangeLog).where(ChangeLog.student_id == student.id, pos > since)
+    if settled is not None:
+        query = query.where(pos < settled)
+    rows = (
+        await db.scalars(query.order_by(pos, ChangeLog.id).limit(limit + 1))
+    ).all()
+
+    has_more = len(rows) > limit
+    rows, extra = rows[:limit], rows[limit:]
+
+    # A page ends on a whole transaction, since the cursor can't point
+    # into the middle of one.
+    key = pos.key
+    if extra and getattr(extra[0], key) == getattr(rows[-1], key):
+        split = getattr(rows[-1], key)
+        rows = [row for row in rows if getattr(row, key) != split] or (
+            await db.scalars(
+                select(ChangeLog)
+                .where(ChangeLog.student_id == student.id, pos == split)
+                .order_by(ChangeLog.id)
+            )
+        ).all()
+
+    # A complete page has everything up to the head, so the cursor moves
+    # there even if this student had nothing new. Otherwise a quiet
+    # student's cursor would fall behind retention and force a reset.
+    cursor = getattr(rows[-1], key) if rows else since
+    if not has_more:
+        cursor = max(cursor, head)
+
+    latest_per_entity = {(row.entity, row.entity_id): row for row in rows}
+
+    return ChangeFeedDTO(
+        changes=[
+            ChangeDTO.model_validate(row)
+            for row in sorted(latest_per_entity.values(), key=lambda r: (getattr(r, key), r.id))
+        ],
+        cursor=cursor,
+        has_more=has_more,
+        reset=False,
+    )
@@ -1,15 +1,25 @@
-from fastapi import APIRouter, status, Depends, HTTPException 
+import csv
+
+from fastapi import APIRouter, status, Depends, HTTPException, Query, Response, UploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import literal, select
+from sqlalchemy.orm import selectinload
+from pydantic import TypeAdapter
 from typing import List
-from ..deps.auth import get_current_student
-from ..deps.db import get_db
-from ..schemas.objects import CourseDTO
-from ..schemas.models import Course, StudentCourse, Student
-from ..schemas.requests import CourseCreateRequest
+from ..core import enrollment, formation, jobs, rollups, tracing
+from ..core.schedule import parse_day
+from ..core.single_flight import SingleFlight
+from ..deps.auth import get_current_admin, get_current_student
+from ..deps.db import get_db, AsyncSessionLocal, dialect_insert
+from ..schemas.objects import CourseDTO, CourseActivityDTO, EnrollmentImportDTO, GroupFormationDTO
+from ..schemas.models import Course, CourseActivity, Semester, StudentCourse, Student
+from ..schemas.requests import CourseCreateRequest, GroupFormationRequest
+
 
+router = APIRouter(prefix="/course", tags=["course"], route_class=tracing.TracedRoute)
 
-router = APIRouter(prefix="/course", tags=["course"])
+course_search_flight = SingleFlight("course_search")
+course_list_adapter = TypeAdapter(list[CourseDTO])
 
 
 @router.get(
@@ -19,24 +29,64 @@ router = APIRouter(prefix="/course", tags=["course"])
 )
 async def autofill_search(
     q: str,
-    db: AsyncSession = Depends(get_db),
 ):
     if len(q.strip()) < 2:
         return []
 
     query = q.strip().lower()
 
-    result = await db.execute(
-        select(Course)
-        .where(
-            (Course.department.ilike(f"%{query}%")) |
-            (Course.course_number.ilike(f"%{query}%")) |
-            (Course.professor.ilike(f"%{query}%"))
+    body = await course_search_flight.do(query, lambda: _search_courses_json(query))
+    return Response(content=body, media_type="application/json")
+
+async def _search_courses_json(query: str) -> bytes:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(Course)
+            .where(
+                (Course.department.ilike(f"%{query}%")) |
+                (Course.course_number.ilike(f"%{query}%")) |
+                (Course.professor.ilike(f"%{query}%"))
+            )
+            .options(selectinload(Course.semester))
+            .order_by(Course.department, Course.course_number)
+            .limit(10)
         )
+
+        courses = course_list_adapter.validate_python(
+            result.scalars().all(), from_attributes=True
+        )
+        return course_list_adapter.dump_json(courses)
+
+@router.get(
+    "/browse",
+    response_model=list[CourseActivityDTO],
+    status_code=status.HTTP_200_OK
+)
+async def browse_courses(
+    semester_id: int,
+    department: str | None = None,
+    open_only: bool = False,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_db),
+):
+    # Counts come from the course_activity rollup only; see core.rollups.
+    query = (
+        select(CourseActivity)
+        .join(Course, Course.id == CourseActivity.course_id)
+        .where(CourseActivity.semester_id == semester_id)
+        .options(selectinload(CourseActivity.course).selectinload(Course.semester))
         .order_by(Course.department, Course.course_number)
-        .limit(10)
+        .offset((page - 1) * page_size)
+        .limit(page_size)
     )
 
+    if department:
+        query = query.where(Course.department.ilike(department))
+    if open_only:
+        query = query.where(CourseActivity.open_seats > 0)
+
+    result = await db.execute(query)
     return result.scalars().all()
 
 @router.post(
@@ -48,27 +98,207 @@ async def add_course(
     data: CourseCreateRequest,
     db: AsyncSession = Depends(get_db)
 ):  
-    existing = db.scalar(
-        select(Course)
-        .where(
-            (Course.course_number == data.course_number) &
-            (Course.department == data.department)
+    # Selecting the values from the semester row makes a missing or
+    # archived semester insert nothing, so archiving can't slip in between
+    # a check and the insert. An archived semester's rows live in the
+    # archive tables, and a new one here would collide with them on restore.
+    course = await db.scalar(
+        dialect_insert(db)(Course)
+        .from_select(
+            [Course.department, Course.course_number, Course.professor, Course.semester_id],
+            select(
+                literal(data.department),
+                literal(data.course_number),
+                literal(data.professor),
+                Semester.id,
+            ).where(Semester.id == data.semester_id, Semester.archived_at.is_(None)),
         )
+        .on_conflict_do_nothing(
+            index_elements=[Course.department, Course.course_number, Course.semester_id]
+        )
+        .returning(Course)
     )
-    
-    if existing:
-        return CourseDTO.model_validate(existing)
-    
-    course = Course(
-        department=data.department,
-        course_number=data.course_number,
-        professor=data.professor,
-        semester_id=data.semester_id,
+
+    # The response includes the semester, so it is read either way.
+    semester = await db.get(Semester, data.semester_id)
+
+    if course is not None:
+        jobs.enqueue(db, rollups.refresh_after_group_change, course_id=course.id)
+        await db.commit()
+        return CourseDTO.model_validate(course)
+
+    if not semester:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Semester not found"
+        )
+
+    if semester.archived_at is not None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Semester is archived"
+        )
+
+    # Already exists: hand back the stored course unchanged.
+    course = await db.scalar(
+        select(Course).where(
+            Course.department == data.department,
+            Course.course_number == data.course_number,
+            Course.semester_id == data.semester_id,
+        )
+    )
+
+    return CourseDTO.model_validate(course)
+
+    semester = await db.get(Semester, data.semester_id)
+
+    if not semester:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Semester not found"
+        )
+
+    if semester.archived_at is not None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Semester is archived"
+        )
+
+    # Already exists: hand back the stored course unchanged.
+    course = await db.scalar(
+        select(Course).where(
+            Course.department == data.department,
+            Course.course_number == data.course_number,
+            Course.semester_id == data.semester_id,
+        )
     )
-    
-    db.add(course)
-    await db.commit()
-    await db.refresh(course)
-    
+
     return CourseDTO.model_validate(course)
 
+@router.post(
+    "/enrollments",
+    response_model=EnrollmentImportDTO,
+    status_code=status.HTTP_200_OK
+)
+async def import_enrollments(
+    semester_id: int,
+    file: UploadFile,
+    student: Student = Depends(get_current_student),
+    db: AsyncSession = Depends(get_db),
+):
+    # Enrolls the current student in every course on an uploaded schedule
+    # (CSV or iCalendar); see core.enrollment. Any email column is ignored.
+    semester = await db.get(Semester, semester_id)
+    if not semester:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Semester not found"
+        )
+    if semester.archived_at is not None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Semester is archived"
+        )
+
+    content = await file.read(enrollment.MAX_UPLOAD_BYTES + 1)
+    if len(content) > enrollment.MAX_UPLOAD_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Schedule file too large"
+        )
+
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Schedule must be UTF-8"
+        )
+
+    try:
+        fmt = enrollment.detect_format(file.filename, text)
+        entries = list(dict.fromkeys(
+            entry.course for entry in enrollment.parse(text.splitlines(), fmt)
+        ))
+    except (ValueError, csv.Error) as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc)
+        )
+
+    if len(entries) > enrollment.MAX_STUDENT_COURSES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A schedule can list at most {enrollment.MAX_STUDENT_COURSES} courses"
+        )
+
+    result, course_ids = await enrollment.import_for_student(
+        db, student.id, semester_id, [enrollment.Entry(*course) for course in entries]
+    )
+
+    enrolled = (
+        await db.scalars(
+            select(Course)
+            .where(Course.id.in_(course_ids))
+            .options(selectinload(Course.semester))
+            .order_by(Course.department, Course.course_number)
+        )
+    ).all() if course_ids else []
+
+    return EnrollmentImportDTO(
+        enrolled=[CourseDTO.model_validate(course) for course in enrolled],
+        already_enrolled=result.already_enrolled,
+        unmatched=sorted(result.unmatched),
+    )
+
+@router.post(
+    "/{course_id}/groups/form",
+    response_model=GroupFormationDTO,
+    status_code=status.HTTP_200_OK
+)
+async def form_study_groups(
+    course_id: int,
+    data: GroupFormationRequest,
+    admin: Student = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db),
+):
+    # Puts every enrolled student without a group for the course into a
+    # new one; see core.formation.
+    course = await db.get(Course, course_id)
+    if not course:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Course not found"
+        )
+
+    slots = formation.DEFAULT_SLOTS
+    if data.slots:
+        slots = []
+        for slot in data.slots:
+            weekday = parse_day(slot.day)
+            if weekday is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Unknown day: {slot.day}"
+                )
+            slots.append(formation.Slot(weekday, slot.at.replace(second=0, microsecond=0, tzinfo=None)))
+        slots = list(dict.fromkeys(slots))
+
+    plan, group_ids = await formation.form_groups(
+        db,
+        course,
+        capacity=data.capacity,
+        slots=slots,
+        duration=data.duration_minutes,
+        location=data.location,
+        private=data.private,
+        dry_run=data.dry_run,
+    )
+
+    return GroupFormationDTO(
+        dry_run=data.dry_run,
+        group_count=len(plan.groups),
+        placed=sum(len(members) for _, members in plan.groups),
+        unplaced=plan.unplaced,
+        study_group_ids=group_ids,
+    )
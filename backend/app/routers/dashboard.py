@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core import queries, tracing
+from ..deps.db import get_db
+from ..deps.auth import get_current_student
+from ..schemas.models import Student
+from ..schemas.objects import (
+    CourseDTO,
+    DashboardDTO,
+    StudentDTO,
+    StudyGroupJoinRequestDTO,
+    StudyGroupPreviewDTO,
+)
+
+router = APIRouter(prefix="/dashboard", tags=["dashboard"], route_class=tracing.TracedRoute)
+
+
+# The three sections are read one after another on the request's own
+# session. Running them at once would need a session (and a pooled
+# connection) each, on top of the one the request already holds.
+async def _load(db: AsyncSession, statement, dto):
+    rows = (await db.scalars(statement)).all()
+    return [dto.model_validate(row) for row in rows]
+
+
+@router.get(
+    "/",
+    status_code=status.HTTP_200_OK,
+    response_model=DashboardDTO,
+)
+async def get_dashboard(
+    student: Student = Depends(get_current_student),
+    db: AsyncSession = Depends(get_db),
+):
+    study_groups = await _load(db, queries.my_study_group_previews(student.id), StudyGroupPreviewDTO)
+    courses = await _load(db, queries.my_courses(student.id), CourseDTO)
+    requests = await _load(db, queries.my_requests(student.id), StudyGroupJoinRequestDTO)
+
+    return DashboardDTO(
+        student=StudentDTO.model_validate(student),
+        study_groups=study_groups,
+        courses=courses,
+        requests=requests,
+    )
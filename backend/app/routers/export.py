@@ -0,0 +1,32 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import StreamingResponse
+
+from ..core import export, tracing
+from ..deps.auth import get_current_admin
+from ..schemas.models import Student
+
+router = APIRouter(prefix="/export", tags=["export"], route_class=tracing.TracedRoute)
+
+
+@router.get(
+    "/semesters/{semester_id}/{dataset}",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+)
+async def export_semester(
+    semester_id: int,
+    dataset: Literal["study_groups", "members", "requests"],
+    format: Literal["ndjson", "csv"] = "ndjson",
+    admin: Student = Depends(get_current_admin),
+):
+    return StreamingResponse(
+        export.stream_export(dataset, semester_id, format),
+        media_type=export.FORMATS[format],
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="semester-{semester_id}-{dataset}.{format}"'
+            ),
+        },
+    )
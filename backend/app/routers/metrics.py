@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, status
+
+from ..core import concurrency, single_flight, jobs, tracing
+from ..deps.auth import require_metrics_token
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["metrics"],
+    route_class=tracing.TracedRoute,
+    dependencies=[Depends(require_metrics_token)],
+)
+
+
+@router.get(
+    "/single-flight",
+    status_code=status.HTTP_200_OK
+)
+async def single_flight_metrics():
+    return single_flight.all_stats()
+
+
+@router.get(
+    "/jobs",
+    status_code=status.HTTP_200_OK
+)
+async def job_metrics():
+    return {
+        "queue": await jobs.queue_depth(),
+        "workers": jobs.all_stats(),
+    }
+
+
+@router.get(
+    "/concurrency",
+    status_code=status.HTTP_200_OK
+)
+async def concurrency_metrics():
+    return concurrency.limiters.get().stats()
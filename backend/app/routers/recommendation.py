@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Depends, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import selectinload
+
+from ..core import jobs, recommendations, tracing
+from ..deps.db import get_db
+from ..deps.auth import get_current_student
+from ..schemas.models import Student, StudyGroup, StudyGroupRecommendation
+from ..schemas.objects import StudyGroupRecommendationDTO
+
+router = APIRouter(prefix="/recommendations", tags=["recommendations"], route_class=tracing.TracedRoute)
+
+
+@router.get(
+    "/",
+    status_code=status.HTTP_200_OK,
+    response_model=list[StudyGroupRecommendationDTO]
+)
+async def list_recommendations(
+    limit: int = Query(10, ge=1, le=50),
+    student: Student = Depends(get_current_student),
+    db: AsyncSession = Depends(get_db),
+):
+    if student.recommendations_queued_at is None:
+        # Scoring runs on a worker rather than in the request; until it
+        # has, the list is empty. The conditional UPDATE queues it once,
+        # however many requests race here.
+        queued = await db.scalar(
+            update(Student)
+            .where(Student.id == student.id, Student.recommendations_queued_at.is_(None))
+            .values(recommendations_queued_at=func.now())
+            .returning(Student.id)
+        )
+        if queued is not None:
+            jobs.enqueue(
+                db,
+                recommendations.refresh_after_enrollment_change,
+                student_ids=[student.id],
+            )
+        await db.commit()
+
+    result = await db.execute(
+        select(StudyGroupRecommendation)
+        .where(StudyGroupRecommendation.student_id == student.id)
+        .options(
+            selectinload(StudyGroupRecommendation.study_group)
+            .selectinload(StudyGroup.course)
+        )
+        .order_by(StudyGroupRecommendation.score.desc())
+        .limit(limit)
+    )
+
+    return result.scalars().all()
@@ -0,0 +1,214 @@
+from datetime import datetime, time, timedelta, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_, or_, not_, case
+from sqlalchemy.orm import selectinload
+
+from ..core import tracing
+from ..core.schedule import (
+    MAX_DURATION_MINUTES,
+    MINUTES_PER_WEEK,
+    minute_of_week,
+    parse_day,
+    to_campus_time,
+    week_shifts,
+    week_windows,
+)
+from ..deps.db import get_db
+from ..deps.auth import get_current_student
+from ..schemas.models import Student, StudyGroup, StudyGroupMember
+from ..schemas.objects import StudyGroupPreviewDTO
+from ..schemas.requests import ScheduleCompatibleRequestDTO, TimeSlotDTO
+
+router = APIRouter(prefix="/schedule", tags=["schedule"], route_class=tracing.TracedRoute)
+
+
+def _overlaps(lo: int, hi: int):
+    # schedule_end - schedule_start is bounded by MAX_DURATION_MINUTES, so
+    # bounding schedule_start on both sides keeps this an index range scan.
+    # schedule_start is always within the week, so shifted ranges that
+    # can't reach it are left out.
+    return or_(*(
+        and_(
+            StudyGroup.schedule_start < shifted_hi,
+            StudyGroup.schedule_start > shifted_lo - MAX_DURATION_MINUTES,
+            StudyGroup.schedule_end > shifted_lo,
+        )
+        for shifted_lo, shifted_hi in week_shifts(lo, hi)
+        if shifted_hi > 0 and shifted_lo - MAX_DURATION_MINUTES < MINUTES_PER_WEEK
+    ))
+
+
+def _not_past(now: datetime):
+    # Weekly groups keep meeting; one-off groups drop out once they've met.
+    return or_(StudyGroup.is_recurring, StudyGroup.meeting_time >= now)
+
+
+def _slot_bounds(slot: TimeSlotDTO) -> tuple[int, int]:
+    weekday = parse_day(slot.day)
+
+    if weekday is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown day: {slot.day}"
+        )
+
+    if slot.end <= slot.start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Time slot must end after it starts"
+        )
+
+    return minute_of_week(weekday, slot.start), minute_of_week(weekday, slot.end)
+
+
+def _base_query(semester_id: int, course_id: int | None):
+    query = (
+        select(StudyGroup)
+        .where(StudyGroup.semester_id == semester_id)
+        .options(selectinload(StudyGroup.course))
+    )
+
+    if course_id is not None:
+        query = query.where(StudyGroup.course_id == course_id)
+
+    return query
+
+
+@router.get(
+    "/groups",
+    status_code=status.HTTP_200_OK,
+    response_model=list[StudyGroupPreviewDTO]
+)
+async def groups_in_slot(
+    semester_id: int,
+    day: str,
+    start: time = time(0, 0),
+    end: time = time(23, 59),
+    course_id: int | None = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_db),
+):
+    lo, hi = _slot_bounds(TimeSlotDTO(day=day, start=start, end=end))
+
+    result = await db.execute(
+        _base_query(semester_id, course_id)
+        .where(_overlaps(lo, hi), _not_past(datetime.now(timezone.utc)))
+        .order_by(StudyGroup.schedule_start)
+        .limit(limit)
+    )
+
+    return result.scalars().all()
+
+
+@router.get(
+    "/upcoming",
+    status_code=status.HTTP_200_OK,
+    response_model=list[StudyGroupPreviewDTO]
+)
+async def upcoming_groups(
+    semester_id: int,
+    hours: int = Query(24, ge=1, le=24 * 7),
+    course_id: int | None = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_db),
+):
+    now = datetime.now(timezone.utc)
+    until = now + timedelta(hours=hours)
+    local = to_campus_time(now)
+    now_minute = minute_of_week(local.weekday(), local.time())
+
+    recurring = or_(*(
+        and_(StudyGroup.schedule_start >= lo, StudyGroup.schedule_start < hi)
+        for lo, hi in week_windows(now, until)
+    ))
+
+    # Minutes until the next meeting, (schedule_start - now_minute) mod one
+    # week. One-off groups in the window meet less than a week from now, so
+    # the same key orders them by meeting_time too.
+    minutes_until = case(
+        (
+            StudyGroup.schedule_start >= now_minute,
+            StudyGroup.schedule_start - now_minute,
+        ),
+        else_=StudyGroup.schedule_start - now_minute + MINUTES_PER_WEEK,
+    )
+
+    result = await db.execute(
+        _base_query(semester_id, course_id)
+        .where(
+            or_(
+                and_(StudyGroup.is_recurring, recurring),
+                and_(
+                    not_(StudyGroup.is_recurring),
+                    StudyGroup.meeting_time >= now,
+                    StudyGroup.meeting_time < until,
+                ),
+            )
+        )
+        .order_by(minutes_until, StudyGroup.meeting_time, StudyGroup.id)
+        .limit(limit)
+    )
+
+    return result.scalars().all()
+
+
+@router.post(
+    "/compatible",
+    status_code=status.HTTP_200_OK,
+    response_model=list[StudyGroupPreviewDTO]
+)
+async def compatible_groups(
+    data: ScheduleCompatibleRequestDTO,
+    limit: int = Query(50, ge=1, le=200),
+    student: Student = Depends(get_current_student),
+    db: AsyncSession = Depends(get_db),
+):
+    free = [_slot_bounds(slot) for slot in data.free_slots]
+
+    busy_query = select(
+        StudyGroup.id, StudyGroup.schedule_start, StudyGroup.schedule_end
+    )
+    busy_filters = []
+    if data.avoid_group_ids:
+        busy_filters.append(StudyGroup.id.in_(data.avoid_group_ids))
+    if data.avoid_my_groups:
+        busy_filters.append(
+            StudyGroup.id.in_(
+                select(StudyGroupMember.study_group_id)
+                .where(StudyGroupMember.student_id == student.id)
+            )
+        )
+
+    now = datetime.now(timezone.utc)
+
+    busy = []
+    if busy_filters:
+        busy = (
+            await db.execute(busy_query.where(or_(*busy_filters), _not_past(now)))
+        ).all()
+
+    query = _base_query(data.semester_id, data.course_id).where(
+        _not_past(now),
+        or_(*(
+            and_(
+                StudyGroup.schedule_start >= lo,
+                StudyGroup.schedule_start < hi,
+                StudyGroup.schedule_end <= hi,
+            )
+            for lo, hi in free
+        ))
+    )
+
+    for group_id, lo, hi in busy:
+        query = query.where(
+            StudyGroup.id != group_id,
+            not_(_overlaps(lo, hi)),
+        )
+
+    result = await db.execute(
+        query.order_by(StudyGroup.schedule_start).limit(limit)
+    )
+
+    return result.scalars().all()
@@ -1,16 +1,24 @@
-from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi import APIRouter, Depends, Query, Response, status, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, func, exists
+from sqlalchemy.orm import selectinload, joinedload
 
-from ..deps.db import get_db
-from ..schemas.models import Student, StudyGroup, StudyGroupJoinRequest
+from ..core import recommendations, changes, rollups, jobs, tracing
+from ..core.search import build_tsquery, build_like_filter
+from ..core.single_flight import SingleFlight
+from ..deps.db import get_db, AsyncSessionLocal, dialect_insert
+from ..schemas.models import Course, Student, StudyGroup, StudyGroupJoinRequest, StudyGroupMember
 from ..deps.auth import get_current_student
 from ..schemas.requests import StudyGroupUpdateDTO, StudyGroupCreateDTO, StudyGroupRequestDTO
-from ..schemas.objects import StudyGroupDTO
+from ..schemas.objects import StudyGroupDTO, StudyGroupPreviewDTO, StudyGroupSearchPageDTO, StudyGroupBatchDTO
 
-router = APIRouter(prefix="/study-group", tags=["study-group"])
+router = APIRouter(prefix="/study-group", tags=["study-group"], route_class=tracing.TracedRoute)
 
+study_group_flight = SingleFlight("study_group")
+
+MAX_BATCH_SIZE = 100
+
+@tracing.traced()
 async def get_study_group_or_404(
     study_group_id: int,
     db: AsyncSession,
@@ -20,7 +28,7 @@ async def get_study_group_or_404(
         .where(StudyGroup.id == study_group_id)
         .options(
             selectinload(StudyGroup.members),
-            selectinload(StudyGroup.course),
+            selectinload(StudyGroup.course).selectinload(Course.semester),
         )
     )
 
@@ -32,6 +40,126 @@ async def get_study_group_or_404(
 
     return study_group
 
+def _enqueue_refresh(db: AsyncSession, study_group: StudyGroup, student_ids: list[int]) -> None:
+    # Derived data (recommendations, course rollups) is rebuilt by the job
+    # workers once this transaction commits.
+    jobs.enqueue(
+        db,
+        recommendations.refresh_after_membership_change,
+        study_group_id=study_group.id,
+        student_ids=student_ids,
+    )
+    jobs.enqueue(db, rollups.refresh_after_group_change, course_id=study_group.course_id)
+
+
+@router.get(
+    "",
+    status_code=status.HTTP_200_OK,
+    response_model=StudyGroupBatchDTO
+)
+async def fetch_study_groups(
+    ids: str = Query(..., description="Comma-separated study group ids"),
+    db: AsyncSession = Depends(get_db),
+):
+    try:
+        requested = list(dict.fromkeys(
+            int(part) for part in ids.split(",") if part.strip()
+        ))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids must be a comma-separated list of integers"
+        )
+
+    if not requested:
+        return StudyGroupBatchDTO(items=[], missing=[])
+
+    if len(requested) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BATCH_SIZE} ids per request"
+        )
+
+    result = await db.scalars(
+        select(StudyGroup)
+        .where(StudyGroup.id.in_(requested))
+        .options(
+            selectinload(StudyGroup.members),
+            selectinload(StudyGroup.course).selectinload(Course.semester),
+        )
+    )
+    found = {group.id: group for group in result}
+
+    return StudyGroupBatchDTO(
+        items=[
+            StudyGroupDTO.model_validate(found[study_group_id])
+            for study_group_id in requested
+            if study_group_id in found
+        ],
+        missing=[
+            study_group_id
+            for study_group_id in requested
+            if study_group_id not in found
+        ],
+    )
+
+@router.get(
+    "/search",
+    status_code=status.HTTP_200_OK,
+    response_model=StudyGroupSearchPageDTO
+)
+async def search_study_groups(
+    q: str,
+    semester_id: int | None = None,
+    page: int = Query(1, ge=1, le=100),
+    page_size: int = Query(20, ge=1, le=50),
+    db: AsyncSession = Depends(get_db),
+):
+    query = (
+        select(StudyGroup)
+        .options(selectinload(StudyGroup.course))
+        .offset((page - 1) * page_size)
+        .limit(page_size + 1)
+    )
+
+    if db.bind.dialect.name == "postgresql":
+        match = build_tsquery(q)
+        if match is not None:
+            query = query.where(StudyGroup.search_vector.op("@@")(match)).order_by(
+                func.ts_rank_cd(StudyGroup.search_vector, match).desc(),
+                StudyGroup.id,
+            )
+    else:
+        match = build_like_filter(q, [
+            Course.department + Course.course_number,
+            Course.department + " " + Course.course_number,
+            Course.professor,
+            StudyGroup.location,
+        ])
+        if match is not None:
+            query = (
+                query.join(Course, Course.id == StudyGroup.course_id)
+                .where(match)
+                .order_by(StudyGroup.id)
+            )
+
+    if match is None:
+        return StudyGroupSearchPageDTO(
+            items=[], page=page, page_size=page_size, has_more=False
+        )
+
+    if semester_id is not None:
+        query = query.where(StudyGroup.semester_id == semester_id)
+
+    groups = (await db.scalars(query)).all()
+
+    return StudyGroupSearchPageDTO(
+        items=[StudyGroupPreviewDTO.model_validate(g) for g in groups[:page_size]],
+        page=page,
+        page_size=page_size,
+        has_more=len(groups) > page_size,
+    )
+
 @router.get(
     "/{study_group_id}", 
     status_code=status.HTTP_200_OK, 
@@ -39,11 +167,18 @@ async def get_study_group_or_404(
 )
 async def fetch_study_group_info(
     study_group_id: int, 
-    db: AsyncSession = Depends(get_db),
 ):
-    study_group = await get_study_group_or_404(study_group_id, db)
-    
-    return StudyGroupDTO.model_validate(study_group)
+    body = await study_group_flight.do(
+        study_group_id,
+        lambda: _load_study_group_json(study_group_id),
+    )
+
+    return Response(content=body, media_type="application/json")
+
+async def _load_study_group_json(study_group_id: int) -> bytes:
+    async with AsyncSessionLocal() as db:
+        study_group = await get_study_group_or_404(study_group_id, db)
+        return StudyGroupDTO.model_validate(study_group).model_dump_json().encode()
 
 @router.post(
     "/",
@@ -55,18 +190,50 @@ async def create_study_group(
     student: Student = Depends(get_current_student),
     db: AsyncSession = Depends(get_db),
 ):
+    course = await db.scalar(
+        select(Course)
+        .where(Course.id == data.course_id)
+        .options(joinedload(Course.semester))
+    )
+
+    if not course:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Course not found",
+        )
+
+    # Archiving moves a semester's groups by course, so a group filed
+    # under another semester could land in an archived one.
+    if data.semester_id != course.semester_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Course is not in that semester",
+        )
+
+    if course.semester.archived_at is not None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Semester is archived",
+        )
+
     group = StudyGroup(
-        course_id=data.course_id,
+        course=course,
         semester_id=data.semester_id,
         location=data.location,
         meeting_time=data.meeting_time,
         meeting_day=data.meeting_day,
-        creator_id=student.id,
+        duration_minutes=data.duration_minutes,
+        owner_id=student.id,
+        members=[student],
     )
     
     db.add(group)
+    await db.flush()
+    changes.record(db, [student.id], changes.STUDY_GROUP, group.id)
+    changes.record(db, [student.id], changes.MEMBERSHIP, group.id)
+    _enqueue_refresh(db, group, [student.id])
     await db.commit()
-    await db.refresh(group)
+
     return StudyGroupDTO.model_validate(group)
 
 @router.post(
@@ -100,6 +267,11 @@ async def join_study_group(
         )
     
     study_group.members.append(student)
+    changes.record(db, [student.id], changes.MEMBERSHIP, study_group.id)
+    changes.record(
+        db, [m.id for m in study_group.members], changes.STUDY_GROUP, study_group.id
+    )
+    _enqueue_refresh(db, study_group, [student.id])
     await db.commit()
 
     
@@ -113,34 +285,58 @@ async def request_study_group(
     student: Student = Depends(get_current_student),
     db: AsyncSession = Depends(get_db),
 ):
-    study_group = await get_study_group_or_404(study_group_id, db)
+    study_group = (
+        await db.execute(
+            select(
+                StudyGroup.owner_id,
+                StudyGroup.course_id,
+                exists().where(
+                    StudyGroupMember.study_group_id == StudyGroup.id,
+                    StudyGroupMember.student_id == student.id,
+                ).label("is_member"),
+            )
+            .where(StudyGroup.id == study_group_id)
+        )
+    ).one_or_none()
+
+    if not study_group:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Study group not found",
+        )
         
-    if student in study_group.members:
+    if study_group.is_member:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Can't Join Group Already In"
         )
         
-    existing = await db.scalar(
-        select(StudyGroupJoinRequest).where(
-            StudyGroupJoinRequest.study_group_id == study_group.id,
-            StudyGroupJoinRequest.student_id == student.id,
+    request_id = await db.scalar(
+        dialect_insert(db)(StudyGroupJoinRequest)
+        .values(
+            study_group_id=study_group_id,
+            student_id=student.id,
+            message=data.message,
+        )
+        .on_conflict_do_nothing(
+            index_elements=[
+                StudyGroupJoinRequest.study_group_id,
+                StudyGroupJoinRequest.student_id,
+            ]
         )
+        .returning(StudyGroupJoinRequest.id)
     )
 
-    if existing:
+    if request_id is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Join request already submitted",
         )
         
-    request = StudyGroupJoinRequest(
-        study_group_id= study_group.id,
-        student_id = student.id,
-        message= data.message
+    changes.record(
+        db, [student.id, study_group.owner_id], changes.JOIN_REQUEST, request_id
     )
-    
-    study_group.join_requests.append(request)
+    jobs.enqueue(db, rollups.refresh_after_group_change, course_id=study_group.course_id)
     await db.commit()
 
 
@@ -178,8 +374,14 @@ async def accept_student(
             detail="Join request not found"
         )
 
+    request_audience = [join_request.student_id, study_group.owner_id]
+
     if join_request.student in study_group.members:
         await db.delete(join_request)
+        changes.record(
+            db, request_audience, changes.JOIN_REQUEST, join_request.id, changes.DELETE
+        )
+        jobs.enqueue(db, rollups.refresh_after_group_change, course_id=study_group.course_id)
         await db.commit()
         return StudyGroupDTO.model_validate(study_group)
 
@@ -189,10 +391,31 @@ async def accept_student(
             detail="Study group is full"
         )
 
-    study_group.members.append(join_request.student)
+    # Added as a row rather than through study_group.members so the wait
+    # between request and acceptance is kept for analytics.
+    db.add(
+        StudyGroupMember(
+            study_group_id=study_group.id,
+            student_id=join_request.student_id,
+            requested_at=join_request.created_at,
+        )
+    )
     await db.delete(join_request)
+    changes.record(
+        db, request_audience, changes.JOIN_REQUEST, join_request.id, changes.DELETE
+    )
+    changes.record(
+        db, [join_request.student_id], changes.MEMBERSHIP, study_group.id
+    )
+    changes.record(
+        db,
+        [join_request.student_id, *(m.id for m in study_group.members)],
+        changes.STUDY_GROUP,
+        study_group.id,
+    )
+    _enqueue_refresh(db, study_group, [join_request.student_id])
     await db.commit()
-    await db.refresh(study_group)
+    await db.refresh(study_group, ["members"])
 
     return StudyGroupDTO.model_validate(study_group)
 
@@ -213,8 +436,23 @@ async def delete_study_group(
             detail="Not Owner Of This Study Group"
         )
     
-    db.delete(study_group)
-    await db.commit()    
+    member_ids = [m.id for m in study_group.members]
+    requests = (
+        await db.execute(
+            select(StudyGroupJoinRequest.id, StudyGroupJoinRequest.student_id)
+            .where(StudyGroupJoinRequest.study_group_id == study_group.id)
+        )
+    ).all()
+
+    await db.delete(study_group)
+    changes.record(db, member_ids, changes.STUDY_GROUP, study_group_id, changes.DELETE)
+    changes.record(db, member_ids, changes.MEMBERSHIP, study_group_id, changes.DELETE)
+    for request_id, requester_id in requests:
+        changes.record(
+            db, [requester_id, student.id], changes.JOIN_REQUEST, request_id, changes.DELETE
+        )
+    _enqueue_refresh(db, study_group, member_ids)
+    await db.commit()
 
 @router.post(
     "/{study_group_id}/leave",
@@ -240,6 +478,13 @@ async def leave_study_group(
 
         if not remaining_members:
             await db.delete(study_group)
+            changes.record(
+                db, [student.id], changes.STUDY_GROUP, study_group_id, changes.DELETE
+            )
+            changes.record(
+                db, [student.id], changes.MEMBERSHIP, study_group_id, changes.DELETE
+            )
+            _enqueue_refresh(db, study_group, [student.id])
             await db.commit()
             return 
             
@@ -248,6 +493,11 @@ async def leave_study_group(
         study_group.owner_id = new_owner.id
     
     study_group.members.remove(student)
+    changes.record(db, [student.id], changes.MEMBERSHIP, study_group.id, changes.DELETE)
+    changes.record(
+        db, [m.id for m in study_group.members], changes.STUDY_GROUP, study_group.id
+    )
+    _enqueue_refresh(db, study_group, [student.id])
     await db.commit()
 
 
@@ -294,4 +544,11 @@ async def remove_student_from_group(
         )
     
     study_group.members.remove(kicked_member)
-    await db.commit()
\ No newline at end of file
+    changes.record(
+        db, [kicked_member.id], changes.MEMBERSHIP, study_group.id, changes.DELETE
+    )
+    changes.record(
+        db, [m.id for m in study_group.members], changes.STUDY_GROUP, study_group.id
+    )
+    _enqueue_refresh(db, study_group, [kicked_member.id])
+    await db.commit()
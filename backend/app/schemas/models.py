@@ -1,7 +1,11 @@
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-from sqlalchemy import Integer, String, ForeignKey, DateTime, func, UniqueConstraint, Boolean
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy import Integer, BigInteger, String, Text, LargeBinary, ForeignKey, DateTime, func, UniqueConstraint, Boolean, Float, Index, JSON, event, DDL, FetchedValue
 from datetime import datetime
 
+from ..core.schedule import meeting_slot, DEFAULT_DURATION_MINUTES
+from ..core.search import SEARCH_DDL
+
 
 class Base(DeclarativeBase):
     pass
@@ -22,6 +26,13 @@ class Semester(Base):
         nullable=False
     )
 
+    # Set once the semester's courses and groups have been moved to the
+    # archived_* tables, see app/core/archive.py.
+    archived_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True
+    )
+
     __table_args__ = (
         UniqueConstraint("term", "year"),
     )
@@ -64,6 +75,13 @@ class Student(Base):
     
     password_hash: Mapped[str] = mapped_column(String(255), nullable=False)
 
+    # Set when the student first asks for recommendations and a refresh is
+    # queued; None until then.
+    recommendations_queued_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True
+    )
+
     sessions: Mapped[list["Session"]] = relationship(
         back_populates="student",
         cascade="all, delete-orphan"
@@ -96,6 +114,24 @@ class StudyGroupMember(Base):
         primary_key=True
     )
 
+    joined_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+
+    # When the accepted join request was made; null for direct joins.
+    requested_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True
+    )
+
+    # The primary key leads with study_group_id; "my groups" looks up by
+    # student.
+    __table_args__ = (
+        Index("ix_study_group_members_student_group", "student_id", "study_group_id"),
+    )
+
 
 class StudyGroup(Base):
     __tablename__ = "studyGroups"
@@ -143,10 +179,40 @@ class StudyGroup(Base):
         nullable=True
     )
 
+    duration_minutes: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=DEFAULT_DURATION_MINUTES
+    )
+
+    # Normalized minute-of-week interval, maintained from meeting_time /
+    # meeting_day by _normalize_schedule below.
+    schedule_start: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False
+    )
+
+    schedule_end: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False
+    )
+
+    is_recurring: Mapped[bool] = mapped_column(
+        Boolean,
+        nullable=False,
+        default=False
+    )
+
+    # Maintained by database triggers, see app/core/search.py.
+    search_vector: Mapped[str | None] = mapped_column(
+        TSVECTOR().with_variant(Text(), "sqlite"),
+        nullable=True,
+        deferred=True
+    )
+
     course_id: Mapped[int] = mapped_column(
         ForeignKey("courses.id", ondelete="CASCADE"),
-        nullable=False,
-        index=True
+        nullable=False
     )
 
     course: Mapped["Course"] = relationship(
@@ -162,9 +228,38 @@ class StudyGroup(Base):
         cascade="all, delete-orphan"
     )
     
+    __table_args__ = (
+        Index("ix_studyGroups_semester_schedule", "semester_id", "schedule_start"),
+        Index("ix_studyGroups_course_semester", "course_id", "semester_id"),
+        Index("ix_studyGroups_meeting_time", "meeting_time"),
+        Index("ix_studyGroups_search_vector", "search_vector", postgresql_using="gin"),
+        {"sqlite_autoincrement": True},
+    )
+
     @property
     def course_name(self) -> str:
         return f"{self.course.department} {self.course.course_number}"
+
+
+@event.listens_for(StudyGroup, "before_insert")
+@event.listens_for(StudyGroup, "before_update")
+def _normalize_schedule(mapper, connection, target: StudyGroup) -> None:
+    if target.duration_minutes is None:
+        target.duration_minutes = DEFAULT_DURATION_MINUTES
+
+    target.schedule_start, target.schedule_end, target.is_recurring = meeting_slot(
+        target.meeting_time,
+        target.meeting_day,
+        target.duration_minutes,
+    )
+
+
+for ddl in SEARCH_DDL:
+    event.listen(
+        StudyGroup.__table__,
+        "after_create",
+        ddl.execute_if(dialect="postgresql"),
+    )
         
 
 
@@ -182,7 +277,6 @@ class StudyGroupJoinRequest(Base):
     student_id: Mapped[int] = mapped_column(
         ForeignKey("students.id", ondelete="CASCADE"),
         nullable=False,
-        index=True,
     )
 
     created_at: Mapped[datetime] = mapped_column(
@@ -203,6 +297,8 @@ class StudyGroupJoinRequest(Base):
 
     __table_args__ = (
         UniqueConstraint("study_group_id", "student_id"),
+        Index("ix_study_group_join_requests_student_created", "student_id", "created_at"),
+        {"sqlite_autoincrement": True},
     )
 
 class StudentCourse(Base):
@@ -224,6 +320,11 @@ class StudentCourse(Base):
         nullable=False
     )
 
+    # Course rosters; the primary key leads with student_id.
+    __table_args__ = (
+        Index("ix_student_courses_course_id", "course_id"),
+    )
+
 class Course(Base):
     __tablename__ = "courses"
 
@@ -264,8 +365,11 @@ class Course(Base):
         cascade="all, delete-orphan"
     )
 
+    # Archived rows keep their ids (see app.core.archive), so SQLite must
+    # not hand them out again; Postgres sequences never do.
     __table_args__ = (
         UniqueConstraint("department", "course_number", "semester_id"),
+        {"sqlite_autoincrement": True},
     )
 
 class Session(Base):
@@ -288,6 +392,12 @@ class Session(Base):
         nullable=False
     )
 
+    last_seen_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+
     expires_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         nullable=False,
@@ -297,3 +407,576 @@ class Session(Base):
     student: Mapped["Student"] = relationship(
         back_populates="sessions"
     )
+
+
+class StudyGroupRecommendation(Base):
+    __tablename__ = "study_group_recommendations"
+
+    student_id: Mapped[int] = mapped_column(
+        ForeignKey("students.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+
+    study_group_id: Mapped[int] = mapped_column(
+        ForeignKey("studyGroups.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True
+    )
+
+    score: Mapped[float] = mapped_column(
+        Float,
+        nullable=False
+    )
+
+    computed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+
+    study_group: Mapped["StudyGroup"] = relationship()
+
+    __table_args__ = (
+        Index("ix_study_group_recommendations_student_score", "student_id", "score"),
+    )
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    # sha256 of the caller's session cookie, so keys from different clients
+    # never collide and replay needs no session lookup.
+    scope: Mapped[str] = mapped_column(
+        String(64),
+        primary_key=True
+    )
+
+    key: Mapped[str] = mapped_column(
+        String(255),
+        primary_key=True
+    )
+
+    method: Mapped[str] = mapped_column(
+        String(8),
+        nullable=False
+    )
+
+    path: Mapped[str] = mapped_column(
+        String(255),
+        nullable=False
+    )
+
+    request_hash: Mapped[str] = mapped_column(
+        String(64),
+        nullable=False
+    )
+
+    # NULL while the original request is still running.
+    status_code: Mapped[int | None] = mapped_column(
+        Integer,
+        nullable=True
+    )
+
+    response_body: Mapped[bytes | None] = mapped_column(
+        LargeBinary,
+        nullable=True
+    )
+
+    # [name, value] pairs, so repeated headers like Set-Cookie survive.
+    headers: Mapped[list | None] = mapped_column(
+        JSON,
+        nullable=True
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+
+    # When the running request took the key. A claim older than
+    # CLAIM_TIMEOUT belongs to a worker that died and can be taken over.
+    claimed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+
+    expires_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        index=True
+    )
+
+
+class RateLimitBucket(Base):
+    __tablename__ = "rate_limit_buckets"
+
+    key: Mapped[str] = mapped_column(
+        String(255),
+        primary_key=True
+    )
+
+    tokens: Mapped[float] = mapped_column(
+        Float,
+        nullable=False
+    )
+
+    # Unix timestamp of the last refill.
+    updated_at: Mapped[float] = mapped_column(
+        Float,
+        nullable=False
+    )
+
+
+class ChangeLog(Base):
+    __tablename__ = "change_log"
+
+    # The client's sync cursor on SQLite, where writers take turns so ids
+    # become visible in order. See app.core.changes for Postgres.
+    id: Mapped[int] = mapped_column(
+        BigInteger().with_variant(Integer, "sqlite"),
+        primary_key=True
+    )
+
+    # Postgres only: id of the writing transaction, filled in by the
+    # column default below. The sync cursor there.
+    xact_id: Mapped[int | None] = mapped_column(
+        BigInteger,
+        server_default=FetchedValue(),
+        nullable=True
+    )
+
+    student_id: Mapped[int] = mapped_column(
+        ForeignKey("students.id", ondelete="CASCADE"),
+        nullable=False
+    )
+
+    entity: Mapped[str] = mapped_column(
+        String(32),
+        nullable=False
+    )
+
+    entity_id: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False
+    )
+
+    op: Mapped[str] = mapped_column(
+        String(8),
+        nullable=False
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+        index=True
+    )
+
+    __table_args__ = (
+        Index("ix_change_log_student_id_id", "student_id", "id"),
+        Index("ix_change_log_student_id_xact_id", "student_id", "xact_id", "id"),
+        # The oldest position still kept, read on every poll.
+        Index("ix_change_log_xact_id", "xact_id"),
+    )
+
+
+event.listen(
+    ChangeLog.__table__,
+    "after_create",
+    DDL(
+        "ALTER TABLE change_log ALTER COLUMN xact_id "
+        "SET DEFAULT pg_current_xact_id()::text::bigint"
+    ).execute_if(dialect="postgresql"),
+)
+
+
+class CourseActivity(Base):
+    __tablename__ = "course_activity"
+
+    # Rollup of the live group tables for course browsing; rebuilt per
+    # course by app.core.rollups, never written by request handlers.
+    course_id: Mapped[int] = mapped_column(
+        ForeignKey("courses.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+
+    semester_id: Mapped[int] = mapped_column(
+        ForeignKey("semesters.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True
+    )
+
+    group_count: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0
+    )
+
+    member_count: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0
+    )
+
+    open_seats: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0
+    )
+
+    pending_requests: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0
+    )
+
+    refreshed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+
+    course: Mapped["Course"] = relationship()
+
+
+# ---------- Archive ----------
+# Closed semesters are moved here in bulk by app.core.archive so the hot
+# tables and their indexes only hold current data. Rows keep their
+# original ids and carry semester_id so a semester moves as one unit.
+
+class ArchivedCourse(Base):
+    __tablename__ = "archived_courses"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    semester_id: Mapped[int] = mapped_column(
+        ForeignKey("semesters.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+
+    department: Mapped[str] = mapped_column(
+        String(64),
+        nullable=False
+    )
+
+    course_number: Mapped[str] = mapped_column(
+        String(16),
+        nullable=False
+    )
+
+    professor: Mapped[str] = mapped_column(
+        String(255),
+        nullable=False
+    )
+
+
+class ArchivedStudentCourse(Base):
+    __tablename__ = "archived_student_courses"
+
+    student_id: Mapped[int] = mapped_column(
+        ForeignKey("students.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+
+    course_id: Mapped[int] = mapped_column(
+        Integer,
+        primary_key=True
+    )
+
+    semester_id: Mapped[int] = mapped_column(
+        ForeignKey("semesters.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False
+    )
+
+
+class ArchivedStudyGroup(Base):
+    __tablename__ = "archived_study_groups"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    semester_id: Mapped[int] = mapped_column(
+        ForeignKey("semesters.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+
+    course_id: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        index=True
+    )
+
+    owner_id: Mapped[int] = mapped_column(
+        ForeignKey("students.id", ondelete="CASCADE"),
+        nullable=False
+    )
+
+    capacity: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False
+    )
+
+    isPrivate: Mapped[bool] = mapped_column(
+        Boolean,
+        nullable=False
+    )
+
+    location: Mapped[str] = mapped_column(
+        String(255),
+        nullable=False
+    )
+
+    meeting_time: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False
+    )
+
+    meeting_day: Mapped[str] = mapped_column(
+        String(32),
+        nullable=True
+    )
+
+    duration_minutes: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False
+    )
+
+    schedule_start: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False
+    )
+
+    schedule_end: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False
+    )
+
+    is_recurring: Mapped[bool] = mapped_column(
+        Boolean,
+        nullable=False
+    )
+
+    course: Mapped["ArchivedCourse"] = relationship(
+        primaryjoin="foreign(ArchivedStudyGroup.course_id) == ArchivedCourse.id",
+        viewonly=True
+    )
+
+    @property
+    def course_name(self) -> str:
+        return f"{self.course.department} {self.course.course_number}"
+
+
+class ArchivedStudyGroupMember(Base):
+    __tablename__ = "archived_study_group_members"
+
+    study_group_id: Mapped[int] = mapped_column(
+        Integer,
+        primary_key=True
+    )
+
+    student_id: Mapped[int] = mapped_column(
+        ForeignKey("students.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True
+    )
+
+    joined_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False
+    )
+
+    requested_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True
+    )
+
+    semester_id: Mapped[int] = mapped_column(
+        ForeignKey("semesters.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+
+
+class ArchivedStudyGroupJoinRequest(Base):
+    __tablename__ = "archived_study_group_join_requests"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    study_group_id: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        index=True
+    )
+
+    student_id: Mapped[int] = mapped_column(
+        ForeignKey("students.id", ondelete="CASCADE"),
+        nullable=False
+    )
+
+    semester_id: Mapped[int] = mapped_column(
+        ForeignKey("semesters.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False
+    )
+
+    message: Mapped[str | None] = mapped_column(
+        String(500),
+        nullable=True
+    )
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    # Side effects queued in the same transaction as the change that caused
+    # them and run by app.core.jobs workers. Finished jobs are deleted;
+    # failed ones stay for inspection until purged.
+    id: Mapped[int] = mapped_column(
+        BigInteger().with_variant(Integer, "sqlite"),
+        primary_key=True
+    )
+
+    kind: Mapped[str] = mapped_column(
+        String(128),
+        nullable=False
+    )
+
+    payload: Mapped[dict] = mapped_column(
+        JSON,
+        nullable=False,
+        default=dict
+    )
+
+    status: Mapped[str] = mapped_column(
+        String(16),
+        nullable=False,
+        default="queued"
+    )
+
+    attempts: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0
+    )
+
+    max_attempts: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=5
+    )
+
+    run_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+
+    locked_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True
+    )
+
+    locked_by: Mapped[str | None] = mapped_column(
+        String(64),
+        nullable=True
+    )
+
+    last_error: Mapped[str | None] = mapped_column(
+        Text,
+        nullable=True
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+
+    __table_args__ = (
+        Index("ix_jobs_status_run_at", "status", "run_at"),
+    )
+
+
+class SemesterAnalytics(Base):
+    __tablename__ = "semester_analytics"
+
+    # Cached output of app.core.analytics; marked stale whenever a course
+    # rollup in the semester is refreshed.
+    semester_id: Mapped[int] = mapped_column(
+        ForeignKey("semesters.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+
+    payload: Mapped[dict] = mapped_column(
+        JSON,
+        nullable=False
+    )
+
+    stale: Mapped[bool] = mapped_column(
+        Boolean,
+        nullable=False,
+        default=False
+    )
+
+    computed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False
+    )
+
+
+class CalendarFeed(Base):
+    __tablename__ = "calendar_feeds"
+
+    # A student's subscribable iCalendar feed, rendered by app.core.ical
+    # and re-rendered once change_log moves past `cursor`.
+    student_id: Mapped[int] = mapped_column(
+        ForeignKey("students.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+
+    token: Mapped[str] = mapped_column(
+        String(64),
+        unique=True,
+        index=True,
+        nullable=False
+    )
+
+    body: Mapped[str | None] = mapped_column(
+        Text,
+        nullable=True
+    )
+
+    etag: Mapped[str | None] = mapped_column(
+        String(64),
+        nullable=True
+    )
+
+    cursor: Mapped[int] = mapped_column(
+        BigInteger().with_variant(Integer, "sqlite"),
+        nullable=False,
+        default=0
+    )
+
+    generated_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True
+    )
+
+    modified_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True
+    )
@@ -28,6 +28,32 @@ class CourseDTO(BaseModel):
         from_attributes = True
 
 
+class CourseActivityDTO(BaseModel):
+    course: CourseDTO
+    group_count: int
+    member_count: int
+    open_seats: int
+    pending_requests: int
+    refreshed_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class EnrollmentImportDTO(BaseModel):
+    enrolled: list[CourseDTO]
+    already_enrolled: int
+    unmatched: list[str]
+
+
+class GroupFormationDTO(BaseModel):
+    dry_run: bool
+    group_count: int
+    placed: int
+    unplaced: list[int]
+    study_group_ids: list[int]
+
+
 # ---------- Student (public-facing subset) ----------
 
 class StudentDTO(BaseModel):
@@ -51,6 +77,7 @@ class StudyGroupDTO(BaseModel):
     course: CourseDTO
     meeting_time: datetime
     meeting_day: Optional[str] = None
+    duration_minutes: int
     members: List[StudentDTO]
     capacity: int
 
@@ -62,6 +89,7 @@ class StudyGroupPreviewDTO(BaseModel):
     location: str
     meeting_time: datetime
     meeting_day: Optional[str] = None
+    duration_minutes: int
     capacity: int
     course_name: str
 
@@ -80,3 +108,125 @@ class StudyGroupJoinRequestDTO(BaseModel):
         
 
 
+
+
+class StudyGroupRecommendationDTO(BaseModel):
+    score: float
+    study_group: StudyGroupPreviewDTO
+
+    class Config:
+        from_attributes = True
+
+
+class StudyGroupSearchPageDTO(BaseModel):
+    items: List[StudyGroupPreviewDTO]
+    page: int
+    page_size: int
+    has_more: bool
+
+
+class StudyGroupBatchDTO(BaseModel):
+    items: List[StudyGroupDTO]
+    missing: List[int]
+
+
+class ChangeDTO(BaseModel):
+    id: int
+    entity: str
+    entity_id: int
+    op: str
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class ChangeFeedDTO(BaseModel):
+    changes: List[ChangeDTO]
+    cursor: int
+    has_more: bool
+    reset: bool
+
+
+class DashboardDTO(BaseModel):
+    student: StudentDTO
+    study_groups: List[StudyGroupPreviewDTO]
+    courses: List[CourseDTO]
+    requests: List[StudyGroupJoinRequestDTO]
+
+
+# ---------- Calendar ----------
+
+class CalendarSubscriptionDTO(BaseModel):
+    url: str
+    webcal_url: str
+
+
+# ---------- Archive ----------
+
+class ArchivedCourseDTO(BaseModel):
+    id: int
+    department: str
+    course_number: str
+    professor: str
+
+    class Config:
+        from_attributes = True
+
+
+class ArchivedStudyGroupDTO(BaseModel):
+    id: int
+    semester_id: int
+    owner_id: int
+    location: str
+    course: ArchivedCourseDTO
+    meeting_time: datetime
+    meeting_day: Optional[str] = None
+    duration_minutes: int
+    capacity: int
+
+    class Config:
+        from_attributes = True
+
+
+# ---------- Analytics ----------
+
+class AcceptanceLatencyDTO(BaseModel):
+    accepted: int
+    mean_seconds: Optional[float] = None
+    median_seconds: Optional[float] = None
+    p90_seconds: Optional[float] = None
+
+
+class SemesterSummaryDTO(BaseModel):
+    course_count: int
+    group_count: int
+    capacity: int
+    member_count: int
+    fill_rate: Optional[float] = None
+    full_groups: int
+    pending_requests: int
+    enrolled_students: int
+    active_students: int
+    acceptance_latency: AcceptanceLatencyDTO
+
+
+class CourseAnalyticsDTO(BaseModel):
+    course_id: int
+    department: str
+    course_number: str
+    group_count: int
+    capacity: int
+    member_count: int
+    fill_rate: Optional[float] = None
+    full_groups: int
+    pending_requests: int
+    enrolled_students: int
+
+
+class SemesterAnalyticsDTO(BaseModel):
+    semester_id: int
+    computed_at: datetime
+    stale: bool
+    summary: SemesterSummaryDTO
+    courses: List[CourseAnalyticsDTO]
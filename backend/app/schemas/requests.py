@@ -1,7 +1,9 @@
-from datetime import datetime
-from pydantic import BaseModel
+from datetime import datetime, time
+from pydantic import BaseModel, Field
 from typing import Optional
 
+from ..core.schedule import MAX_DURATION_MINUTES
+
 class StudyGroupUpdateDTO(BaseModel):
     location: Optional[str] = None
     meeting_time: Optional[datetime] = None
@@ -13,6 +15,7 @@ class StudyGroupCreateDTO(BaseModel):
     location: str
     meeting_time: datetime
     meeting_day: Optional[str] = None
+    duration_minutes: Optional[int] = Field(None, ge=15, le=MAX_DURATION_MINUTES)
     
     
 class StudyGroupRequestDTO(BaseModel):
@@ -29,4 +32,33 @@ class CourseCreateRequest(BaseModel):
     department: str
     course_number: str
     professor: str
-    semester_id: int
\ No newline at end of file
+    semester_id: int
+
+
+class TimeSlotDTO(BaseModel):
+    day: str
+    start: time
+    end: time
+
+
+class ScheduleCompatibleRequestDTO(BaseModel):
+    semester_id: int
+    course_id: Optional[int] = None
+    free_slots: list[TimeSlotDTO] = Field(min_length=1, max_length=50)
+    avoid_group_ids: list[int] = Field(default_factory=list, max_length=50)
+    avoid_my_groups: bool = True
+
+
+class FormationSlotRequest(BaseModel):
+    day: str
+    at: time
+
+
+class GroupFormationRequest(BaseModel):
+    capacity: int = Field(5, ge=2, le=20)
+    location: str = "To be decided"
+    duration_minutes: int = Field(60, ge=15, le=MAX_DURATION_MINUTES)
+    # Defaults to weekday evenings and Sunday afternoon.
+    slots: Optional[list[FormationSlotRequest]] = Field(None, min_length=1, max_length=64)
+    private: bool = True
+    dry_run: bool = False
@@ -0,0 +1,175 @@
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, func, insert, select
+
+from app.core import formation
+from app.core.schedule import meeting_slot
+from app.deps.db import AsyncSessionLocal, dispose_engines, get_engine
+from app.schemas.models import (
+    Base,
+    Course,
+    Job,
+    Semester,
+    Student,
+    StudentCourse,
+    StudyGroup,
+    StudyGroupMember,
+)
+
+# Times automatic group formation for courses of increasing size: loading
+# candidates, planning, and writing the groups. A third of the students
+# already meet weekly for another course, so availability matters. Each
+# size gets a throwaway semester that is removed afterwards.
+# Usage: python -m bench.formation [--sizes 100,1000,5000,20000]
+
+EMAIL_DOMAIN = "formation.invalid"
+MAJORS = ["CS", "EECS", "Math", "Stats", "Physics", "Econ", "Data Science", "Cog Sci", None]
+YEARS = ["2026", "2027", "2028", "2029", None]
+BUSY_FRACTION = 1 / 3
+
+
+async def _insert(db, model, rows: list[dict], returning=None) -> list:
+    ids = []
+    for i in range(0, len(rows), 5000):
+        statement = insert(model)
+        if returning is not None:
+            statement = statement.returning(returning, sort_by_parameter_order=True)
+            ids += (await db.scalars(statement, rows[i:i + 5000])).all()
+        else:
+            await db.execute(statement, rows[i:i + 5000])
+    return ids
+
+
+async def seed(size: int) -> tuple[int, int]:
+    rng = random.Random(size)
+    now = datetime.now(timezone.utc)
+
+    async with AsyncSessionLocal() as db:
+        [semester_id] = await _insert(db, Semester, [
+            {"term": f"FORM{size}", "year": 9999}
+        ], Semester.id)
+        course_id, other_id = await _insert(db, Course, [
+            {"semester_id": semester_id, "department": "FORM", "course_number": str(n), "professor": "Staff"}
+            for n in (1, 2)
+        ], Course.id)
+
+        student_ids = await _insert(db, Student, [
+            {
+                "email": f"s{size}-{i}@{EMAIL_DOMAIN}",
+                "password_hash": "!",
+                "major": rng.choice(MAJORS),
+                "class_year": rng.choice(YEARS),
+            }
+            for i in range(size)
+        ], Student.id)
+        await _insert(db, StudentCourse, [
+            {"student_id": s, "course_id": course_id} for s in student_ids
+        ])
+
+        # Existing weekly groups in the other course, one per default slot.
+        busy_groups = []
+        for slot in formation.DEFAULT_SLOTS[::2]:
+            meeting_time = formation.first_meeting(slot, now)
+            day = formation.WEEKDAY_NAMES[slot.weekday]
+            start, end, recurring = meeting_slot(meeting_time, day, 60)
+            busy_groups.append({
+                "owner_id": student_ids[0],
+                "semester_id": semester_id,
+                "course_id": other_id,
+                "location": "Moffitt",
+                "meeting_time": meeting_time,
+                "meeting_day": day,
+                "capacity": size,
+                "isPrivate": True,
+                "duration_minutes": 60,
+                "schedule_start": start,
+                "schedule_end": end,
+                "is_recurring": recurring,
+            })
+        busy_ids = await _insert(db, StudyGroup, busy_groups, StudyGroup.id)
+        await _insert(db, StudyGroupMember, [
+            {"study_group_id": g, "student_id": s}
+            for s in rng.sample(student_ids, int(size * BUSY_FRACTION))
+            for g in rng.sample(busy_ids, 2)
+        ])
+
+        await db.commit()
+        return semester_id, course_id
+
+
+async def cleanup(semester_id: int, job_ids: list[int]) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(Job).where(Job.id.in_(job_ids)))
+        await db.execute(delete(Semester).where(Semester.id == semester_id))
+        await db.execute(delete(Student).where(Student.email.like(f"%@{EMAIL_DOMAIN}")))
+        await db.commit()
+
+
+async def run(size: int) -> dict:
+    semester_id, course_id = await seed(size)
+    job_ids = []
+    try:
+        async with AsyncSessionLocal() as db:
+            course = await db.get(Course, course_id)
+            slots = formation.DEFAULT_SLOTS
+
+            started = time.perf_counter()
+            candidates = await formation.load_candidates(db, course_id, slots, 60)
+            loaded = time.perf_counter()
+            plan = formation.plan_groups(candidates, slots)
+            planned = time.perf_counter()
+            await formation.write_groups(db, course, plan)
+            # The refresh jobs it queues would only find deleted rows.
+            queued = [job for job in db.new if isinstance(job, Job)]
+            await db.commit()
+            job_ids = [job.id for job in queued]
+            written = time.perf_counter()
+
+            groups = await db.scalar(
+                select(func.count()).select_from(StudyGroup).where(StudyGroup.course_id == course_id)
+            )
+
+        majors = {c.id: c.major for c in candidates}
+        sizes = [len(members) for _, members in plan.groups]
+        mixes = [len({majors[s] for s in members}) / len(members) for _, members in plan.groups]
+        return {
+            "students": size,
+            "load_ms": (loaded - started) * 1000,
+            "plan_ms": (planned - loaded) * 1000,
+            "write_ms": (written - planned) * 1000,
+            "groups": groups,
+            "mean_size": sum(sizes) / len(sizes) if sizes else 0,
+            "mix": sum(mixes) / len(mixes) if mixes else 0,
+            "unplaced": len(plan.unplaced),
+        }
+    finally:
+        await cleanup(semester_id, job_ids)
+
+
+async def main(sizes: list[int]) -> None:
+    async with get_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    print(f"{'students':>9} {'load ms':>9} {'plan ms':>9} {'write ms':>9} {'groups':>7} {'size':>5} {'mix':>5} {'left out':>9}")
+    try:
+        for size in sizes:
+            r = await run(size)
+            print(
+                f"{r['students']:>9} {r['load_ms']:>9.1f} {r['plan_ms']:>9.1f} {r['write_ms']:>9.1f}"
+                f" {r['groups']:>7} {r['mean_size']:>5.2f} {r['mix']:>5.2f} {r['unplaced']:>9}"
+            )
+    finally:
+        await dispose_engines()
+
+    print("mix: distinct majors per member in a group (1.00 = no two members share a major)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="100,1000,5000,20000")
+    args = parser.parse_args()
+    asyncio.run(main([int(size) for size in args.sizes.split(",")]))
@@ -0,0 +1,317 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from sqlalchemy import delete, func, insert, select, text
+
+from app.core import jobs, queries
+from app.core.schedule import meeting_slot
+from app.deps.db import AsyncSessionLocal, dispose_engines, get_engine
+from app.routers.schedule import _base_query
+from app.schemas.models import (
+    Base,
+    ChangeLog,
+    Course,
+    CourseActivity,
+    Job,
+    Semester,
+    Session,
+    Student,
+    StudentCourse,
+    StudyGroup,
+    StudyGroupJoinRequest,
+    StudyGroupMember,
+    StudyGroupRecommendation,
+)
+
+# Seeds a throwaway semester with production-shaped data, runs EXPLAIN on
+# every hot query below and exits non-zero if any of them plans a full
+# table scan (Seq Scan on Postgres, SCAN without an index on SQLite).
+# Register new hot queries in HOT_QUERIES.
+# Usage: python -m bench.plans [--students 20000] [--semesters 4] [--verbose]
+
+EMAIL_DOMAIN = "plans.invalid"
+
+
+@dataclass
+class Fixture:
+    semester_ids: list[int]
+    student_id: int
+    course_id: int
+    study_group_id: int
+
+    @property
+    def semester_id(self) -> int:
+        # The course's semester.
+        return self.semester_ids[0]
+
+
+@dataclass
+class HotQuery:
+    name: str
+    build: Callable[[Fixture], object]
+    # Tables small enough that scanning them is the right plan.
+    allow_scan: frozenset[str] = frozenset()
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+HOT_QUERIES = [
+    HotQuery("auth.session", lambda f: (
+        select(Session)
+        .where(Session.session_token == "token", Session.expires_at > _now())
+    )),
+    HotQuery("my.study_groups", lambda f: queries.my_study_groups(f.student_id)),
+    HotQuery("my.courses", lambda f: queries.my_courses(f.student_id)),
+    HotQuery("my.requests", lambda f: queries.my_requests(f.student_id)),
+    HotQuery("study_group.by_id", lambda f: (
+        select(StudyGroup).where(StudyGroup.id == f.study_group_id)
+    )),
+    HotQuery("study_group.members", lambda f: (
+        select(StudyGroupMember.student_id)
+        .where(StudyGroupMember.study_group_id == f.study_group_id)
+    )),
+    HotQuery("study_group.join_requests", lambda f: (
+        select(StudyGroupJoinRequest)
+        .where(StudyGroupJoinRequest.study_group_id == f.study_group_id)
+        .order_by(StudyGroupJoinRequest.created_at)
+    )),
+    HotQuery("course.study_groups", lambda f: (
+        select(StudyGroup)
+        .where(StudyGroup.course_id == f.course_id, StudyGroup.semester_id == f.semester_id)
+    )),
+    HotQuery("course.roster", lambda f: (
+        select(StudentCourse.student_id).where(StudentCourse.course_id == f.course_id)
+    )),
+    HotQuery("course.browse", lambda f: (
+        select(CourseActivity)
+        .join(Course, Course.id == CourseActivity.course_id)
+        .where(CourseActivity.semester_id == f.semester_id)
+        .order_by(Course.department, Course.course_number)
+        .limit(50)
+    )),
+    HotQuery("schedule.slot", lambda f: (
+        _base_query(f.semester_id, None)
+        .where(StudyGroup.schedule_start.between(600, 720))
+    )),
+    HotQuery("recommendations.for_student", lambda f: (
+        select(StudyGroupRecommendation)
+        .where(StudyGroupRecommendation.student_id == f.student_id)
+        .order_by(StudyGroupRecommendation.score.desc())
+        .limit(20)
+    )),
+    HotQuery("changes.feed", lambda f: (
+        select(ChangeLog)
+        .where(ChangeLog.student_id == f.student_id, ChangeLog.id > 0)
+        .order_by(ChangeLog.id)
+        .limit(100)
+    )),
+    HotQuery("changes.oldest", lambda f: select(func.min(ChangeLog.xact_id))),
+    HotQuery("jobs.claim", lambda f: (
+        select(Job.id)
+        .where(Job.status == jobs.QUEUED, Job.run_at <= _now())
+        .order_by(Job.run_at, Job.id)
+        .limit(jobs.CONCURRENCY)
+    )),
+]
+
+
+async def _insert(db, model, rows: list[dict], returning=None) -> list:
+    ids = []
+    for i in range(0, len(rows), 5000):
+        statement = insert(model)
+        if returning is not None:
+            ids += (await db.scalars(statement.returning(returning), rows[i:i + 5000])).all()
+        else:
+            await db.execute(statement, rows[i:i + 5000])
+    return ids
+
+
+async def seed(students: int, semesters: int) -> Fixture:
+    rng = random.Random(7)
+    courses = max(students // 10, 10)
+    groups = students
+    base = datetime(2026, 8, 24, 9, tzinfo=timezone.utc)
+    now = _now()
+
+    async with AsyncSessionLocal() as db:
+        # Several live semesters, so per-semester filters are as selective
+        # as they are in production.
+        semester_ids = await _insert(db, Semester, [
+            {"term": f"PLANS{i}", "year": 9999} for i in range(semesters)
+        ], Semester.id)
+
+        student_ids = await _insert(db, Student, [
+            {"email": f"s{i}@{EMAIL_DOMAIN}", "password_hash": "!"}
+            for i in range(students)
+        ], Student.id)
+        await _insert(db, Session, [
+            {"session_token": f"plans-{s}", "student_id": s, "expires_at": now + timedelta(days=7)}
+            for s in student_ids
+        ])
+        course_rows = [
+            {
+                "semester_id": semester_ids[i % semesters],
+                "department": "PLAN",
+                "course_number": str(i),
+                "professor": "Staff",
+            }
+            for i in range(courses)
+        ]
+        course_ids = await _insert(db, Course, course_rows, Course.id)
+        course_semester = {
+            course_id: row["semester_id"] for course_id, row in zip(course_ids, course_rows)
+        }
+
+        group_rows = []
+        for _ in range(groups):
+            meeting_time = base + timedelta(minutes=30 * rng.randrange(7 * 48))
+            start, end, recurring = meeting_slot(meeting_time, None, 60)
+            course_id = rng.choice(course_ids)
+            group_rows.append({
+                "owner_id": rng.choice(student_ids),
+                "semester_id": course_semester[course_id],
+                "course_id": course_id,
+                "location": "Moffitt",
+                "meeting_time": meeting_time,
+                "capacity": 6,
+                "isPrivate": False,
+                "duration_minutes": 60,
+                "schedule_start": start,
+                "schedule_end": end,
+                "is_recurring": recurring,
+            })
+        group_ids = await _insert(db, StudyGroup, group_rows, StudyGroup.id)
+
+        members = {(g, s) for g in group_ids for s in rng.sample(student_ids, 3)}
+        await _insert(db, StudyGroupMember, [
+            {"study_group_id": g, "student_id": s} for g, s in members
+        ])
+        requests = {(rng.choice(group_ids), rng.choice(student_ids)) for _ in range(groups)}
+        await _insert(db, StudyGroupJoinRequest, [
+            {"study_group_id": g, "student_id": s} for g, s in requests - members
+        ])
+        await _insert(db, StudentCourse, [
+            {"student_id": s, "course_id": c}
+            for s in student_ids
+            for c in rng.sample(course_ids, 4)
+        ])
+        await _insert(db, StudyGroupRecommendation, [
+            {"student_id": s, "study_group_id": g, "score": rng.random()}
+            for s in student_ids
+            for g in rng.sample(group_ids, 3)
+        ])
+        await _insert(db, ChangeLog, [
+            {"student_id": s, "entity": "membership", "entity_id": 1, "op": "upsert"}
+            for s in student_ids
+            for _ in range(2)
+        ])
+        await _insert(db, CourseActivity, [
+            {"course_id": c, "semester_id": course_semester[c], "group_count": 0,
+             "member_count": 0, "open_seats": 0, "pending_requests": 0}
+            for c in course_ids
+        ])
+        # Mostly finished work, as in a drained queue.
+        await _insert(db, Job, [
+            {"kind": "plans.noop", "payload": {}, "status": jobs.FAILED, "run_at": now}
+            for _ in range(students)
+        ])
+
+        await db.commit()
+        return Fixture(semester_ids, student_ids[0], course_ids[0], group_ids[0])
+
+
+async def cleanup(fixture: Fixture) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(Job).where(Job.kind == "plans.noop"))
+        await db.execute(delete(Semester).where(Semester.id.in_(fixture.semester_ids)))
+        await db.execute(delete(Student).where(Student.email.like(f"%@{EMAIL_DOMAIN}")))
+        await db.commit()
+
+
+async def explain(conn, statement) -> list[str]:
+    compiled = statement.compile(
+        dialect=conn.dialect, compile_kwargs={"render_postcompile": True}
+    )
+    params = compiled.construct_params()
+    if compiled.positiontup is not None:
+        params = tuple(params[name] for name in compiled.positiontup)
+
+    if conn.dialect.name == "sqlite":
+        rows = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params)
+        return [row[-1] for row in rows]
+
+    plan = (await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params)).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    lines = []
+
+    def walk(node, depth=0):
+        relation = node.get("Relation Name")
+        index = node.get("Index Name")
+        lines.append(
+            "  " * depth + node["Node Type"]
+            + (f" on {relation}" if relation else "")
+            + (f" using {index}" if index else "")
+        )
+        for child in node.get("Plans", []):
+            walk(child, depth + 1)
+
+    walk(plan[0]["Plan"])
+    return lines
+
+
+def full_scans(plan: list[str]) -> set[str]:
+    scanned = set()
+    for line in plan:
+        words = line.split()
+        if words[:2] == ["Seq", "Scan"]:
+            scanned.add(words[3].strip('"'))
+        elif words[:1] == ["SCAN"] and "USING" not in words:
+            scanned.add(words[1].strip('"'))
+    return scanned
+
+
+async def main(students: int, semesters: int, verbose: bool) -> int:
+    async with get_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    fixture = await seed(students, semesters)
+    failures = []
+
+    try:
+        async with get_engine().connect() as conn:
+            # Plans depend on statistics, so refresh them for the new rows.
+            await conn.execute(text("ANALYZE"))
+            for query in HOT_QUERIES:
+                plan = await explain(conn, query.build(fixture))
+                scans = full_scans(plan) - query.allow_scan
+                status = "FAIL" if scans else "ok"
+                print(f"{status:<4} {query.name}" + (f"  (full scan of {', '.join(sorted(scans))})" if scans else ""))
+                if scans or verbose:
+                    print("\n".join(f"       {line}" for line in plan))
+                if scans:
+                    failures.append(query.name)
+    finally:
+        await cleanup(fixture)
+        await dispose_engines()
+
+    print(f"{len(HOT_QUERIES) - len(failures)}/{len(HOT_QUERIES)} hot queries use indexes")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=20000)
+    parser.add_argument("--semesters", type=int, default=4)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.students, args.semesters, args.verbose)))
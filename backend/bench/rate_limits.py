@@ -0,0 +1,69 @@
+import asyncio
+import sys
+
+import httpx
+from sqlalchemy import delete
+
+from app.deps.db import AsyncSessionLocal, dispose_engines, get_engine
+from app.main import app
+from app.schemas.models import Base, Student
+
+# Checks that failed logins from one address can't lock an account's owner
+# out: ATTEMPTS bad passwords from an attacker's IP, then the owner logs in
+# from another IP and must get in. Runs against $DATABASE_URL with the
+# in-process rate limit store, and exits non-zero if the owner is refused.
+# Usage: python -m bench.rate_limits
+
+EMAIL = "owner@ratelimits.bearnet.edu"
+PASSWORD = "ratelimits-password"
+ATTEMPTS = 25
+
+OWNER_IP = "198.51.100.10"
+ATTACKER_IP = "203.0.113.66"
+
+
+def _client(ip: str) -> httpx.AsyncClient:
+    transport = httpx.ASGITransport(app=app, client=(ip, 40000))
+    return httpx.AsyncClient(transport=transport, base_url="https://test")
+
+
+async def cleanup() -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(Student).where(Student.email == EMAIL))
+        await db.commit()
+
+
+async def main() -> int:
+    async with get_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await cleanup()
+
+    try:
+        async with _client(OWNER_IP) as owner, _client(ATTACKER_IP) as attacker:
+            response = await owner.post("/auth/signup", json={"email": EMAIL, "password": PASSWORD})
+            if response.status_code != 201:
+                raise RuntimeError(f"signup: {response.status_code} {response.text}")
+
+            refused = 0
+            for _ in range(ATTEMPTS):
+                response = await attacker.post(
+                    "/auth/login", json={"email": EMAIL, "password": "wrong-password"}
+                )
+                refused += response.status_code == 429
+
+            response = await owner.post("/auth/login", json={"email": EMAIL, "password": PASSWORD})
+    finally:
+        await cleanup()
+        await dispose_engines()
+
+    print(f"attacker: {ATTEMPTS - refused}/{ATTEMPTS} attempts reached the password check")
+    if response.status_code != 200:
+        retry = response.headers.get("Retry-After")
+        print(f"FAIL owner login: {response.status_code} (Retry-After: {retry})")
+        return 1
+    print("ok   owner login")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,141 @@
+import argparse
+import asyncio
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from sqlalchemy import delete, event, insert
+
+from app.deps.db import AsyncSessionLocal, dispose_engines, get_engine
+from app.main import app
+from app.schemas.models import Base, Semester, Student
+
+# Calls each write endpoint once against $DATABASE_URL, counts the SQL
+# statements it sends and exits non-zero if any endpoint sends more than
+# its budget. The counts include authentication; BEGIN and COMMIT, which
+# the drivers issue themselves, are not counted. When an endpoint gets
+# cheaper, lower its budget here.
+# Usage: python -m bench.roundtrips [--verbose]
+
+EMAIL_DOMAIN = "roundtrips.bearnet.edu"
+PASSWORD = "roundtrips-password"
+
+# Per dialect: SQLite can't batch ORM inserts that return server
+# defaults, so each change_log row is a statement of its own there.
+# course.add and study_group.create also read the semester or course
+# they're created under, because the response embeds it.
+BUDGETS = {
+    "auth.signup": {"postgresql": 2, "sqlite": 2},
+    "profile.modify": {"postgresql": 3, "sqlite": 3},
+    "course.add": {"postgresql": 3, "sqlite": 3},
+    "study_group.create": {"postgresql": 6, "sqlite": 8},
+    "study_group.request": {"postgresql": 5, "sqlite": 6},
+}
+
+
+class Counter:
+    def __init__(self):
+        self.statements: list[str] = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(" ".join(statement.split()))
+
+    @contextmanager
+    def counting(self):
+        self.statements = []
+        engine = get_engine().sync_engine
+        event.listen(engine, "before_cursor_execute", self)
+        try:
+            yield
+        finally:
+            event.remove(engine, "before_cursor_execute", self)
+
+
+async def seed() -> int:
+    async with AsyncSessionLocal() as db:
+        semester_id = await db.scalar(
+            insert(Semester).values(term="ROUNDTRIPS", year=9999).returning(Semester.id)
+        )
+        await db.commit()
+        return semester_id
+
+
+async def cleanup(semester_id: int) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(Semester).where(Semester.id == semester_id))
+        await db.execute(delete(Student).where(Student.email.like(f"%@{EMAIL_DOMAIN}")))
+        await db.commit()
+
+
+async def main(verbose: bool) -> int:
+    async with get_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    dialect = get_engine().dialect.name
+    semester_id = await seed()
+    counter = Counter()
+    counts: dict[str, int] = {}
+
+    async def call(name: str, client: httpx.AsyncClient, method: str, url: str, body: dict) -> dict:
+        with counter.counting():
+            response = await client.request(method, url, json=body)
+        if response.is_error:
+            raise RuntimeError(f"{name}: {response.status_code} {response.text}")
+        counts[name] = len(counter.statements)
+        if verbose:
+            print(f"{name}:")
+            print("\n".join(f"       {statement}" for statement in counter.statements))
+        return response.json()
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with (
+            httpx.AsyncClient(transport=transport, base_url="https://test") as owner,
+            httpx.AsyncClient(transport=transport, base_url="https://test") as member,
+        ):
+            await call("auth.signup", owner, "POST", "/auth/signup", {
+                "email": f"owner@{EMAIL_DOMAIN}", "password": PASSWORD,
+            })
+            await call("profile.modify", owner, "PATCH", "/profile", {"major": "EECS"})
+            course = await call("course.add", owner, "POST", "/course/", {
+                "department": "TRIP",
+                "course_number": "1",
+                "professor": "Staff",
+                "semester_id": semester_id,
+            })
+            group = await call("study_group.create", owner, "POST", "/study-group/", {
+                "course_id": course["id"],
+                "semester_id": semester_id,
+                "location": "Moffitt",
+                "meeting_time": (datetime.now(timezone.utc) + timedelta(days=1)).isoformat(),
+                "duration_minutes": 60,
+            })
+
+            await member.post("/auth/signup", json={
+                "email": f"member@{EMAIL_DOMAIN}", "password": PASSWORD,
+            })
+            await call("study_group.request", member, "POST", f"/study-group/{group['id']}/request", {
+                "message": "Hi",
+            })
+    finally:
+        await cleanup(semester_id)
+        await dispose_engines()
+
+    failures = []
+    for name, budgets in BUDGETS.items():
+        count, budget = counts[name], budgets[dialect]
+        status = "FAIL" if count > budget else "ok"
+        print(f"{status:<4} {name:<22} {count} statements (budget {budget})")
+        if count > budget:
+            failures.append(name)
+
+    print(f"{len(BUDGETS) - len(failures)}/{len(BUDGETS)} endpoints within budget")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.verbose)))
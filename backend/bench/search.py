@@ -0,0 +1,148 @@
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, insert, select, or_
+
+from app.core.schedule import meeting_slot
+from app.deps.db import AsyncSessionLocal, dispose_engines, get_engine
+from app.routers.study_group import search_study_groups
+from app.schemas.models import Base, Course, Semester, Student, StudyGroup
+
+# Seeds a throwaway semester at catalog scale, times the full-text search
+# path against the naive ILIKE scan it replaces, then removes the seed data.
+# Usage: python -m bench.search --courses 2000 --groups 50000
+
+DEPARTMENTS = ["CS", "MATH", "PHYS", "CHEM", "BIO", "ECON", "HIST", "ENGL", "STAT", "EE"]
+PROFESSORS = ["Hilfinger", "Garcia", "Denero", "Sahai", "Ranade", "Hug", "Kubiatowicz", "Yelick", "Culler", "Wagner"]
+BUILDINGS = ["Soda", "Cory", "Evans", "Dwinelle", "Moffitt", "Doe", "Wheeler", "Etcheverry", "Haas", "VLSB"]
+QUERIES = ["cs 61", "soda", "hilfinger", "math 1", "moffitt library", "econ wagner", "phys 7b"]
+
+
+async def seed(courses: int, groups: int) -> tuple[int, int]:
+    rng = random.Random(42)
+    base = datetime(2026, 8, 24, 9, tzinfo=timezone.utc)
+
+    async with AsyncSessionLocal() as db:
+        semester = Semester(term="BENCH", year=9999)
+        owner = Student(email="bench@bearnet.invalid", password_hash="!")
+        db.add_all([semester, owner])
+        await db.flush()
+
+        course_rows = [
+            {
+                "semester_id": semester.id,
+                "department": DEPARTMENTS[i % len(DEPARTMENTS)],
+                "course_number": f"{i // len(DEPARTMENTS) + 1}{'ABC'[i % 3]}",
+                "professor": rng.choice(PROFESSORS),
+            }
+            for i in range(courses)
+        ]
+        course_ids = (
+            await db.scalars(insert(Course).returning(Course.id), course_rows)
+        ).all()
+
+        rows = []
+        for _ in range(groups):
+            meeting_time = base + timedelta(minutes=30 * rng.randrange(7 * 48))
+            start, end, recurring = meeting_slot(meeting_time, None, 60)
+            rows.append({
+                "owner_id": owner.id,
+                "semester_id": semester.id,
+                "course_id": rng.choice(course_ids),
+                "location": f"{rng.choice(BUILDINGS)} {rng.randrange(100, 500)}",
+                "meeting_time": meeting_time,
+                "capacity": 5,
+                "isPrivate": False,
+                "duration_minutes": 60,
+                "schedule_start": start,
+                "schedule_end": end,
+                "is_recurring": recurring,
+            })
+        for i in range(0, len(rows), 5000):
+            await db.execute(insert(StudyGroup), rows[i:i + 5000])
+
+        await db.commit()
+        return semester.id, owner.id
+
+
+async def cleanup(semester_id: int, owner_id: int) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(StudyGroup).where(StudyGroup.semester_id == semester_id))
+        await db.execute(delete(Course).where(Course.semester_id == semester_id))
+        await db.execute(delete(Semester).where(Semester.id == semester_id))
+        await db.execute(delete(Student).where(Student.id == owner_id))
+        await db.commit()
+
+
+async def ilike_search(db, q: str, semester_id: int):
+    pattern = f"%{q}%"
+    return (
+        await db.scalars(
+            select(StudyGroup)
+            .join(Course)
+            .where(
+                StudyGroup.semester_id == semester_id,
+                or_(
+                    StudyGroup.location.ilike(pattern),
+                    Course.department.ilike(pattern),
+                    Course.course_number.ilike(pattern),
+                    Course.professor.ilike(pattern),
+                ),
+            )
+            .limit(21)
+        )
+    ).all()
+
+
+async def timed(fn, iterations: int) -> list[float]:
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def report(label: str, samples: list[float]) -> None:
+    samples.sort()
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"  {label:<8} p50 {statistics.median(samples):7.2f} ms   p95 {p95:7.2f} ms")
+
+
+async def main(courses: int, groups: int, iterations: int) -> None:
+    async with get_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    started = time.perf_counter()
+    semester_id, owner_id = await seed(courses, groups)
+    print(f"seeded {courses} courses / {groups} groups in {time.perf_counter() - started:.1f}s")
+
+    try:
+        async with AsyncSessionLocal() as db:
+            await db.execute(select(1))
+            for q in QUERIES:
+                print(f"q={q!r}")
+                report("fts", await timed(
+                    lambda: search_study_groups(q=q, semester_id=semester_id, page=1, page_size=20, db=db),
+                    iterations,
+                ))
+                report("ilike", await timed(
+                    lambda: ilike_search(db, q, semester_id),
+                    iterations,
+                ))
+    finally:
+        await cleanup(semester_id, owner_id)
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--courses", type=int, default=2000)
+    parser.add_argument("--groups", type=int, default=50000)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.courses, args.groups, args.iterations))